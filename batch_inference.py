@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# ---------------- Micro-batched inference ----------------
+# The sniff callback only extracts features and enqueues them. A single worker
+# thread runs one predict() per batch of BATCH_SIZE rows or every
+# MAX_LATENCY_MS, whichever comes first, and hands verdicts back in packet order.
+
+BATCH_SIZE = 64
+MAX_LATENCY_MS = 5.0
+MAX_PENDING = 50_000      # rows waiting for inference before new packets are dropped
+LATENCY_SAMPLES = 100_000  # most recent verdict latencies kept for p50/p99
+
+
+class MicroBatcher:
+    """Collect feature rows into a NumPy batch and run one predict() per batch."""
+
+    def __init__(self, predict, on_verdict, n_features, batch_size=BATCH_SIZE,
+                 max_latency_ms=MAX_LATENCY_MS, max_pending=MAX_PENDING):
+        self.predict = predict
+        self.on_verdict = on_verdict
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_pending = max_pending
+
+        self._X = np.zeros((batch_size, n_features), dtype=np.float64)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.rows = 0
+        self.inferred = 0
+        self.batches = 0
+        self.dropped = 0
+        self.predict_errors = 0   # predict() raised: the whole batch falls back to verdict 0
+        self.verdict_errors = 0   # on_verdict() raised for one row
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._started = time.monotonic()
+
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, features, item, pred=None):
+        """Queue one feature row; never blocks the capture thread.
+
+        If `pred` is already known (e.g. from the verdict cache) the row skips
+        predict() but still goes out in order with the rest of its batch.
+        """
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append((features, item, time.monotonic(), pred))
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def close(self):
+        """Score whatever is still queued and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._pending:
+                    if len(self._pending) >= self.batch_size or self._closed:
+                        break
+                    wait = self._pending[0][2] + self.max_latency - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+            n = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            n = len(batch)
+            preds = [p for _, _, _, p in batch]
+            todo = [i for i, p in enumerate(preds) if p is None]
+            if todo:
+                X = self._X[:len(todo)]
+                for j, i in enumerate(todo):
+                    X[j] = batch[i][0]
+                try:
+                    scored = self.predict(X)
+                except Exception:
+                    self.predict_errors += 1
+                    scored = np.zeros(len(todo), dtype=int)
+                for j, i in enumerate(todo):
+                    preds[i] = scored[j]
+                self.inferred += len(todo)
+                self.batches += 1
+
+            for (_, item, t_enqueued, _), pred in zip(batch, preds):
+                try:
+                    self.on_verdict(item, pred)
+                except Exception:
+                    self.verdict_errors += 1
+                self._latencies.append(time.monotonic() - t_enqueued)
+            self.rows += n
+
+    @property
+    def errors(self):
+        return self.predict_errors + self.verdict_errors
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        lat = np.fromiter(self._latencies, dtype=np.float64) * 1000.0
+        return {
+            "rows": self.rows,
+            "inferred": self.inferred,
+            "batches": self.batches,
+            "avg_batch": self.inferred / self.batches if self.batches else 0.0,
+            "rows_per_sec": self.rows / elapsed,
+            "p50_ms": float(np.percentile(lat, 50)) if lat.size else 0.0,
+            "p99_ms": float(np.percentile(lat, 99)) if lat.size else 0.0,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"📈 Inference: {s['rows']:,} packets, {s['inferred']:,} scored in {s['batches']:,} batches "
+              f"(avg {s['avg_batch']:.1f}), {s['rows_per_sec']:,.0f} pkt/s, "
+              f"verdict latency p50={s['p50_ms']:.2f}ms p99={s['p99_ms']:.2f}ms, "
+              f"dropped={s['dropped']:,}, errors={s['errors']:,}")
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ndjson_log import NDJSONLogWriter, iter_records
+
+# Per-packet cost of the append-only NDJSON log vs. the legacy "rewrite the whole
+# JSON file after every packet" approach. The NDJSON cost should stay flat as the
+# log grows; the legacy cost grows linearly (O(n^2) total).
+
+SAMPLE = {
+    "Timestamp": "2025-09-26 12:02:53.115597",
+    "Label": "BENIGN",
+    "Protocol": "TCP",
+    "SrcIP": "10.140.201.188",
+    "DstIP": "202.56.230.30",
+    "SrcPort": 62740,
+    "DstPort": 443,
+    "FlowDuration": 0.002755,
+}
+
+
+def bench_ndjson(n, window, tmpdir):
+    path = os.path.join(tmpdir, "packet_log.ndjson")
+    writer = NDJSONLogWriter(path)
+    rows = []
+    t_window = time.perf_counter()
+    for i in range(1, n + 1):
+        rec = dict(SAMPLE, SrcPort=i & 0xFFFF)
+        writer.write(rec)
+        if i % window == 0:
+            now = time.perf_counter()
+            rows.append((i, (now - t_window) / window * 1e6))
+            t_window = now
+    writer.close()
+    t0 = time.perf_counter()
+    count = sum(1 for _ in iter_records(path))
+    read_s = time.perf_counter() - t0
+    return rows, count, read_s
+
+
+def bench_legacy(n, window, tmpdir):
+    path = os.path.join(tmpdir, "packet_log.json")
+    log = []
+    rows = []
+    t_window = time.perf_counter()
+    for i in range(1, n + 1):
+        log.append(dict(SAMPLE, SrcPort=i & 0xFFFF))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(log, f, indent=4, default=str)
+        if i % window == 0:
+            now = time.perf_counter()
+            rows.append((i, (now - t_window) / window * 1e6))
+            t_window = now
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packet log write benchmark")
+    parser.add_argument("-n", "--records", type=int, default=1_000_000)
+    parser.add_argument("--window", type=int, default=100_000)
+    parser.add_argument("--legacy", type=int, default=2_000,
+                        help="records for the legacy full-rewrite run (0 to skip)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"📝 NDJSON append log, {args.records:,} records")
+        rows, count, read_s = bench_ndjson(args.records, args.window, tmpdir)
+        for i, us in rows:
+            print(f"   up to {i:>10,}: {us:8.2f} µs/packet")
+        print(f"   streamed back {count:,} records in {read_s:.2f}s")
+
+        if args.legacy:
+            window = max(1, args.legacy // 10)
+            print(f"📝 Legacy json.dump rewrite, {args.legacy:,} records")
+            for i, us in bench_legacy(args.legacy, window, tmpdir):
+                print(f"   up to {i:>10,}: {us:8.2f} µs/packet")
+
+
+if __name__ == "__main__":
+    main()
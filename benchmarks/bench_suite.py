@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Benchmark suite for the redirector and honeypot hot paths. Results are
+# written as JSON; --compare flags metrics that regressed past a threshold
+# against an earlier run (exit code 1), so it can gate a release.
+#
+#   python benchmarks/bench_suite.py --output base.json
+#   python benchmarks/bench_suite.py --compare base.json
+#   python benchmarks/bench_suite.py --quick --only predict features
+#
+# Metric names end in _us / _ms / _s (lower is better) or _per_sec (higher is better).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCHES = ("features", "predict", "log", "honeypot", "dashboard")
+PREDICT_BATCH_SIZES = (1, 16, 64, 256, 1024)
+DASHBOARD_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_THRESHOLD = 0.10
+HONEYPOT_PORT = 19990
+
+
+# ---------------- Input packets ----------------
+def raw_packets(n, source="packets_raw.json"):
+    """Build n scapy packets by cycling the records in packets_raw.json (synthetic if missing)."""
+    from scapy.all import Ether, IP, TCP, UDP, ICMP, Raw
+
+    path = os.path.join(ROOT, source)
+    records = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    if not records:
+        rnd = random.Random(42)
+        records = [{"Protocol": rnd.choice(["TCP", "UDP", "ICMP"]),
+                    "SrcIP": f"10.0.{rnd.randrange(256)}.{rnd.randrange(256)}",
+                    "DstIP": f"192.168.{rnd.randrange(256)}.{rnd.randrange(256)}",
+                    "SrcPort": rnd.randrange(1024, 65535), "DstPort": rnd.choice([53, 80, 443])}
+                   for _ in range(500)]
+
+    packets = []
+    t = time.time()
+    for i in range(n):
+        r = records[i % len(records)]
+        ip = IP(src=r["SrcIP"], dst=r["DstIP"])
+        if r["Protocol"] == "TCP":
+            pkt = Ether() / ip / TCP(sport=r["SrcPort"], dport=r["DstPort"], flags="A") / Raw(b"x" * (i % 512))
+        elif r["Protocol"] == "UDP":
+            pkt = Ether() / ip / UDP(sport=r["SrcPort"], dport=r["DstPort"]) / Raw(b"x" * (i % 512))
+        else:
+            pkt = Ether() / ip / ICMP()
+        pkt = Ether(bytes(pkt))  # dissect from bytes like a captured frame
+        pkt.time = t + i * 0.0001
+        packets.append(pkt)
+    return packets
+
+
+def sample_entry(i):
+    return {
+        "Timestamp": "2025-09-26 12:02:53.115597",
+        "Label": "MALICIOUS" if i % 20 == 0 else "BENIGN",
+        "Protocol": "TCP",
+        "SrcIP": f"10.0.{(i >> 8) & 255}.{i & 255}",
+        "DstIP": "202.56.230.30",
+        "SrcPort": i & 0xFFFF,
+        "DstPort": 443,
+        "FlowDuration": 0.002755,
+    }
+
+
+def per_op_us(fn, items, repeats):
+    """Median µs per item over `repeats` passes of fn(item) for every item."""
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append((time.perf_counter() - t0) / len(items) * 1e6)
+    return statistics.median(runs)
+
+
+# ---------------- Benchmarks ----------------
+def bench_features(r, args):
+    packets = raw_packets(args.packets)
+
+    def fresh_extract(pkt):
+        r.extract_features(r.parse_packet(pkt))
+
+    def sketch(meta):
+        key, ts, length, flags = meta
+        r.source_sketch.update(key[0], key[1], key[3], length, flags & (r.SYN | r.ACK) == r.SYN, ts)
+
+    r.flow_table = r.FlowTable(r.selected_features)
+    r.source_sketch = r.SourceSketch()
+    metas = [r.parse_packet(pkt) for pkt in packets]
+    return {"extract_features_us": per_op_us(fresh_extract, packets, args.repeats),
+            "source_sketch_us": per_op_us(sketch, metas, args.repeats),
+            "packets": len(packets)}
+
+
+def bench_predict(r, args):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    X = rng.random((max(PREDICT_BATCH_SIZES), len(r.selected_features))) * 1e5
+    out = {}
+    for size in PREDICT_BATCH_SIZES:
+        batch = X[:size]
+        loops = max(5, 2000 // size)
+        runs = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                r.models.active.model.predict(batch)
+            runs.append((time.perf_counter() - t0) / loops)
+        call = statistics.median(runs)
+        out[f"predict_b{size}_call_us"] = call * 1e6
+        out[f"predict_b{size}_row_us"] = call / size * 1e6
+        if r.models.active.compiled is not None:
+            runs = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                for _ in range(loops):
+                    r.models.active.compiled.predict(batch)
+                runs.append((time.perf_counter() - t0) / loops)
+            out[f"compiled_b{size}_call_us"] = statistics.median(runs) * 1e6
+    return out
+
+
+def bench_log(r, args):
+    n = args.log_records
+    window = max(1, n // 10)
+    windows = []
+    t0 = time.perf_counter()
+    for i in range(1, n + 1):
+        r.save_packet_log_realtime(sample_entry(i))
+        if i % window == 0:
+            now = time.perf_counter()
+            windows.append((now - t0) / window * 1e6)
+            t0 = now
+    r.packet_writer.flush()
+    return {
+        "save_first_window_us": windows[0],
+        "save_last_window_us": windows[-1],
+        "save_growth_ratio": windows[-1] / windows[0],
+        "records": n,
+    }
+
+
+def _wait_for_port(port, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def _count_lines(path):
+    try:
+        with open(path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    except FileNotFoundError:
+        return 0
+
+
+def bench_honeypot(r, args):
+    from honeypot_channel import HoneypotChannel
+
+    workdir = tempfile.mkdtemp(prefix="hp_bench_")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "simple_honeypot.py"), "--mode", "asyncio",
+         "--port", str(HONEYPOT_PORT)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONPATH=ROOT))
+    log_path = os.path.join(workdir, "honeypot_log.txt")
+    try:
+        if not _wait_for_port(HONEYPOT_PORT):
+            raise RuntimeError("honeypot did not start")
+        r.honeypot = HoneypotChannel("127.0.0.1", HONEYPOT_PORT)
+        packets = raw_packets(args.honeypot_messages)
+
+        # Single alerts: send_to_honeypot() until the line shows up in the honeypot log
+        latencies = []
+        expected = _count_lines(log_path)
+        for pkt in packets[:20]:
+            expected += 1
+            t0 = time.perf_counter()
+            r.send_to_honeypot(pkt, "MALICIOUS")
+            while _count_lines(log_path) < expected:
+                time.sleep(0.001)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        # Burst: enqueue cost on the capture thread and end-to-end throughput
+        t0 = time.perf_counter()
+        for pkt in packets:
+            r.send_to_honeypot(pkt, "MALICIOUS")
+        enqueue = time.perf_counter() - t0
+        expected += len(packets)
+        while _count_lines(log_path) < expected and time.perf_counter() - t0 < 60:
+            time.sleep(0.01)
+        total = time.perf_counter() - t0
+        r.honeypot.close()
+        return {
+            "single_round_trip_ms": statistics.median(latencies),
+            "send_enqueue_us": enqueue / len(packets) * 1e6,
+            "burst_msgs_per_sec": len(packets) / total,
+            "dropped": r.honeypot.dropped,
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_dashboard(r, args):
+    sizes = [s for s in DASHBOARD_SIZES if s <= args.max_dashboard]
+    out = {}
+    for size in sizes:
+        # The static dashboard is rendered from the in-memory packet store
+        r.packet_store.clear()
+        ts = time.time()
+        for i in range(size):
+            e = sample_entry(i)
+            r.packet_store.add(ts, e["Label"], e["Protocol"], e["SrcIP"], e["DstIP"], e["SrcPort"],
+                               e["DstPort"], e["FlowDuration"], "base")
+        t0 = time.perf_counter()
+        r.generate_dashboard(open_browser=False)
+        out[f"dashboard_{size}_s"] = time.perf_counter() - t0
+        out[f"dashboard_{size}_mb"] = os.path.getsize(r.HTML_FILE) / 1e6
+    return out
+
+
+BENCH_FUNCS = {
+    "features": bench_features,
+    "predict": bench_predict,
+    "log": bench_log,
+    "honeypot": bench_honeypot,
+    "dashboard": bench_dashboard,
+}
+
+
+# ---------------- Comparison ----------------
+def lower_is_better(metric):
+    return metric.endswith(("_us", "_ms", "_s", "_ratio"))
+
+
+def compare(baseline, current, threshold):
+    """Print metric deltas and return the list of regressions."""
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for bench, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(bench, {})
+        for name, value in metrics.items():
+            if name not in base or not isinstance(value, (int, float)):
+                continue
+            if not (lower_is_better(name) or name.endswith("_per_sec")):
+                continue
+            old = base[name]
+            change = (value - old) / old if old else 0.0
+            worse = change > threshold if lower_is_better(name) else change < -threshold
+            flag = "  ❌" if worse else ""
+            print(f"{bench + '.' + name:<40} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+            if worse:
+                regressions.append(f"{bench}.{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redirector/honeypot hot-path benchmarks")
+    parser.add_argument("--only", nargs="+", choices=BENCHES, default=list(BENCHES))
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier results JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression (default 0.10)")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs for a fast smoke run")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    args.packets = 2_000 if args.quick else 20_000
+    args.log_records = 20_000 if args.quick else 200_000
+    args.honeypot_messages = 1_000 if args.quick else 10_000
+    args.max_dashboard = 10_000 if args.quick else max(DASHBOARD_SIZES)
+
+    # Run in a scratch directory so the redirector's logs and dashboard don't touch the repo
+    workdir = tempfile.mkdtemp(prefix="redirector_bench_")
+    for name in ("model.pkl", "selected_features.pkl", "model_trees.npz"):
+        if os.path.exists(os.path.join(ROOT, name)):
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    os.chdir(workdir)
+    import redirector as r
+    r.VERBOSE = False
+
+    results = {}
+    try:
+        for bench in args.only:
+            print(f"⏱️ {bench}...")
+            results[bench] = BENCH_FUNCS[bench](r, args)
+            for name, value in results[bench].items():
+                print(f"   {name:<32} {value:,.3f}" if isinstance(value, float) else f"   {name:<32} {value:,}")
+    finally:
+        r.batcher.close()
+        r.packet_writer.close()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Load generator for simple_honeypot.py: compares the threaded and asyncio
+# servers on connections/sec (short connections sending one message) and on
+# server memory/threads while holding many idle connections open.
+#
+#   python benchmarks/honeypot_load.py --connections 20000 --hold 5000
+#
+# With --workers it instead measures how accept throughput scales with the
+# number of SO_REUSEPORT worker processes (--workers 1 2 4 8), spreading the
+# connections over several listening ports from --clients load processes (a
+# single Python client would be the bottleneck) and reading the per-worker
+# split from the honeypot's /metrics.
+#
+#   python benchmarks/honeypot_load.py --workers 1 2 4 --ports 4 --clients 8 --connections 50000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+MESSAGE = b"BENIGN | Src=10.0.0.1, Dst=10.0.0.2, Proto=TCP, Sport=1234, Dport=80\n"
+
+
+def proc_status(pid):
+    """Return (RSS in MB, thread count) of a process from /proc."""
+    rss, threads = 0.0, 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+            elif line.startswith("Threads:"):
+                threads = int(line.split()[1])
+    return rss, threads
+
+
+def start_server(options, port, workdir):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "simple_honeypot.py"), *options],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"honeypot {' '.join(options)} did not start on port {port}")
+
+
+def stop_server(proc):
+    """CTRL+C the server and wait, so its workers have released the ports before the next run."""
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+async def one_connection(port, sem, stats):
+    async with sem:
+        try:
+            reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(MESSAGE)
+            await writer.drain()
+            await reader.readline()  # ack => message was processed
+            writer.close()
+            await writer.wait_closed()
+            stats["ok"] += 1
+        except OSError:
+            stats["failed"] += 1
+
+
+async def run_connections(port, total, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    stats = {"ok": 0, "failed": 0}
+    t0 = time.perf_counter()
+    ports = port if isinstance(port, list) else [port]
+    # Round-robin over the decoy ports by task index (every task starts before any finishes)
+    await asyncio.gather(*(one_connection(ports[i % len(ports)], sem, stats) for i in range(total)))
+    return stats, time.perf_counter() - t0
+
+
+async def hold_connections(port, count, pid):
+    writers = []
+    failed = 0
+    for _ in range(count):
+        try:
+            _, writer = await asyncio.open_connection(HOST, port)
+            writers.append(writer)
+        except OSError:
+            failed += 1
+    await asyncio.sleep(1.0)  # let the server accept and settle
+    rss, threads = proc_status(pid)
+    for w in writers:
+        w.close()
+    return len(writers), failed, rss, threads
+
+
+def bench(mode, port, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(["--mode", mode, "--port", str(port)], port, workdir)
+        try:
+            idle_rss, _ = proc_status(proc.pid)
+            stats, elapsed = asyncio.run(run_connections(port, args.connections, args.concurrency))
+            held, hold_failed, rss, threads = asyncio.run(hold_connections(port, args.hold, proc.pid))
+        finally:
+            stop_server(proc)
+    return {
+        "mode": mode,
+        "conn_per_sec": stats["ok"] / elapsed,
+        "ok": stats["ok"],
+        "failed": stats["failed"],
+        "idle_rss_mb": idle_rss,
+        "held": held,
+        "hold_failed": hold_failed,
+        "held_rss_mb": rss,
+        "threads": threads,
+    }
+
+
+# ---------------- SO_REUSEPORT scaling ----------------
+def _client(ports, total, concurrency, results):
+    stats, elapsed = asyncio.run(run_connections(ports, total, concurrency))
+    results.put((stats["ok"], stats["failed"], elapsed))
+
+
+def connection_split(metrics_port):
+    """Accepted connections per worker and per port, from the honeypot's /metrics."""
+    from urllib.request import urlopen
+
+    split = {"worker": {}, "port": {}}
+    for line in urlopen(f"http://{HOST}:{metrics_port}/metrics", timeout=5).read().decode().splitlines():
+        for metric, label in (("honeypot_worker_connections_total{", "worker"),
+                              ("honeypot_connections_total{", "port")):
+            if line.startswith(metric):
+                key = int(line.split(f'{label}="', 1)[1].split('"', 1)[0])
+                split[label][key] = int(float(line.rsplit(" ", 1)[1]))
+    return [[counts[k] for k in sorted(counts)] for counts in (split["worker"], split["port"])]
+
+
+def bench_workers(workers, args):
+    ports = [args.port + i for i in range(args.ports)]
+    metrics_port = args.port + 100
+    options = ["--workers", str(workers), "--metrics", str(metrics_port), "--ports", *map(str, ports)]
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(options, ports[0], workdir)
+        try:
+            results = mp.Queue()
+            per_client = args.connections // args.clients
+            clients = [mp.Process(target=_client, args=(ports, per_client, max(1, args.concurrency // args.clients),
+                                                        results)) for _ in range(args.clients)]
+            t0 = time.perf_counter()
+            for c in clients:
+                c.start()
+            outcomes = [results.get() for _ in clients]
+            elapsed = time.perf_counter() - t0
+            for c in clients:
+                c.join()
+            split, port_split = connection_split(metrics_port)
+        finally:
+            stop_server(proc)
+    ok = sum(o[0] for o in outcomes)
+    return {
+        "workers": workers,
+        "conn_per_sec": ok / elapsed,
+        "ok": ok,
+        "failed": sum(o[1] for o in outcomes),
+        "split": split,
+        "port_split": port_split,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs asyncio honeypot load test")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--hold", type=int, default=2000, help="idle connections held open for the memory test")
+    parser.add_argument("--port", type=int, default=19999)
+    parser.add_argument("--modes", nargs="+", default=["threaded", "asyncio"])
+    parser.add_argument("--workers", nargs="+", type=int,
+                        help="SO_REUSEPORT scaling test with these worker counts instead of the mode comparison")
+    parser.add_argument("--ports", type=int, default=4, help="scaling test: decoy ports to spread connections over")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1,
+                        help="scaling test: load generator processes")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    if args.workers:
+        print(f"🧮 {os.cpu_count()} CPUs; {args.connections:,} connections over {args.ports} ports "
+              f"from {args.clients} client processes @ {args.concurrency} concurrent")
+        results = []
+        for workers in args.workers:
+            print(f"🚀 {workers} worker(s)")
+            results.append(bench_workers(workers, args))
+        base = results[0]["conn_per_sec"] / results[0]["workers"]
+        print(f"\n{'workers':>7} {'conn/s':>10} {'speedup':>8} {'per-worker':>10} {'failed':>8}  "
+              f"per-worker split / per-port split")
+        for r in results:
+            print(f"{r['workers']:>7} {r['conn_per_sec']:>10,.0f} {r['conn_per_sec'] / results[0]['conn_per_sec']:>7.2f}x "
+                  f"{r['conn_per_sec'] / r['workers'] / base:>9.0%} {r['failed']:>8,}  {r['split']} / {r['port_split']}")
+        return
+
+    results = []
+    for i, mode in enumerate(args.modes):
+        print(f"🚀 {mode}: {args.connections:,} connections @ {args.concurrency} concurrent, holding {args.hold:,}")
+        results.append(bench(mode, args.port + i, args))
+
+    print(f"\n{'mode':<10} {'conn/s':>10} {'failed':>8} {'idle MB':>9} {'held':>7} {'held MB':>9} {'KB/conn':>8} {'threads':>8}")
+    for r in results:
+        per_conn = (r["held_rss_mb"] - r["idle_rss_mb"]) * 1024 / max(r["held"], 1)
+        print(f"{r['mode']:<10} {r['conn_per_sec']:>10,.0f} {r['failed']:>8,} {r['idle_rss_mb']:>9.1f} "
+              f"{r['held']:>7,} {r['held_rss_mb']:>9.1f} {per_conn:>8.1f} {r['threads']:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import ctypes
+import socket
+import struct
+import threading
+import time
+
+from scapy.all import conf, IP, TCP
+
+# ---------------- Capture: kernel-side filtering, drop stats, sampling ----------------
+# The live capture opens its own PF_PACKET socket so a BPF filter runs in the
+# kernel: by default only IPv4 frames, minus the redirector's own alerts to
+# the honeypot. Filter strings are compiled by libpcap; without libpcap the
+# default filter is attached from a hand-assembled program (Ethernet and
+# loopback interfaces), and anything else falls back to a Python lfilter.
+# PACKET_STATISTICS gives the kernel's received / dropped counts.
+#
+# AdaptiveSampler keeps whole flows at a rate of 1/2**level (a hash of the
+# normalized 5-tuple picks them, so a sampled flow keeps all its packets and
+# its flow features stay right). The level rises while the callback is
+# behind — packets arriving late, the inference queue filling up or the
+# kernel dropping — and falls again once it has caught up. Every kept
+# packet carries a weight of 2**level so verdict counts can be scaled back up.
+
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+SO_ATTACH_FILTER = 26
+SO_RCVBUFFORCE = 33
+ARPHRD_ETHER = 1
+ARPHRD_LOOPBACK = 772
+
+CAPTURE_BUFFER_MB = 32     # kernel receive buffer for the capture socket (scapy's default is 64 KB)
+MAX_SAMPLE_LEVEL = 6       # lowest sample rate is 1/2**6 = 1/64 of the flows
+CHECK_EVERY = 256          # packets between load checks
+CHECK_INTERVAL = 0.5       # ...and at most one rate change per this many seconds
+LAG_HIGH = 0.5             # s behind the capture timestamp: sample less
+LAG_LOW = 0.05             # s behind: allowed to sample more
+BACKLOG_HIGH = 0.5         # fraction of the inference queue in use: sample less
+BACKLOG_LOW = 0.1
+CALM_CHECKS = 4            # consecutive quiet checks before the rate goes back up
+
+
+def capture_filter(exclude_host=None, exclude_port=None):
+    """Default BPF filter: IPv4 only, without our own traffic to the honeypot."""
+    if exclude_host is None:
+        return "ip"
+    return f"ip and not (host {exclude_host} and tcp port {exclude_port})"
+
+
+def default_bpf_program(exclude_host=None, exclude_port=None):
+    """capture_filter() as classic BPF for Ethernet framing, for when libpcap can't compile it."""
+    if exclude_host is None:
+        return [
+            (0x28, 0, 0, 12),        # 0 ldh [12]               ethertype
+            (0x15, 0, 1, 0x0800),    # 1 jeq #IPv4 ? accept : drop
+            (0x06, 0, 0, 0x40000),   # 2 accept (whole frame)
+            (0x06, 0, 0, 0),         # 3 drop
+        ]
+    ip_k = struct.unpack("!I", socket.inet_aton(exclude_host))[0]
+    # (code, jt, jf, k); jumps are relative to the next instruction
+    return [
+        (0x28, 0, 0, 12),            # 0  ldh [12]              ethertype
+        (0x15, 0, 14, 0x0800),       # 1  jeq #IPv4 ? 2 : drop
+        (0x20, 0, 0, 26),            # 2  ld [26]               src ip
+        (0x15, 2, 0, ip_k),          # 3  jeq host ? 6 : 4
+        (0x20, 0, 0, 30),            # 4  ld [30]               dst ip
+        (0x15, 0, 9, ip_k),          # 5  jeq host ? 6 : accept
+        (0x30, 0, 0, 23),            # 6  ldb [23]              ip proto
+        (0x15, 0, 7, 6),             # 7  jeq #TCP ? 8 : accept
+        (0x28, 0, 0, 20),            # 8  ldh [20]              flags + fragment offset
+        (0x45, 5, 0, 0x1FFF),        # 9  jset fragment ? accept : 10
+        (0xB1, 0, 0, 14),            # 10 ldxb 4*([14]&0xf)     ip header length
+        (0x48, 0, 0, 14),            # 11 ldh [x+14]            sport
+        (0x15, 3, 0, exclude_port),  # 12 jeq port ? drop : 13
+        (0x48, 0, 0, 16),            # 13 ldh [x+16]            dport
+        (0x15, 1, 0, exclude_port),  # 14 jeq port ? drop : accept
+        (0x06, 0, 0, 0x40000),       # 15 accept (whole frame)
+        (0x06, 0, 0, 0),             # 16 drop
+    ]
+
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_uint16), ("jt", ctypes.c_uint8),
+                ("jf", ctypes.c_uint8), ("k", ctypes.c_uint32)]
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_uint16), ("filter", ctypes.POINTER(_SockFilter))]
+
+
+def attach_program(sock, program):
+    insns = (_SockFilter * len(program))(*[_SockFilter(*insn) for insn in program])
+    prog = _SockFprog(len(program), ctypes.cast(insns, ctypes.POINTER(_SockFilter)))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, bytes(prog))  # kernel copies the program
+
+
+def python_filter(exclude_host=None, exclude_port=None):
+    """Userspace equivalent of capture_filter() (sniff lfilter) when no kernel filter could be attached."""
+    def keep(packet):
+        if IP not in packet:
+            return False
+        if exclude_host is None or TCP not in packet:
+            return True
+        ip, tcp = packet[IP], packet[TCP]
+        return not (exclude_host in (ip.src, ip.dst) and exclude_port in (tcp.sport, tcp.dport))
+    return keep
+
+
+class CaptureStats:
+    """Kernel receive / drop counters of a PF_PACKET socket (read-and-reset, so accumulated here)."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.received = 0
+        self.dropped = 0
+        self._lock = threading.Lock()  # polled by the sampler and by metrics scrapes
+
+    def poll(self):
+        """Fold in the counters since the last poll; returns the total drops so far."""
+        with self._lock:
+            try:
+                packets, drops = struct.unpack("II", self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+            except OSError:
+                return self.dropped
+            self.received += packets
+            self.dropped += drops
+            return self.dropped
+
+    def counts(self):
+        """(received, dropped) up to now."""
+        self.poll()
+        return self.received, self.dropped
+
+    def report(self):
+        self.poll()
+        share = self.dropped / self.received if self.received else 0.0
+        print(f"📥 Kernel capture: received={self.received:,} dropped={self.dropped:,} ({share:.2%})")
+
+
+def set_buffer(sock, size_mb=CAPTURE_BUFFER_MB):
+    """Grow the socket's receive buffer so bursts queue in the kernel instead of being dropped."""
+    ins = getattr(sock, "ins", None)
+    if not isinstance(ins, socket.socket):
+        return
+    size = size_mb << 20
+    try:
+        ins.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, size)  # root may exceed net.core.rmem_max
+    except OSError:
+        ins.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+
+
+def open_capture(iface=None, bpf="ip", exclude=(None, None), buffer_mb=CAPTURE_BUFFER_MB):
+    """Open the capture socket with the filter in the kernel where possible.
+
+    Returns (socket for sniff(opened_socket=...), CaptureStats or None, lfilter or None).
+    """
+    if bpf is None:
+        sock = conf.L2listen(iface=iface, nofilter=1)
+        set_buffer(sock, buffer_mb)
+        return sock, _stats_for(sock), None
+    try:
+        sock = conf.L2listen(iface=iface, filter=bpf)
+        set_buffer(sock, buffer_mb)
+        print(f"🧲 Kernel capture filter: {bpf}")
+        return sock, _stats_for(sock), None
+    except Exception as e:
+        reason = e
+    sock = conf.L2listen(iface=iface, nofilter=1)
+    set_buffer(sock, buffer_mb)
+    ins = getattr(sock, "ins", None)
+    hatype = ins.getsockname()[3] if isinstance(ins, socket.socket) and ins.family == getattr(
+        socket, "AF_PACKET", None) else None
+    if bpf == capture_filter(*exclude) and hatype in (ARPHRD_ETHER, ARPHRD_LOOPBACK):
+        try:
+            attach_program(ins, default_bpf_program(*exclude))
+            print(f"🧲 Kernel capture filter (built in, libpcap unavailable): {bpf}")
+            return sock, _stats_for(sock), None
+        except OSError as e:
+            reason = e
+    print(f"⚠️ Could not attach capture filter '{bpf}' ({reason}); filtering in Python instead")
+    return sock, _stats_for(sock), python_filter(*exclude)
+
+
+def _stats_for(sock):
+    ins = getattr(sock, "ins", None)
+    if isinstance(ins, socket.socket) and ins.family == getattr(socket, "AF_PACKET", None):
+        stats = CaptureStats(ins)
+        stats.poll()  # reset what was counted before the capture started
+        stats.received = stats.dropped = 0
+        return stats
+    return None
+
+
+class AdaptiveSampler:
+    """Per-flow sampling at 1/2**level, adjusted to how far behind the pipeline is."""
+
+    def __init__(self, backlog_fn=None, drops_fn=None, live=True, max_level=MAX_SAMPLE_LEVEL):
+        self.backlog_fn = backlog_fn  # -> fraction of the inference queue in use
+        self.drops_fn = drops_fn      # -> total kernel drops so far
+        self.live = live              # capture timestamps are wall-clock (not a replay)
+        self.max_level = max_level
+        self.level = 0
+        self.mask = 0
+        self.seen = 0
+        self.kept = 0
+        self.changes = 0
+        self._calm = 0
+        self._drops = 0
+        self._next_check = time.monotonic() + CHECK_INTERVAL
+
+    @property
+    def rate(self):
+        return 1.0 / (1 << self.level)
+
+    def sample(self, key, ts):
+        """Weight (2**level) if this packet's flow is sampled, else 0."""
+        self.seen += 1
+        if self.seen % CHECK_EVERY == 0:
+            self._check(ts)
+        if hash(key) & self.mask:
+            return 0
+        self.kept += 1
+        return self.mask + 1
+
+    def _check(self, ts):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + CHECK_INTERVAL
+        lag = time.time() - ts if self.live else 0.0
+        backlog = self.backlog_fn() if self.backlog_fn else 0.0
+        drops = 0
+        if self.drops_fn:
+            total = self.drops_fn()
+            drops, self._drops = total - self._drops, total
+        if lag > LAG_HIGH or backlog > BACKLOG_HIGH or drops:
+            self._calm = 0
+            if self.level < self.max_level:
+                self._set_level(self.level + 1, f"lag {lag:.2f}s, queue {backlog:.0%}, kernel drops {drops:,}")
+        elif lag < LAG_LOW and backlog < BACKLOG_LOW:
+            self._calm += 1
+            if self._calm >= CALM_CHECKS and self.level > 0:
+                self._calm = 0
+                self._set_level(self.level - 1, "caught up")
+        else:
+            self._calm = 0
+
+    def _set_level(self, level, reason):
+        self.level = level
+        self.mask = (1 << level) - 1
+        self.changes += 1
+        print(f"🎚️ Sampling 1/{1 << level} of flows ({reason})")
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "seen": self.seen,
+            "kept": self.kept,
+            "kept_share": self.kept / self.seen if self.seen else 1.0,
+            "changes": self.changes,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"🎚️ Sampling: kept {s['kept']:,}/{s['seen']:,} packets ({s['kept_share']:.1%}), "
+              f"current rate 1/{1 << self.level}, {s['changes']} rate changes")
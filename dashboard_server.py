@@ -0,0 +1,306 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ---------------- Live dashboard server ----------------
+# Serves the dashboard over local HTTP while capture runs. The browser only
+# ever holds one page of rows: filtering (Label / Protocol / IP) and paging
+# happen server-side with vectorized scans of the redirector's PacketStore
+# columns (the most recent packets, within its memory cap), and new packets
+# plus counters are pushed over Server-Sent Events.
+#
+#   /                 dashboard page
+#   /api/packets      ?label=&protocol=&ip=&page=&size=  (newest first)
+#   /api/counters     totals + per-second timeline
+#   /events           SSE stream: "counters" every second, "packets" as they arrive
+
+DASHBOARD_HOST = "127.0.0.1"
+DASHBOARD_PORT = 8050
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+TIMELINE_SECONDS = 300     # per-second rollup buckets shown on the live charts
+PUSH_INTERVAL = 1.0        # SSE push period (s)
+MAX_PUSH_PACKETS = 200     # newest packets sent per push, the rest only bump the counters
+CLIENT_QUEUE = 5000        # per-client buffer before new packets are dropped for that client
+
+
+class DashboardState:
+    """Live counters and filtered pages over a PacketStore's window, shared by the capture and HTTP threads.
+
+    The rows are the store's ring and filters scan its columns, so the live
+    dashboard keeps nothing per packet beyond the store's own memory cap.
+    """
+
+    def __init__(self, store, rollups=None):
+        self.store = store      # PacketStore holding the rows
+        self.rollups = rollups  # RollupStore feeding the per-second charts
+        self._lock = threading.Lock()
+        self.totals = {"total": 0, "flow_sum": 0.0}
+        self._proto_totals = {}
+        self._clients = set()
+
+    def add(self, entry):
+        """Count one packet (already added to the store) and push it to the live clients."""
+        with self._lock:
+            label, proto = entry["Label"], entry["Protocol"]
+            self.totals["total"] += 1
+            self.totals[label] = self.totals.get(label, 0) + 1
+            self.totals["flow_sum"] += float(entry.get("FlowDuration") or 0)
+            self._proto_totals[proto] = self._proto_totals.get(proto, 0) + 1
+            clients = list(self._clients)
+        for q in clients:
+            try:
+                q.put_nowait(entry)
+            except queue.Full:
+                pass
+
+    def subscribe(self):
+        q = queue.Queue(CLIENT_QUEUE)
+        with self._lock:
+            self._clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._clients.discard(q)
+
+    def counters(self):
+        timeline = self.rollups.timeline("1s", TIMELINE_SECONDS) if self.rollups is not None else []
+        with self._lock:
+            total = self.totals["total"]
+            return {
+                "total": total,
+                "benign": self.totals.get("BENIGN", 0),
+                "malicious": self.totals.get("MALICIOUS", 0),
+                "avg_flow": self.totals["flow_sum"] / total if total else 0.0,
+                "protocols": dict(self._proto_totals),
+                "timeline": timeline,  # [second, benign, malicious, flow_sum, count]
+            }
+
+    def query(self, label=None, protocol=None, ip=None, page=0, size=PAGE_SIZE):
+        """One page of matching records in the store's window, newest first, plus the match count."""
+        hits = self.store.find(label, protocol, ip)  # one consistent snapshot, taken under the store's lock
+        total = len(hits)
+        end = total - page * size
+        seqs = hits[max(end - size, 0):max(end, 0)][::-1].tolist()
+        return {"total": total, "page": page, "size": size, "rows": self.store.rows(seqs)}
+
+
+# ---------------- HTTP ----------------
+def _make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # keep the capture console clean
+
+        def _send(self, status, body, content_type):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/":
+                self._send(200, DASHBOARD_HTML, "text/html; charset=utf-8")
+            elif url.path == "/api/packets":
+                try:
+                    page = max(int(params.get("page", 0)), 0)
+                    size = min(max(int(params.get("size", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+                except ValueError:
+                    self._send(400, '{"error": "page and size must be integers"}', "application/json")
+                    return
+                result = state.query(params.get("label"), params.get("protocol"),
+                                     params.get("ip"), page, size)
+                self._send(200, json.dumps(result, default=str), "application/json")
+            elif url.path == "/api/counters":
+                self._send(200, json.dumps(state.counters()), "application/json")
+            elif url.path == "/events":
+                self._stream_events()
+            else:
+                self._send(404, "not found", "text/plain")
+
+        def _stream_events(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            q = state.subscribe()
+            try:
+                while True:
+                    time.sleep(PUSH_INTERVAL)
+                    fresh = []
+                    while True:
+                        try:
+                            fresh.append(q.get_nowait())
+                        except queue.Empty:
+                            break
+                    chunk = f"event: counters\ndata: {json.dumps(state.counters())}\n\n"
+                    if fresh:
+                        newest = fresh[-MAX_PUSH_PACKETS:][::-1]
+                        chunk += f"event: packets\ndata: {json.dumps(newest, default=str)}\n\n"
+                    self.wfile.write(chunk.encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                state.unsubscribe(q)
+
+    return Handler
+
+
+def start_dashboard_server(state, host=DASHBOARD_HOST, port=DASHBOARD_PORT):
+    """Serve the live dashboard from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 Live dashboard on http://{host}:{port}/")
+    return server
+
+
+DASHBOARD_HTML = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Honeypot Dashboard (live)</title>
+<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
+<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
+<link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.0/css/all.min.css" rel="stylesheet"/>
+<style>
+body { background:#f8f9fa; font-family:Inter,sans-serif; }
+.benign-row td { background: rgba(29,199,155,0.08); }
+.malicious-row td { background: rgba(255,99,132,0.08); }
+.card-container { display:flex; gap:10px; flex-wrap:wrap; margin-bottom:20px; }
+.chart-container { position:relative; height:300px; }
+</style>
+</head>
+<body>
+<div class="container-fluid p-3">
+<h2 class="mb-3">Honeypot Dashboard <span class="badge bg-secondary fs-6" id="liveStatus">connecting...</span></h2>
+
+<div class="card-container">
+<span class="btn btn-primary"><i class="fa fa-list"></i> Total <b id="cTotal">0</b></span>
+<span class="btn btn-success"><i class="fa fa-shield"></i> Benign <b id="cBenign">0</b></span>
+<span class="btn btn-danger"><i class="fa fa-skull-crossbones"></i> Malicious <b id="cMalicious">0</b></span>
+<span class="btn btn-warning"><i class="fa fa-clock"></i> Avg Flow <b id="cAvg">0</b></span>
+</div>
+
+<div class="row mb-3">
+<div class="col-md-6 chart-container"><canvas id="rateChart"></canvas></div>
+<div class="col-md-6 chart-container"><canvas id="flowChart"></canvas></div>
+</div>
+
+<form class="row g-2 mb-2" id="filters">
+<div class="col-auto"><select class="form-select" id="fLabel"><option value="">All labels</option><option>BENIGN</option><option>MALICIOUS</option></select></div>
+<div class="col-auto"><select class="form-select" id="fProto"><option value="">All protocols</option><option>TCP</option><option>UDP</option><option>ICMP</option><option>OTHER</option></select></div>
+<div class="col-auto"><input class="form-control" id="fIp" placeholder="Src or Dst IP"></div>
+<div class="col-auto"><button class="btn btn-outline-primary" type="submit">Filter</button></div>
+<div class="col-auto ms-auto">
+<button class="btn btn-outline-secondary" type="button" id="prev">&laquo;</button>
+<span id="pageInfo" class="mx-2"></span>
+<button class="btn btn-outline-secondary" type="button" id="next">&raquo;</button>
+</div>
+</form>
+
+<table id="packetTable" class="table table-bordered table-hover table-sm">
+<thead><tr><th>Timestamp</th><th>Label</th><th>Protocol</th><th>SrcIP</th><th>SrcPort</th><th>DstIP</th><th>DstPort</th><th>FlowDuration</th></tr></thead>
+<tbody></tbody>
+</table>
+</div>
+
+<script>
+const COLS = ["Timestamp","Label","Protocol","SrcIP","SrcPort","DstIP","DstPort","FlowDuration"];
+const SIZE = 50;
+let page = 0, total = 0;
+const tbody = document.querySelector('#packetTable tbody');
+
+function filters() {
+    return { label: fLabel.value, protocol: fProto.value, ip: fIp.value.trim() };
+}
+function matches(p, f) {
+    return (!f.label || p.Label === f.label) && (!f.protocol || p.Protocol === f.protocol)
+        && (!f.ip || p.SrcIP === f.ip || p.DstIP === f.ip);
+}
+function makeRow(p) {
+    const tr = document.createElement('tr');
+    tr.className = p.Label === 'BENIGN' ? 'benign-row' : 'malicious-row';
+    COLS.forEach(c => { const td = document.createElement('td'); td.textContent = p[c]; tr.appendChild(td); });
+    return tr;
+}
+function renderInfo() {
+    const pages = Math.max(1, Math.ceil(total / SIZE));
+    pageInfo.textContent = `page ${page + 1} / ${pages} (${total.toLocaleString()} rows)`;
+}
+async function loadPage() {
+    const q = new URLSearchParams({ ...filters(), page, size: SIZE });
+    const res = await (await fetch('/api/packets?' + q)).json();
+    total = res.total;
+    tbody.replaceChildren(...res.rows.map(makeRow));
+    renderInfo();
+}
+
+const rateChart = new Chart(document.getElementById('rateChart'), {
+    type: 'bar',
+    data: { labels: [], datasets: [
+        { label: 'Benign / s', data: [], backgroundColor: 'rgba(29,199,155,0.6)' },
+        { label: 'Malicious / s', data: [], backgroundColor: 'rgba(255,99,132,0.6)' } ] },
+    options: { animation: false, responsive: true, maintainAspectRatio: false,
+               scales: { x: { stacked: true, display: false }, y: { stacked: true, beginAtZero: true } } }
+});
+const flowChart = new Chart(document.getElementById('flowChart'), {
+    type: 'line',
+    data: { labels: [], datasets: [{ label: 'Avg Flow Duration (s)', data: [], borderColor: 'orange',
+             backgroundColor: 'rgba(255,165,0,0.2)', fill: true, tension: 0.3, pointRadius: 0 }] },
+    options: { animation: false, responsive: true, maintainAspectRatio: false, scales: { x: { display: false } } }
+});
+
+function renderCounters(c) {
+    cTotal.textContent = c.total.toLocaleString();
+    cBenign.textContent = c.benign.toLocaleString();
+    cMalicious.textContent = c.malicious.toLocaleString();
+    cAvg.textContent = c.avg_flow.toFixed(4);
+    const labels = c.timeline.map(b => new Date(b[0] * 1000).toLocaleTimeString());
+    rateChart.data.labels = labels;
+    rateChart.data.datasets[0].data = c.timeline.map(b => b[1]);
+    rateChart.data.datasets[1].data = c.timeline.map(b => b[2]);
+    rateChart.update();
+    flowChart.data.labels = labels;
+    flowChart.data.datasets[0].data = c.timeline.map(b => b[4] ? b[3] / b[4] : 0);
+    flowChart.update();
+}
+
+const events = new EventSource('/events');
+events.onopen = () => { liveStatus.textContent = 'live'; liveStatus.className = 'badge bg-success fs-6'; };
+events.onerror = () => { liveStatus.textContent = 'disconnected'; liveStatus.className = 'badge bg-danger fs-6'; };
+events.addEventListener('counters', e => renderCounters(JSON.parse(e.data)));
+events.addEventListener('packets', e => {
+    const f = filters();
+    const fresh = JSON.parse(e.data).filter(p => matches(p, f));
+    total += fresh.length;
+    if (page === 0 && fresh.length) {
+        // Only the first page moves; keep at most one page of rows in the DOM
+        tbody.prepend(...fresh.map(makeRow));
+        while (tbody.rows.length > SIZE) tbody.deleteRow(-1);
+    }
+    renderInfo();
+});
+
+document.getElementById('filters').addEventListener('submit', e => { e.preventDefault(); page = 0; loadPage(); });
+fLabel.addEventListener('change', () => { page = 0; loadPage(); });
+fProto.addEventListener('change', () => { page = 0; loadPage(); });
+prev.addEventListener('click', () => { if (page > 0) { page--; loadPage(); } });
+next.addEventListener('click', () => { if ((page + 1) * SIZE < total) { page++; loadPage(); } });
+
+fetch('/api/counters').then(r => r.json()).then(renderCounters);
+loadPage();
+</script>
+</body>
+</html>
+"""
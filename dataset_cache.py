@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# ---------------- Columnar dataset cache ----------------
+# load.py writes the cleaned dataset a second time as one raw binary file per
+# column plus schema.json (dtype, row count, label classes, and the CSV it was
+# built alongside). train.py opens the columns with np.memmap, so startup is
+# independent of the dataset size and only the columns / rows it touches are
+# read from disk. Features are stored as float32, the precision both XGBoost
+# and the sklearn trees train on; labels as uint8 codes in LabelEncoder order.
+
+CACHE_DIR = "dataset_cache"
+SCHEMA_FILE = "schema.json"
+FEATURE_DTYPE = np.float32
+LABEL_DTYPE = np.uint8
+
+
+def _column_file(name):
+    return "".join(c if c.isalnum() else "_" for c in name) + ".bin"
+
+
+class ColumnarCacheWriter:
+    """Append DataFrame chunks column by column; the cache only appears on close()."""
+
+    def __init__(self, path=CACHE_DIR, label_col="Label"):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.label_col = label_col
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.rows = 0
+        self._columns = None
+        self._files = {}
+        self._label_codes = {}  # label -> code in order of first appearance
+
+    def append(self, df):
+        if self._columns is None:
+            self._columns = [c for c in df.columns if c != self.label_col]
+            for col in self._columns + [self.label_col]:
+                self._files[col] = open(os.path.join(self.tmp_path, _column_file(col)), "wb")
+        for col in self._columns:
+            np.ascontiguousarray(df[col].to_numpy(), dtype=FEATURE_DTYPE).tofile(self._files[col])
+        labels = df[self.label_col].astype(str).to_numpy()
+        uniq, inverse = np.unique(labels, return_inverse=True)
+        codes = np.array([self._label_codes.setdefault(label, len(self._label_codes)) for label in uniq],
+                         dtype=LABEL_DTYPE)
+        codes[inverse].tofile(self._files[self.label_col])
+        self.rows += len(df)
+
+    def close(self, source=None):
+        """Finish the files, write the schema and move the cache into place.
+
+        `source` is the CSV written alongside; its size and mtime are recorded so
+        readers can tell when the cache is stale.
+        """
+        for f in self._files.values():
+            f.close()
+        classes = sorted(self._label_codes)
+        if self.rows:
+            # Renumber label codes to sorted order, the order LabelEncoder assigns
+            lut = np.zeros(max(len(classes), 1), dtype=LABEL_DTYPE)
+            for code, label in enumerate(classes):
+                lut[self._label_codes[label]] = code
+            labels = np.memmap(os.path.join(self.tmp_path, _column_file(self.label_col)),
+                               dtype=LABEL_DTYPE, mode="r+", shape=(self.rows,))
+            labels[:] = lut[labels]
+            labels.flush()
+            del labels
+        schema = {
+            "rows": self.rows,
+            "features": {col: {"file": _column_file(col), "dtype": np.dtype(FEATURE_DTYPE).str}
+                         for col in self._columns or []},
+            "label": {"name": self.label_col, "file": _column_file(self.label_col),
+                      "dtype": np.dtype(LABEL_DTYPE).str, "classes": classes},
+            "source": _source_stamp(source) if source else None,
+        }
+        with open(os.path.join(self.tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {"path": os.path.basename(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def read_schema(path=CACHE_DIR):
+    with open(os.path.join(path, SCHEMA_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cache_is_fresh(path=CACHE_DIR, source=None):
+    """True if the cache exists and was built from the current version of `source` (if that exists)."""
+    try:
+        schema = read_schema(path)
+    except (OSError, ValueError):
+        return False
+    if source is None or not os.path.exists(source):
+        return True
+    return schema.get("source") == _source_stamp(source)
+
+
+def open_cache(path=CACHE_DIR):
+    """Memory-map the cache: ({feature: array}, label codes, class names). Nothing is read yet."""
+    schema = read_schema(path)
+    rows = schema["rows"]
+
+    def mapped(spec):
+        if rows == 0:
+            return np.empty(0, dtype=spec["dtype"])
+        return np.memmap(os.path.join(path, spec["file"]), dtype=spec["dtype"], mode="r", shape=(rows,))
+
+    columns = {name: mapped(spec) for name, spec in schema["features"].items()}
+    return columns, mapped(schema["label"]), schema["label"]["classes"]
@@ -0,0 +1,246 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import ExtraTreesClassifier
+from xgboost import XGBClassifier
+
+from dataset_cache import cache_is_fresh, open_cache
+from tree_eval import export_trees
+from training_utils import RoundTimer, encode_categories, peak_rss_mb
+
+# ---------------- Out-of-core training ----------------
+# Trains the same model as train.py without ever holding the dataset in RAM.
+# Rows are streamed in batches, from the memory-mapped columnar cache when it
+# is fresh or from the CSV in chunks otherwise:
+#   pass 1: reservoir sample for the ExtraTrees feature selection
+#   pass 2: XGBoost's DataIter -> ExtMemQuantileDMatrix, which quantises each
+#           batch and keeps the pages on disk (train and test are separate
+#           iterators over the same batches, split by a hash of the row number)
+# The memory budget sizes the batches and the reservoir.
+
+MEMORY_BUDGET_MB = 1024
+BATCH_SHARE = 0.10        # of the budget, per batch of rows in flight
+SAMPLE_SHARE = 0.5        # of the budget, for the feature-selection sample and its ExtraTrees
+ET_TREES = 30
+SMALL_DATASET = 500_000   # below this the whole dataset is the sample (as in train.py)
+TOP_FEATURES = 12
+TEST_SIZE = 0.2
+SEED = 42
+
+
+class BatchSource:
+    """Row batches as (float32 features, label codes, first row number)."""
+
+    def __init__(self, cache_dir, csv_path, label_col="Label"):
+        self.label_col = label_col
+        self.csv_path = csv_path
+        self.batch_rows = 100_000
+        if cache_is_fresh(cache_dir, csv_path):
+            self.columns, self.labels, self.classes = open_cache(cache_dir)
+            self.features = list(self.columns)
+            self.rows = len(self.labels)
+            self.kind = f"columnar cache {cache_dir}/"
+        else:
+            self.columns = None
+            header = pd.read_csv(csv_path, nrows=0).columns
+            self.features = [c for c in header if c != label_col]
+            # Label classes and the non-numeric feature columns up front, so codes match the
+            # LabelEncoder ones train.py assigns over the whole file
+            classes = set()
+            categorical = set()
+            self.rows = 0
+            for chunk in pd.read_csv(csv_path, chunksize=self.batch_rows, low_memory=False):
+                classes.update(chunk[label_col].astype(str).unique())
+                categorical.update(c for c in self.features if not pd.api.types.is_numeric_dtype(chunk[c]))
+                self.rows += len(chunk)
+            self.classes = sorted(classes)
+            self.categories = self._categories(sorted(categorical))
+            self.kind = csv_path
+
+    def _categories(self, columns):
+        """Sorted distinct values (as strings) of each non-numeric column: a second pass over just those."""
+        if not columns:
+            return {}
+        values = {col: set() for col in columns}
+        for chunk in pd.read_csv(self.csv_path, usecols=columns, dtype=str, chunksize=1_000_000):
+            for col in columns:
+                values[col].update(chunk[col].astype(str).unique())
+        return {col: np.array(sorted(v)) for col, v in values.items()}
+
+    def batches(self, features):
+        if self.columns is not None:
+            n = len(self.labels)
+            for start in range(0, n, self.batch_rows):
+                end = min(start + self.batch_rows, n)
+                X = np.empty((end - start, len(features)), dtype=np.float32)
+                for j, col in enumerate(features):
+                    X[:, j] = self.columns[col][start:end]
+                yield X, np.asarray(self.labels[start:end]), start
+            return
+        start = 0
+        classes = np.array(self.classes)
+        categorical = {col: self.categories[col] for col in features if col in self.categories}
+        for chunk in pd.read_csv(self.csv_path, usecols=list(features) + [self.label_col],
+                                 dtype={col: str for col in categorical},
+                                 chunksize=self.batch_rows, low_memory=False):
+            X = np.empty((len(chunk), len(features)), dtype=np.float32)
+            for j, col in enumerate(features):
+                if col in categorical:
+                    X[:, j] = encode_categories(chunk[col], categorical[col])
+                else:
+                    X[:, j] = chunk[col].fillna(0).to_numpy()
+            y = np.searchsorted(classes, chunk[self.label_col].astype(str).to_numpy())
+            yield X, y, start
+            start += len(chunk)
+
+
+def test_mask(start, n, test_size=TEST_SIZE, seed=SEED):
+    """Deterministic train/test assignment from the row number (independent of batch size)."""
+    rows = np.arange(start, start + n, dtype=np.uint64) + np.uint64(seed)
+    mixed = (rows * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)
+    return mixed.astype(np.float64) / float(1 << 24) < test_size
+
+
+class SplitIter(xgb.DataIter):
+    """One side of the train/test split, streamed batch by batch into XGBoost."""
+
+    def __init__(self, source, features, test, cache_prefix):
+        self.source = source
+        self.features = features
+        self.test = test
+        self.rows = 0
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix, release_data=True)
+
+    def reset(self):
+        self._it = None
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = self.source.batches(self.features)
+            self.rows = 0
+        batch = next(self._it, None)
+        if batch is None:
+            return False
+        X, y, start = batch
+        keep = test_mask(start, len(y))
+        if not self.test:
+            keep = ~keep
+        self.rows += int(keep.sum())
+        input_data(data=X[keep], label=y[keep])
+        return True
+
+
+def reservoir_sample(source, k, seed=SEED):
+    """Uniform sample of k rows over all batches in one pass (Algorithm R, vectorised per batch)."""
+    rng = np.random.default_rng(seed)
+    sample_X = np.empty((k, len(source.features)), dtype=np.float32)
+    sample_y = np.empty(k, dtype=np.int64)
+    seen = 0
+    for X, y, _ in source.batches(source.features):
+        n = len(y)
+        fill = min(max(k - seen, 0), n)
+        sample_X[seen:seen + fill] = X[:fill]
+        sample_y[seen:seen + fill] = y[:fill]
+        if fill < n:
+            # row number t replaces slot j ~ U[0, t] when j < k; later rows win ties, as in the serial loop
+            t = np.arange(seen + fill, seen + n)
+            j = (rng.random(n - fill) * (t + 1)).astype(np.int64)
+            hit = j < k
+            sample_X[j[hit]] = X[fill:][hit]
+            sample_y[j[hit]] = y[fill:][hit]
+        seen += n
+    kept = min(seen, k)
+    return sample_X[:kept], sample_y[:kept], seen
+
+
+def train_out_of_core(data_file, cache_dir, model_file, features_file, log_file,
+                      memory_budget_mb=MEMORY_BUDGET_MB, n_estimators=20):
+    start_time = time.time()
+    source = BatchSource(cache_dir, data_file)
+    budget = memory_budget_mb * 1024 * 1024
+    row_bytes = 4 * len(source.features) + 8
+    source.batch_rows = max(1_000, int(budget * BATCH_SHARE / row_bytes))
+    # Fully grown ExtraTrees hold ~2 nodes per sampled row per tree (node record + class values)
+    sample_row_bytes = row_bytes + ET_TREES * 2 * (64 + 8 * len(source.classes))
+    k = max(1_000, int(budget * SAMPLE_SHARE / sample_row_bytes))
+    k = min(k, source.rows if source.rows <= SMALL_DATASET else source.rows // 10)
+    print(f"📂 Streaming {source.kind} in batches of {source.batch_rows:,} rows "
+          f"(memory budget {memory_budget_mb:,} MB)")
+
+    # 🔍 Feature selection on a reservoir sample
+    print(f"🔍 Finding top features (ExtraTrees) on a reservoir sample of up to {k:,} rows...")
+    X_sample, y_sample, total_rows = reservoir_sample(source, k)
+    model_et = ExtraTreesClassifier(n_estimators=ET_TREES, random_state=SEED, n_jobs=-1)
+    model_et.fit(pd.DataFrame(X_sample, columns=source.features), y_sample)
+    indices = np.argsort(model_et.feature_importances_)[::-1][:TOP_FEATURES]
+    del X_sample, y_sample, model_et
+    selected_features = [source.features[i] for i in indices]
+    print(f"🏆 Selected top features: {selected_features} ({total_rows:,} rows scanned)")
+    with open(features_file, "wb") as f:
+        pickle.dump(selected_features, f)
+
+    # ⚡ Quantised, disk-backed training matrices
+    n_classes = len(source.classes)
+    error_metric = "merror" if n_classes > 2 else "error"
+    params = {
+        "max_depth": 4,
+        "learning_rate": 0.1,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "tree_method": "hist",
+        "seed": SEED,
+        "verbosity": 0,
+        "eval_metric": ["mlogloss" if n_classes > 2 else "logloss", error_metric],
+    }
+    if n_classes > 2:
+        params.update(objective="multi:softprob", num_class=n_classes)
+    else:
+        params.update(objective="binary:logistic")
+
+    scratch = tempfile.mkdtemp(prefix="xgb-extmem-")
+    try:
+        print("⚡ Building external-memory matrices and training XGBoost...")
+        train_it = SplitIter(source, selected_features, False, os.path.join(scratch, "train"))
+        test_it = SplitIter(source, selected_features, True, os.path.join(scratch, "test"))
+        dtrain = xgb.ExtMemQuantileDMatrix(train_it)
+        dtest = xgb.ExtMemQuantileDMatrix(test_it, ref=dtrain)
+        timer = RoundTimer()
+        evals = {}
+        booster = xgb.train(params, dtrain, num_boost_round=n_estimators,
+                            evals=[(dtrain, "validation_0"), (dtest, "validation_1")],
+                            evals_result=evals, callbacks=[timer], verbose_eval=False)
+        print(f"✂ {train_it.rows:,} train / {test_it.rows:,} test rows")
+        del dtrain, dtest
+
+        # Same artifact type as the in-memory path so the redirector can load it unchanged
+        model_json = os.path.join(scratch, "model.json")
+        booster.save_model(model_json)
+        model = XGBClassifier()
+        model.load_model(model_json)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    history = {
+        "time": timer.times,
+        "train_acc": [1.0 - e for e in evals["validation_0"][error_metric]],
+        "test_acc": [1.0 - e for e in evals["validation_1"][error_metric]],
+    }
+    with open(log_file, "w") as f:
+        json.dump(history, f)
+    with open(model_file, "wb") as f:
+        pickle.dump(model, f)
+    export_trees(model)
+
+    print(f"✅ Model trained & saved as {model_file}")
+    print(f"📊 Final Test Accuracy: {history['test_acc'][-1] * 100:.2f}%")
+    print(f"⏱ Total training time: {time.time() - start_time:.2f} sec, peak RSS {peak_rss_mb():,.0f} MB")
+    print(f"📝 Training log saved to {log_file}")
+    return model
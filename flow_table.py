@@ -0,0 +1,181 @@
+import sys
+from collections import OrderedDict
+
+from scapy.all import IP, TCP, UDP
+
+# ---------------- Bidirectional flow table ----------------
+# Tracks CICIDS-style flow counters per 5-tuple so the model sees real flow
+# features at capture time. Every packet is one dict lookup plus a handful of
+# integer updates. The table is kept in least-recently-active order, so idle
+# flows are evicted from the front without scanning.
+
+IDLE_TIMEOUT = 120.0      # seconds without packets before a flow is expired
+ACTIVE_TIMEOUT = 1800.0   # a long-lived flow is cut and restarted after this long
+MAX_FLOWS = 200_000       # hard cap on concurrent flows (LRU eviction beyond this)
+
+FIN = 0x01
+RST = 0x04
+
+
+class Flow:
+    __slots__ = ("first_seen", "last_seen", "proto", "dst_port",
+                 "fwd_pkts", "bwd_pkts", "fwd_bytes", "bwd_bytes", "flags")
+
+    def __init__(self, ts, proto, dst_port):
+        self.first_seen = ts
+        self.last_seen = ts
+        self.proto = proto
+        self.dst_port = dst_port
+        self.fwd_pkts = 0
+        self.bwd_pkts = 0
+        self.fwd_bytes = 0
+        self.bwd_bytes = 0
+        self.flags = 0
+
+    def duration_us(self):
+        return (self.last_seen - self.first_seen) * 1e6
+
+    def bytes_per_sec(self):
+        d = self.last_seen - self.first_seen
+        return (self.fwd_bytes + self.bwd_bytes) / d if d > 0 else 0.0
+
+    def packets_per_sec(self):
+        d = self.last_seen - self.first_seen
+        return (self.fwd_pkts + self.bwd_pkts) / d if d > 0 else 0.0
+
+
+# CICIDS column name -> value computed from a Flow (names as used by load.py)
+FEATURE_GETTERS = {
+    "Destination Port": lambda f: f.dst_port,
+    "Protocol": lambda f: f.proto,
+    "Flow Duration": Flow.duration_us,
+    "Total Fwd Packets": lambda f: f.fwd_pkts,
+    "Total Backward Packets": lambda f: f.bwd_pkts,
+    "Total Length of Fwd Packets": lambda f: f.fwd_bytes,
+    "Total Length of Bwd Packets": lambda f: f.bwd_bytes,
+    "Flow Bytes/s": Flow.bytes_per_sec,
+    "Flow Packets/s": Flow.packets_per_sec,
+}
+
+
+def packet_key(packet):
+    """Return (src, dst, sport, dport, proto) and payload length for an IP packet."""
+    ip = packet[IP]
+    if TCP in packet:
+        l4 = packet[TCP]
+    elif UDP in packet:
+        l4 = packet[UDP]
+    else:
+        return (ip.src, ip.dst, 0, 0, ip.proto), len(ip.payload)
+    return (ip.src, ip.dst, l4.sport, l4.dport, ip.proto), len(l4.payload)
+
+
+class FlowTable:
+    """5-tuple keyed flow counters with idle/active timeouts and a size cap."""
+
+    def __init__(self, feature_names, idle_timeout=IDLE_TIMEOUT,
+                 active_timeout=ACTIVE_TIMEOUT, max_flows=MAX_FLOWS):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_flows = max_flows
+        self._getters = [FEATURE_GETTERS.get(name) for name in feature_names]
+        self._flows = OrderedDict()
+
+        self.peak_flows = 0
+        self.evicted_idle = 0
+        self.evicted_active = 0
+        self.evicted_full = 0
+        self.closed = 0
+
+    def __len__(self):
+        return len(self._flows)
+
+    def update(self, packet):
+        """Account one IP packet to its flow and return the flow's feature row."""
+        key, length = packet_key(packet)
+        flags = int(packet[TCP].flags) if TCP in packet else 0
+        return self.update_meta(key, float(getattr(packet, "time", 0)), length, flags)
+
+    def update_meta(self, key, ts, length, flags=0):
+        """Same as update() but from pre-parsed packet metadata (used by the pipeline workers)."""
+        pkt_key = key
+        flow = self._flows.get(key)
+        forward = True
+        if flow is None:
+            rkey = (key[1], key[0], key[3], key[2], key[4])
+            flow = self._flows.get(rkey)
+            if flow is not None:
+                key, forward = rkey, False
+
+        if flow is not None and ts - flow.first_seen > self.active_timeout:
+            del self._flows[key]
+            self.evicted_active += 1
+            flow = None
+            key, forward = pkt_key, True
+
+        if flow is None:
+            self._expire_idle(ts)
+            if len(self._flows) >= self.max_flows:
+                self._flows.popitem(last=False)
+                self.evicted_full += 1
+            flow = Flow(ts, key[4], key[3])
+            self._flows[key] = flow
+            if len(self._flows) > self.peak_flows:
+                self.peak_flows = len(self._flows)
+        else:
+            self._flows.move_to_end(key)
+
+        if ts > flow.last_seen:
+            flow.last_seen = ts
+        if forward:
+            flow.fwd_pkts += 1
+            flow.fwd_bytes += length
+        else:
+            flow.bwd_pkts += 1
+            flow.bwd_bytes += length
+        flow.flags |= flags
+
+        row = [g(flow) if g else 0 for g in self._getters]
+
+        # Like CICFlowMeter, a FIN or RST terminates the flow
+        if flow.flags & (FIN | RST):
+            del self._flows[key]
+            self.closed += 1
+        return row
+
+    def _expire_idle(self, now):
+        flows = self._flows
+        while flows:
+            key, flow = next(iter(flows.items()))
+            if now - flow.last_seen <= self.idle_timeout:
+                break
+            del flows[key]
+            self.evicted_idle += 1
+
+    @staticmethod
+    def bytes_per_flow():
+        """Approximate memory held per tracked flow (record + key + table slot)."""
+        sample_key = ("255.255.255.255", "255.255.255.255", 65535, 65535, 6)
+        key_bytes = sys.getsizeof(sample_key) + 2 * sys.getsizeof(sample_key[0])
+        return sys.getsizeof(Flow(0.0, 6, 0)) + key_bytes + 100  # ~100 B OrderedDict entry
+
+    def stats(self):
+        per_flow = self.bytes_per_flow()
+        return {
+            "active_flows": len(self._flows),
+            "peak_flows": self.peak_flows,
+            "max_flows": self.max_flows,
+            "bytes_per_flow": per_flow,
+            "max_bytes": per_flow * self.max_flows,
+            "evicted_idle": self.evicted_idle,
+            "evicted_active": self.evicted_active,
+            "evicted_full": self.evicted_full,
+            "closed": self.closed,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"🔀 Flows: {s['active_flows']:,} active (peak {s['peak_flows']:,} / cap {s['max_flows']:,}), "
+              f"~{s['bytes_per_flow']} B/flow, bound {s['max_bytes'] / 1e6:.1f} MB, "
+              f"evicted idle={s['evicted_idle']:,} active={s['evicted_active']:,} "
+              f"full={s['evicted_full']:,}, closed={s['closed']:,}")
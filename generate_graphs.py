@@ -136,30 +136,77 @@ import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-import json
+from ndjson_log import iter_packet_log, log_segments
+from rollup import load_rollups, summarize, ROLLUP_PREFIX
+from packet_store import load_packet_store, int_to_ip, PACKET_STORE_FILE
 
 # -----------------------------
-# Load packet log
+# Load packet statistics: from the redirector's rollup buckets when present
+# (constant work however many packets were captured), then from the columns
+# of its saved packet store (recent window), otherwise by streaming the
+# NDJSON log line by line (legacy JSON as fallback)
 # -----------------------------
 JSON_FILE = 'packet_log.json'
-if os.path.exists(JSON_FILE):
-    with open(JSON_FILE, 'r') as f:
-        packet_log = json.load(f)
-    packet_df = pd.DataFrame(packet_log)
-    if packet_df.empty:
-        print("❌ packet_log.json is empty, using dummy data")
+NDJSON_FILE = 'packet_log.ndjson'
+rollups = load_rollups(ROLLUP_PREFIX, '1m')
+if 0 < len(rollups) <= 60:
+    rollups = load_rollups(ROLLUP_PREFIX, '1s')  # less than an hour captured: per-second trend
+if len(rollups):
+    summary = summarize(load_rollups(ROLLUP_PREFIX, '1h'))
+    benign_count, malicious_count = summary['benign'], summary['malicious']
+    raw_size = cleaned_size = summary['total']
+    times = rollups['start'] - rollups['start'][0]
+    bucket_total = rollups['benign'].astype(np.int64) + rollups['malicious']
+    cumulative_accuracy = np.cumsum(rollups['benign']) / np.maximum(np.cumsum(bucket_total), 1)
+    protocols = pd.Series(summary['protocols'])
+    protocols = protocols[protocols > 0].sort_values(ascending=False)
+    top_ips = pd.Series(dict(summary['top_ips']))
+elif os.path.exists(PACKET_STORE_FILE):
+    columns, tables = load_packet_store(PACKET_STORE_FILE)
+    label_counts = np.bincount(columns['label'], minlength=len(tables['labels']))
+    benign_count = int(label_counts[tables['labels'].index('BENIGN')])
+    malicious_count = int(label_counts[tables['labels'].index('MALICIOUS')])
+    raw_size = cleaned_size = len(columns['label'])
+    times = columns['time'] - columns['time'][0] if raw_size else np.zeros(0)
+    benign = columns['label'] == tables['labels'].index('BENIGN')
+    cumulative_accuracy = np.cumsum(benign) / np.arange(1, raw_size + 1)
+    protocols = pd.Series(np.bincount(columns['proto'], minlength=len(tables['protocols'])),
+                          index=tables['protocols'])
+    protocols = protocols[protocols > 0].sort_values(ascending=False)
+    ips, ip_counts = np.unique(columns['src'], return_counts=True)
+    top = np.argsort(ip_counts)[::-1][:10]
+    top_ips = pd.Series(ip_counts[top], index=[int_to_ip(ip) for ip in ips[top]])
+else:
+    if log_segments(NDJSON_FILE) or os.path.exists(JSON_FILE):
+        packet_df = pd.DataFrame.from_records(iter_packet_log(NDJSON_FILE, JSON_FILE))
+        if packet_df.empty:
+            print("❌ packet log is empty, using dummy data")
+            labels = ['BENIGN']*60 + ['MALICIOUS']*40
+            packet_df = pd.DataFrame({'Label': labels})
+    else:
+        print("❌ packet log not found, using dummy data")
         labels = ['BENIGN']*60 + ['MALICIOUS']*40
         packet_df = pd.DataFrame({'Label': labels})
-else:
-    print("❌ packet_log.json not found, using dummy data")
-    labels = ['BENIGN']*60 + ['MALICIOUS']*40
-    packet_df = pd.DataFrame({'Label': labels})
 
-# -----------------------------
-# Packet counts
-# -----------------------------
-benign_count = (packet_df['Label'] == 'BENIGN').sum()
-malicious_count = (packet_df['Label'] == 'MALICIOUS').sum()
+    # Packet counts
+    benign_count = (packet_df['Label'] == 'BENIGN').sum()
+    malicious_count = (packet_df['Label'] == 'MALICIOUS').sum()
+    raw_size = len(packet_df)
+    cleaned_size = len(packet_df.dropna())
+
+    if 'Timestamp' in packet_df.columns:
+        packet_df['Timestamp'] = pd.to_datetime(packet_df['Timestamp'])
+        times = (packet_df['Timestamp'] - packet_df['Timestamp'].iloc[0]).dt.total_seconds()
+    else:
+        times = np.arange(len(packet_df))
+
+    # Cumulative stats for trend
+    cumulative_total = np.arange(1, len(packet_df)+1)
+    cumulative_benign = packet_df['Label'].eq('BENIGN').cumsum()
+    cumulative_accuracy = cumulative_benign / cumulative_total  # percentage of benign packets
+
+    protocols = packet_df['Protocol'].value_counts() if 'Protocol' in packet_df.columns else None
+    top_ips = packet_df['SrcIP'].value_counts().head(10) if 'SrcIP' in packet_df.columns else None
 
 # -----------------------------
 # Create output folder
@@ -170,8 +217,6 @@ os.makedirs(output_folder, exist_ok=True)
 # -----------------------------
 # 1️⃣ Dataset Size
 # -----------------------------
-raw_size = len(packet_df)
-cleaned_size = len(packet_df.dropna())
 plt.figure(figsize=(8,6))
 plt.bar(['Raw','Cleaned'], [raw_size, cleaned_size], color='blue')
 plt.title('Dataset Size')
@@ -196,18 +241,6 @@ plt.close()
 # -----------------------------
 # 3️⃣ Real-Time Packet Classification Trend
 # -----------------------------
-if 'Timestamp' in packet_df.columns:
-    packet_df['Timestamp'] = pd.to_datetime(packet_df['Timestamp'])
-    times = (packet_df['Timestamp'] - packet_df['Timestamp'].iloc[0]).dt.total_seconds()
-else:
-    times = np.arange(len(packet_df))
-
-# Cumulative stats for trend
-cumulative_total = np.arange(1, len(packet_df)+1)
-cumulative_benign = packet_df['Label'].eq('BENIGN').cumsum()
-cumulative_malicious = packet_df['Label'].eq('MALICIOUS').cumsum()
-cumulative_accuracy = cumulative_benign / cumulative_total  # percentage of benign packets
-
 plt.figure(figsize=(10,6))
 plt.step(times, cumulative_accuracy, where='mid', color='purple', alpha=0.7, label='Benign Ratio')
 plt.scatter(times, cumulative_accuracy, color='purple')
@@ -238,8 +271,7 @@ plt.close()
 # -----------------------------
 # 5️⃣ Protocol Distribution
 # -----------------------------
-if 'Protocol' in packet_df.columns:
-    protocols = packet_df['Protocol'].value_counts()
+if protocols is not None:
     plt.figure(figsize=(8,6))
     protocols.plot(kind='bar', color='orange')
     plt.title('Protocol Distribution')
@@ -251,8 +283,7 @@ if 'Protocol' in packet_df.columns:
 # -----------------------------
 # 6️⃣ Source IP Distribution (Top 10)
 # -----------------------------
-if 'SrcIP' in packet_df.columns:
-    top_ips = packet_df['SrcIP'].value_counts().head(10)
+if top_ips is not None and len(top_ips):
     plt.figure(figsize=(10,6))
     top_ips.plot(kind='barh', color='brown')
     plt.title('Top 10 Source IPs')
@@ -0,0 +1,166 @@
+import queue
+import select
+import socket
+import threading
+
+# ---------------- Redirector -> honeypot channel ----------------
+# One long-lived TCP connection carrying newline-framed UTF-8 messages.
+# The capture side only does a non-blocking put() on a bounded queue; a
+# background thread owns the socket, coalesces queued messages into a single
+# sendall() and reconnects with backoff if the honeypot goes away. Before
+# each write it drains the honeypot's ack and checks for EOF: a sendall()
+# into a connection the server already closed "succeeds" and loses the data.
+
+QUEUE_SIZE = 10_000        # alerts waiting to be sent before new ones are dropped
+MAX_COALESCE = 256         # messages written per sendall()
+CONNECT_TIMEOUT = 2.0
+RECONNECT_MIN = 0.1        # reconnect backoff (s), doubles up to RECONNECT_MAX
+RECONNECT_MAX = 5.0
+MAX_MESSAGE = 64 * 1024    # reader: longest line accepted before it is cut
+
+
+def frame(message):
+    """Encode one message as a single newline-terminated line."""
+    return message.replace("\r", " ").replace("\n", " ").encode("utf-8", errors="ignore") + b"\n"
+
+
+def read_messages(conn, bufsize=65536):
+    """Yield every newline-framed message on a connection until EOF.
+
+    A trailing message without a newline (e.g. an old one-shot client that
+    sends and closes) is still delivered at EOF.
+    """
+    buf = b""
+    while True:
+        chunk = conn.recv(bufsize)
+        if not chunk:
+            break
+        buf += chunk
+        if b"\n" not in buf:
+            if len(buf) > MAX_MESSAGE:
+                yield buf.decode("utf-8", errors="ignore")
+                buf = b""
+            continue
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line:
+                yield line.decode("utf-8", errors="ignore")
+    if buf.strip():
+        yield buf.decode("utf-8", errors="ignore")
+
+
+class HoneypotChannel:
+    """Bounded queue + background sender over one persistent honeypot connection."""
+
+    def __init__(self, host, port, queue_size=QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._sock = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, message):
+        """Queue a message; never blocks. Returns False if it had to be dropped."""
+        try:
+            self._queue.put_nowait(frame(message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=2.0):
+        """Flush what can be sent within `timeout`, then drop the rest."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._stop.set()
+        self._thread.join(1.0)
+        if self._sock is not None:
+            # Half-close and drain the honeypot's ack so the close is clean (FIN, not RST)
+            try:
+                self._sock.shutdown(socket.SHUT_WR)
+                self._sock.settimeout(timeout)
+                while self._sock.recv(4096):
+                    pass
+            except OSError:
+                pass
+            self._sock.close()
+
+    def _connect(self):
+        delay = RECONNECT_MIN
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(None)
+                return sock
+            except OSError as e:
+                self.errors += 1
+                print(f"❌ Honeypot unreachable ({e}), retrying in {delay:.1f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+        return None
+
+    def _peer_open(self):
+        """Drain whatever the honeypot sent (its ack) without blocking; False once it has closed."""
+        try:
+            while select.select([self._sock], [], [], 0)[0]:
+                if not self._sock.recv(4096):
+                    return False
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < MAX_COALESCE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            data = b"".join(batch)
+
+            while True:
+                if self._sock is None:
+                    self._sock = self._connect()
+                    if self._sock is None:  # shutting down while disconnected
+                        self.dropped += len(batch)
+                        return
+                elif not self._peer_open():
+                    self.reconnects += 1  # e.g. the honeypot's idle timeout; not an error
+                    self._sock.close()
+                    self._sock = None
+                    continue
+                try:
+                    self._sock.sendall(data)
+                    self.sent += len(batch)
+                    break
+                except OSError:
+                    self.errors += 1
+                    self.reconnects += 1
+                    self._sock.close()
+                    self._sock = None
+
+    def report(self):
+        print(f"🍯 Honeypot channel: sent={self.sent:,} dropped={self.dropped:,} "
+              f"reconnects={self.reconnects:,} errors={self.errors:,} queued={self._queue.qsize():,}")
@@ -0,0 +1,235 @@
+import ctypes
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+from metrics import MetricsRegistry, start_metrics_server
+
+# ---------------- Multi-process, multi-port honeypot ----------------
+#
+#   SO_REUSEPORT listeners ──> worker x N (asyncio, every port) ──(queue)──> LogSink (parent)
+#
+# Every worker binds its own listening socket on every decoy port with
+# SO_REUSEPORT, so the kernel spreads incoming connections across the
+# workers (no shared accept queue, no thundering herd) and each worker runs
+# its own interpreter and event loop. Workers don't open the log files:
+# they batch (timestamp, message, malicious) records onto one queue and the
+# parent's LogSink stays the single writer of honeypot_log.txt and
+# malicious_log.txt (same line format, rotation and fsync policy). Counters
+# live in shared memory, one slot per worker and port with a single writer,
+# and are summed by the parent for reports and /metrics. CTRL+C or SIGTERM
+# to the parent stops the workers cleanly; if the parent dies anyway the
+# kernel terminates them (PR_SET_PDEATHSIG), so no orphan keeps the ports.
+#
+#   python simple_honeypot.py --workers 4 --ports 22 23 80 445 9999
+
+DECOY_PORTS = (22, 23, 80, 445, 3389)
+LOG_QUEUE_SIZE = 1024      # record batches waiting for the parent's log writer
+LOG_BATCH_SIZE = 256       # records a worker sends per queue put
+LOG_FLUSH_INTERVAL = 0.1   # ...or after this long (s)
+PR_SET_PDEATHSIG = 1
+
+
+def reuseport_listener(host, port, backlog, listen=True):
+    """TCP socket bound with SO_REUSEPORT: one per worker, the kernel balances between them."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((host, port))
+        if listen:
+            sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+# ---------------- Shared counters ----------------
+class ClusterCounters:
+    """Per-worker, per-port counters in shared memory; every slot has a single writer."""
+
+    FIELDS = ("accepted", "closed", "refused", "benign", "malicious", "errors")
+
+    def __init__(self, workers, ports):
+        self.workers = workers
+        self.ports = list(ports)
+        self._port_index = {port: i for i, port in enumerate(self.ports)}
+        self._arrays = {name: mp.RawArray("Q", workers * len(self.ports)) for name in self.FIELDS}
+
+    def inc(self, name, worker, port, n=1):
+        self._arrays[name][worker * len(self.ports) + self._port_index[port]] += n
+
+    def total(self, name):
+        return sum(self._arrays[name])
+
+    def by_port(self, name):
+        values = self._arrays[name]
+        n = len(self.ports)
+        return {port: sum(values[i::n]) for i, port in enumerate(self.ports)}
+
+    def by_worker(self, name):
+        values = self._arrays[name]
+        n = len(self.ports)
+        return [sum(values[w * n:(w + 1) * n]) for w in range(self.workers)]
+
+    def registry(self):
+        """Prometheus metrics for the cluster, summed from the shared slots at scrape time."""
+        registry = MetricsRegistry()
+        for port in self.ports:
+            registry.counter("honeypot_connections_total", "Connections accepted",
+                             lambda port=port: self._sum("accepted", port=port), port=port)
+            registry.counter("honeypot_connections_closed_total", "Connections closed",
+                             lambda port=port: self._sum("closed", port=port), port=port)
+            registry.counter("honeypot_refused_total", "Connections refused over the connection cap",
+                             lambda port=port: self._sum("refused", port=port), port=port)
+            for label in ("BENIGN", "MALICIOUS"):
+                registry.counter("honeypot_messages_total", "Messages received per label",
+                                 lambda port=port, name=label.lower(): self._sum(name, port=port),
+                                 port=port, label=label)
+            registry.counter("honeypot_errors_total", "Connections ended by an unexpected exception",
+                             lambda port=port: self._sum("errors", port=port), port=port)
+        for worker in range(self.workers):
+            registry.counter("honeypot_worker_connections_total", "Connections accepted per worker process",
+                             lambda worker=worker: self._sum("accepted", worker=worker), worker=worker)
+        return registry
+
+    def _sum(self, name, port=None, worker=None):
+        if port is not None:
+            return self.by_port(name)[port]
+        return self.by_worker(name)[worker]
+
+    def report(self):
+        t = {name: self.total(name) for name in self.FIELDS}
+        print(f"🍯 Honeypot cluster: {self.workers} workers x {len(self.ports)} ports, "
+              f"accepted={t['accepted']:,} refused={t['refused']:,} errors={t['errors']:,}, "
+              f"messages benign={t['benign']:,} malicious={t['malicious']:,}")
+        accepted, malicious = self.by_port("accepted"), self.by_port("malicious")
+        print("   per port:   " + ", ".join(f"{port}={accepted[port]:,}"
+                                            + (f" ({malicious[port]:,} malicious)" if malicious[port] else "")
+                                            for port in self.ports))
+        print("   per worker: " + ", ".join(f"{n:,}" for n in self.by_worker("accepted")))
+
+
+# ---------------- Worker -> parent logging ----------------
+class QueueLogSink:
+    """LogSink stand-in for a worker process: batches records onto the parent's log queue."""
+
+    def __init__(self, log_queue, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self._queue = log_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def log(self, message, malicious=False):
+        """Timestamp one event here (as LogSink does) and queue it for the parent."""
+        with self._lock:
+            self._batch.append((datetime.now(), message, malicious))
+            if len(self._batch) < self.batch_size:
+                return
+            batch, self._batch = self._batch, []
+        self._queue.put(batch)  # blocks while the parent is behind: back-pressure, not lost logs
+
+    def _flush(self):
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._queue.put(batch)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._flush()
+        self._queue.put(None)  # this worker is done
+
+
+def _write_logs(log_queue, log_sink, workers):
+    running = workers
+    while running:
+        batch = log_queue.get()
+        if batch is None:
+            running -= 1
+            continue
+        log_sink.log_records(batch)
+
+
+# ---------------- Orchestration ----------------
+def _exit_with_parent(parent):
+    """Have the kernel SIGTERM this process when `parent` dies, even by SIGKILL (Linux)."""
+    try:
+        ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+    except (OSError, AttributeError):
+        pass
+    if os.getppid() != parent:  # it died before prctl took effect
+        sys.exit(0)
+
+
+def _worker(worker_main, parent, *args):
+    _exit_with_parent(parent)
+    worker_main(*args)
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt  # SIGTERM takes the same clean shutdown path as CTRL+C
+
+
+def run_cluster(worker_main, workers, ports, open_log_sink, host="127.0.0.1", metrics_port=None):
+    """Fork `workers` processes running worker_main(index, counters, log_queue, stop) until CTRL+C or SIGTERM.
+
+    The parent only writes the logs, through the LogSink returned by
+    open_log_sink() after the fork, and aggregates the counters.
+    """
+    for port in ports:  # fail here, not in every worker, if a port can't be bound
+        reuseport_listener(host, port, 0, listen=False).close()
+
+    sys.stdout.flush()  # or the children flush the parent's buffered output again
+    ctx = mp.get_context("fork")  # workers inherit the shared counters and the handler code
+    counters = ClusterCounters(workers, ports)
+    log_queue = ctx.Queue(LOG_QUEUE_SIZE)
+    stop = ctx.Event()
+    pool = [ctx.Process(target=_worker, args=(worker_main, os.getpid(), i, counters, log_queue, stop),
+                        name=f"honeypot-{i}") for i in range(workers)]
+    for p in pool:
+        p.start()
+    previous = signal.signal(signal.SIGTERM, _terminate)
+    # Threads (log writer, metrics server) only after the fork
+    log_sink = open_log_sink()
+    writer = threading.Thread(target=_write_logs, args=(log_queue, log_sink, workers), daemon=True)
+    writer.start()
+    if metrics_port is not None:
+        start_metrics_server(counters.registry(), port=metrics_port)
+    print(f"🛡️ Honeypot running on {host} ports {', '.join(map(str, ports))} "
+          f"with {workers} worker processes ... (CTRL+C to stop)")
+    try:
+        while any(p.is_alive() for p in pool):
+            time.sleep(0.5)
+        print("⚠️ All honeypot workers exited")
+    except KeyboardInterrupt:
+        print("\n🛑 Honeypot stopped")
+    previous_int = signal.signal(signal.SIGINT, signal.SIG_IGN)  # a second signal must not cut the shutdown short
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    stop.set()
+    for p in pool:
+        p.join()
+        if p.exitcode:
+            print(f"⚠️ {p.name} exited with code {p.exitcode}")
+            log_queue.put(None)  # it never sent its own end marker
+    writer.join()
+    log_sink.close()
+    signal.signal(signal.SIGTERM, previous)
+    signal.signal(signal.SIGINT, previous_int)
+    counters.report()
+    return counters
@@ -0,0 +1,220 @@
+import itertools
+import json
+import math
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from dataset_cache import cache_is_fresh, open_cache
+from training_utils import encode_features
+
+# ---------------- Hyperparameter search ----------------
+# Grid, random or successive-halving search over XGBoost settings on the
+# selected features. The split is written once as .npy files; every pool
+# worker memory-maps them and builds its quantised QuantileDMatrix a single
+# time, then reuses it for all the trials it runs. Workers x threads per
+# worker never exceeds the core count. Each trial early-stops on a validation
+# slice of the training set and is scored on the held-out test set; single-row
+# latency is measured afterwards in the parent, one model at a time, so
+# trials running in parallel don't skew it.
+
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 6, 8],
+    "learning_rate": [0.05, 0.1, 0.3],
+    "subsample": [0.8, 1.0],
+    "colsample_bytree": [0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+MAX_ROUNDS = 200
+EARLY_STOPPING = 10
+RANDOM_TRIALS = 20
+HALVING_ETA = 3           # successive halving keeps 1/ETA of the configs per rung, with ETA x the rounds
+VALID_SIZE = 0.1          # of the training rows, for early stopping
+LATENCY_CALLS = 300
+LEADERBOARD_FILE = "search_leaderboard.json"
+SEED = 42
+
+
+# ---------------- Candidates ----------------
+def grid_candidates(space=SEARCH_SPACE):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_candidates(n, space=SEARCH_SPACE, seed=SEED):
+    rng = random.Random(seed)
+    grid = grid_candidates(space)
+    return rng.sample(grid, min(n, len(grid)))
+
+
+# ---------------- Worker side ----------------
+_worker = {}
+
+
+def _init_worker(data_dir, nthread, base_params):
+    """Runs once per pool process: map the split and quantise it a single time."""
+    load = lambda name: np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+    dtrain = xgb.QuantileDMatrix(load("X_train"), load("y_train"), nthread=nthread)
+    _worker.update(
+        dtrain=dtrain,
+        dvalid=xgb.QuantileDMatrix(load("X_valid"), load("y_valid"), ref=dtrain, nthread=nthread),
+        X_test=load("X_test"),
+        y_test=load("y_test"),
+        params=dict(base_params, nthread=nthread),
+    )
+
+
+def _run_trial(task):
+    trial, config, rounds = task
+    params = dict(_worker["params"], **config)
+    t0 = time.perf_counter()
+    booster = xgb.train(params, _worker["dtrain"], num_boost_round=rounds,
+                        evals=[(_worker["dvalid"], "valid")],
+                        early_stopping_rounds=EARLY_STOPPING, verbose_eval=False)
+    train_seconds = time.perf_counter() - t0
+    best = booster.best_iteration + 1
+    scores = booster.inplace_predict(_worker["X_test"], iteration_range=(0, best))
+    pred = scores.argmax(axis=1) if scores.ndim == 2 else (scores > 0.5).astype(int)
+    return {
+        "trial": trial,
+        "params": config,
+        "max_rounds": rounds,
+        "best_rounds": best,
+        "valid_logloss": float(booster.best_score),
+        "accuracy": float((pred == _worker["y_test"]).mean()),
+        "train_seconds": train_seconds,
+        "model": bytes(booster.save_raw("ubj")),
+    }
+
+
+# ---------------- Parent side ----------------
+def load_selected(data_file, cache_dir, features_file, label_col="Label"):
+    """Selected feature columns and encoded labels, from the columnar cache or the CSV."""
+    with open(features_file, "rb") as f:
+        features = list(pickle.load(f))
+    if cache_is_fresh(cache_dir, data_file):
+        columns, labels, classes = open_cache(cache_dir)
+        X = np.column_stack([np.asarray(columns[c], dtype=np.float32) for c in features])
+        return X, np.asarray(labels), features, classes
+    df = pd.read_csv(data_file, usecols=features + [label_col], low_memory=False)
+    X = encode_features(df[features].copy()).to_numpy(np.float32)
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(df[label_col].astype(str))
+    return X, y, features, list(encoder.classes_)
+
+
+def pool_shape(workers=None):
+    """(processes, threads per process) that fill the machine without oversubscribing it."""
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, cores))
+    return workers, max(1, cores // workers)
+
+
+def single_row_latency_us(model_bytes, X_test, calls=LATENCY_CALLS):
+    booster = xgb.Booster(model_file=bytearray(model_bytes))
+    booster.set_param({"nthread": 1})
+    row = np.array(X_test[:1])
+    booster.inplace_predict(row)
+    samples = []
+    for i in range(calls):
+        row[0] = X_test[i % len(X_test)]
+        t0 = time.perf_counter()
+        booster.inplace_predict(row)
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples) * 1e6)
+
+
+def run_search(data_file, cache_dir, features_file, strategy="random", trials=RANDOM_TRIALS,
+               workers=None, max_rounds=MAX_ROUNDS, leaderboard_file=LEADERBOARD_FILE):
+    started = time.time()
+    X, y, features, classes = load_selected(data_file, cache_dir, features_file)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SEED)
+    X_train, X_valid, y_train, y_valid = train_test_split(X_train, y_train, test_size=VALID_SIZE,
+                                                          random_state=SEED)
+    del X, y
+
+    n_classes = len(classes)
+    base_params = {"tree_method": "hist", "seed": SEED, "verbosity": 0}
+    if n_classes > 2:
+        base_params.update(objective="multi:softprob", num_class=n_classes, eval_metric="mlogloss")
+    else:
+        base_params.update(objective="binary:logistic", eval_metric="logloss")
+
+    if strategy == "grid":
+        candidates = grid_candidates()
+    else:
+        candidates = random_candidates(trials)
+    processes, nthread = pool_shape(workers)
+    print(f"🔎 {strategy} search: {len(candidates)} configs on {len(features)} features, "
+          f"{len(X_train):,} train / {len(X_valid):,} valid / {len(X_test):,} test rows, "
+          f"{processes} workers x {nthread} threads")
+
+    data_dir = tempfile.mkdtemp(prefix="hparam-search-")
+    results = []
+    try:
+        for name, arr in (("X_train", X_train), ("y_train", y_train), ("X_valid", X_valid),
+                          ("y_valid", y_valid), ("X_test", X_test), ("y_test", y_test)):
+            np.save(os.path.join(data_dir, f"{name}.npy"), arr)
+        del X_train, y_train, X_valid, y_valid
+
+        with Pool(processes, initializer=_init_worker, initargs=(data_dir, nthread, base_params)) as pool:
+            if strategy == "halving":
+                rungs = max(1, math.ceil(math.log(max(len(candidates), 1), HALVING_ETA)))
+                rounds = max(EARLY_STOPPING + 1, max_rounds // HALVING_ETA ** (rungs - 1))
+                alive = list(enumerate(candidates))
+                for rung in range(rungs + 1):
+                    tasks = [(trial, config, min(rounds, max_rounds)) for trial, config in alive]
+                    scored = pool.map(_run_trial, tasks)
+                    for r in scored:
+                        r["rung"] = rung
+                    print(f"   rung {rung}: {len(scored)} configs x {min(rounds, max_rounds)} rounds, "
+                          f"best accuracy {max(r['accuracy'] for r in scored):.4f}")
+                    scored.sort(key=lambda r: r["valid_logloss"])  # promote on validation, never on test
+                    keep = max(1, len(scored) // HALVING_ETA)
+                    results = [r for r in results if r["trial"] not in {s["trial"] for s in scored}] + scored
+                    if len(scored) == 1 or rounds >= max_rounds:
+                        break
+                    alive = [(r["trial"], r["params"]) for r in scored[:keep]]
+                    rounds *= HALVING_ETA
+            else:
+                tasks = [(trial, config, max_rounds) for trial, config in enumerate(candidates)]
+                for r in pool.imap_unordered(_run_trial, tasks):
+                    results.append(r)
+                    print(f"   trial {r['trial']:>3}: acc={r['accuracy']:.4f} rounds={r['best_rounds']:>3} "
+                          f"{r['train_seconds']:.1f}s {r['params']}")
+
+        print("⏱️ Measuring single-row latency...")
+        X_test = np.load(os.path.join(data_dir, "X_test.npy"), mmap_mode="r")
+        for r in results:
+            r["latency_us"] = single_row_latency_us(r.pop("model"), X_test)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    results.sort(key=lambda r: (-r["accuracy"], r["latency_us"]))
+    leaderboard = {
+        "strategy": strategy,
+        "features": features,
+        "search_seconds": time.time() - started,
+        "workers": processes,
+        "threads_per_worker": nthread,
+        "trials": results,
+    }
+    with open(leaderboard_file, "w") as f:
+        json.dump(leaderboard, f, indent=2)
+
+    print(f"\n🏁 Leaderboard ({len(results)} configs, {leaderboard['search_seconds']:.1f}s) -> {leaderboard_file}")
+    print(f"   {'#':>3} {'accuracy':>9} {'rounds':>6} {'train s':>8} {'1-row µs':>9}  params")
+    for rank, r in enumerate(results[:10], 1):
+        print(f"   {rank:>3} {r['accuracy']:>9.4f} {r['best_rounds']:>6} {r['train_seconds']:>8.2f} "
+              f"{r['latency_us']:>9.1f}  {r['params']}")
+    return leaderboard
@@ -1,7 +1,17 @@
-
 import os
+import io
+import csv
+import time
+import argparse
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
 import pandas as pd
 
+from dataset_cache import ColumnarCacheWriter, CACHE_DIR
+from training_utils import peak_rss_mb
+
 # Paths
 folder_path = os.path.join(os.getcwd(), "CICIDS2018")
 output_csv = "dataset_clean.csv"
@@ -15,13 +25,195 @@ required_columns = [
     'Label'
 ]
 
-def merge_and_clean():
+protocol_map = {'TCP': 6, 'UDP': 17, 'ICMP': 1}
+
+# ---------------- Streaming build ----------------
+# Every CSV is cut into byte ranges of CHUNK_MB on line boundaries. A process
+# pool parses and cleans the ranges (usecols, numeric coercion, per-row hash,
+# Protocol mapping, lossless downcast) while the parent keeps at most
+# IN_FLIGHT ranges outstanding, drops rows whose hash was already seen and
+# appends the rest to the output. Rows are hashed before the Protocol mapping,
+# as the original build drops duplicates before mapping: rows that differ only
+# in Protocol are both kept. Memory is bounded by the chunk size and the
+# 8-byte-per-row hash set, not by the dataset.
+CHUNK_MB = 32
+WORKERS = os.cpu_count() or 1
+IN_FLIGHT = 2              # outstanding ranges per worker
+
+
+class RowHashSet:
+    """Set of 64-bit row hashes kept as a few sorted NumPy runs (merged LSM-style)."""
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def add_new(self, hashes):
+        """Mark rows whose hash was not seen before (first occurrence within the chunk) and remember them."""
+        uniq, first = np.unique(hashes, return_index=True)
+        fresh = np.ones(len(uniq), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, uniq), len(run) - 1)
+            fresh &= run[pos] != uniq
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[fresh]] = True
+        if fresh.any():
+            self._runs.append(uniq[fresh])
+            # Merge while the previous run is not much bigger, so there are only O(log n) runs
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                last = self._runs.pop()
+                self._runs[-1] = np.union1d(self._runs[-1], last)
+        return mask
+
+
+def read_header(file_path):
+    with open(file_path, newline="", encoding="utf-8", errors="replace") as f:
+        return [name.strip() for name in next(csv.reader(f), [])]
+
+
+def file_ranges(file_path, chunk_bytes):
+    size = os.path.getsize(file_path)
+    return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def read_range(file_path, start, end):
+    """Bytes of the lines that start in [start, end), header excluded."""
+    with open(file_path, "rb") as f:
+        if start == 0:
+            f.readline()  # header
+        else:
+            f.seek(start - 1)
+            f.readline()  # the line straddling `start` belongs to the previous range
+        pos = f.tell()
+        if pos >= end:
+            return b""
+        data = f.read(end - pos)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+    return data
+
+
+def clean_chunk(df):
+    """Same cleaning as the original build, applied to one chunk: numeric columns, no NaNs.
+
+    Protocol is left as read (the dedup key); map_protocol() converts it afterwards.
+    """
+    numeric = [c for c in required_columns if c not in ('Protocol', 'Label')]
+    for col in numeric:
+        df[col] = pd.to_numeric(df[col], errors='coerce')  # stray header rows / junk -> NaN
+    df.dropna(inplace=True)
+    df[numeric] = df[numeric].astype(np.float64)  # one dtype per column so hashes match across chunks
+    df['Protocol'] = df['Protocol'].str.strip()
+    return df
+
+
+def map_protocol(df):
+    """Convert Protocol to numeric (TCP/UDP/ICMP → numbers), as the original build does after dedup."""
+    df['Protocol'] = df['Protocol'].map(protocol_map).fillna(0).astype(np.float64)
+    return df
+
+
+def downcast(df):
+    """Shrink numeric columns without changing any value."""
+    for col in df.columns:
+        if col == 'Label':
+            continue
+        values = df[col].to_numpy()
+        if len(values) and np.isfinite(values).all() and np.array_equal(values, np.round(values)):
+            df[col] = pd.to_numeric(values.astype(np.int64), downcast='integer')
+        elif np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+            df[col] = values.astype(np.float32)
+    df['Label'] = df['Label'].astype('category')
+    return df
+
+
+def process_range(task):
+    """Pool worker: parse, clean, hash and downcast one byte range of a CSV."""
+    file_path, start, end, positions = task
+    data = read_range(file_path, start, end)
+    if not data:
+        return None, None, 0
+    df = pd.read_csv(io.BytesIO(data), header=None, usecols=list(positions.values()),
+                     dtype={positions['Protocol']: str, positions['Label']: str},
+                     skipinitialspace=True, encoding_errors="replace")
+    df.columns = [name for name, _ in sorted(positions.items(), key=lambda kv: kv[1])]
+    df = df[required_columns]
+    rows_read = len(df)
+    df = clean_chunk(df)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return downcast(map_protocol(df)), hashes, rows_read
+
+
+def merge_and_clean(workers=WORKERS, chunk_mb=CHUNK_MB, cache_dir=CACHE_DIR, output=output_csv):
+    all_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".csv"))
+    if not all_files:
+        print("❌ No CSV files found in CICIDS2018 folder.")
+        return
+
+    print(f"📂 Found {len(all_files)} CSV files. Streaming with {workers} workers, {chunk_mb} MB chunks...")
+    started = time.perf_counter()
+
+    tasks = []
+    for file in all_files:
+        file_path = os.path.join(folder_path, file)
+        header = read_header(file_path)
+        positions = {name: header.index(name) for name in required_columns if name in header}
+        missing = [name for name in required_columns if name not in positions]
+        if missing:
+            # the in-memory build dropped these rows anyway (NaN after concat + dropna)
+            print(f"⚠️ Skipping {file}: missing columns {missing}")
+            continue
+        tasks += [(file_path, start, end, positions) for start, end in file_ranges(file_path, chunk_mb << 20)]
+
+    seen = RowHashSet()
+    cache = ColumnarCacheWriter(cache_dir) if cache_dir else None  # memory-mapped copy for train.py
+    rows_read = rows_written = 0
+    with Pool(workers) as pool, open(output, "w", newline="", encoding="utf-8") as out:
+        out.write(",".join(required_columns) + "\n")
+        pending = deque()
+        queued = iter(tasks)
+        for task in queued:
+            pending.append(pool.apply_async(process_range, (task,)))
+            if len(pending) >= workers * IN_FLIGHT:
+                break
+        done = 0
+        while pending:
+            df, hashes, n = pending.popleft().get()
+            task = next(queued, None)
+            if task is not None:
+                pending.append(pool.apply_async(process_range, (task,)))
+            done += 1
+            rows_read += n
+            if df is not None and len(df):
+                df = df[seen.add_new(hashes)]
+                df.to_csv(out, header=False, index=False)
+                if cache is not None:
+                    cache.append(df)
+                rows_written += len(df)
+            if done % 10 == 0 or not pending:
+                print(f"🔹 {done}/{len(tasks)} chunks, {rows_read:,} rows read, {rows_written:,} kept")
+
+    if cache is not None:
+        cache.close(source=output)
+    elapsed = time.perf_counter() - started
+    own, children = peak_rss_mb(), peak_rss_mb(children=True)
+    print(f"✅ Merged & cleaned data saved to {output}" + (f" (+ columnar cache {cache_dir}/)" if cache else ""))
+    print(f"📏 Final dataset size: {rows_written:,} rows × {len(required_columns)} columns "
+          f"({rows_read - rows_written:,} duplicate/invalid rows dropped)")
+    print(f"⏱️ {elapsed:.2f}s wall, peak RSS {own:,.0f} MB (parent) / {children:,.0f} MB (largest worker)")
+
+
+# ---------------- Original in-memory build (kept for comparison) ----------------
+def merge_and_clean_in_memory(output=output_csv):
     all_files = [f for f in os.listdir(folder_path) if f.endswith(".csv")]
     if not all_files:
         print("❌ No CSV files found in CICIDS2018 folder.")
         return
 
     print(f"📂 Found {len(all_files)} CSV files. Merging...")
+    started = time.perf_counter()
 
     merged_df = pd.DataFrame()
 
@@ -47,13 +239,62 @@ def merge_and_clean():
     merged_df.dropna(inplace=True)
 
     # Convert Protocol to numeric (TCP/UDP/ICMP → numbers)
-    protocol_map = {'TCP': 6, 'UDP': 17, 'ICMP': 1}
     merged_df['Protocol'] = merged_df['Protocol'].map(protocol_map).fillna(0).astype(int)
 
     # Save cleaned dataset
-    merged_df.to_csv(output_csv, index=False)
-    print(f"✅ Merged & cleaned data saved to {output_csv}")
+    merged_df.to_csv(output, index=False)
+    own = peak_rss_mb()
+    print(f"✅ Merged & cleaned data saved to {output}")
     print(f"📏 Final dataset size: {merged_df.shape[0]:,} rows × {merged_df.shape[1]} columns")
+    print(f"⏱️ {time.perf_counter() - started:.2f}s wall, peak RSS {own:,.0f} MB")
+
+# ---------------- Equivalence check ----------------
+def _numeric_rows(path):
+    """Rows of a built CSV as float64 (junk rows the original build keeps become NaN and are dropped)."""
+    df = pd.read_csv(path, low_memory=False)
+    for col in required_columns:
+        if col != 'Label':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+    junk = int(df.isna().any(axis=1).sum())
+    return df.dropna(), junk
+
+
+def verify_builds(workers=WORKERS, chunk_mb=CHUNK_MB):
+    """Run both builds on the same input and check they keep the same rows (order aside)."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        streamed_csv, in_memory_csv = os.path.join(tmp, "streamed.csv"), os.path.join(tmp, "in_memory.csv")
+        merge_and_clean(workers, chunk_mb, None, streamed_csv)
+        merge_and_clean_in_memory(in_memory_csv)
+        streamed, _ = _numeric_rows(streamed_csv)
+        in_memory, junk = _numeric_rows(in_memory_csv)
+    if junk:
+        print(f"ℹ️ In-memory build kept {junk:,} non-numeric rows (e.g. repeated headers); streaming drops them")
+    a = streamed.sort_values(required_columns).reset_index(drop=True)
+    b = in_memory.sort_values(required_columns).reset_index(drop=True)
+    if len(a) == len(b) and a.equals(b):
+        print(f"✅ Both builds keep the same {len(a):,} rows")
+        return True
+    print(f"❌ Builds differ: streaming kept {len(a):,} rows, in-memory {len(b):,}")
+    return False
+
 
 if __name__ == "__main__":
-    merge_and_clean()
+    parser = argparse.ArgumentParser(description="Merge and clean the CICIDS2018 CSVs into dataset_clean.csv")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parser processes")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_MB, help="CSV bytes per chunk")
+    parser.add_argument("--cache", default=CACHE_DIR, metavar="DIR",
+                        help="also write the memory-mapped columnar cache train.py loads from")
+    parser.add_argument("--no-cache", action="store_true", help="only write the CSV")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="use the original load-everything build (for comparison)")
+    parser.add_argument("--verify", action="store_true",
+                        help="run both builds into a temp dir and check they keep the same rows")
+    args = parser.parse_args()
+    if args.verify:
+        raise SystemExit(0 if verify_builds(args.workers, args.chunk_mb) else 1)
+    if args.in_memory:
+        merge_and_clean_in_memory()
+    else:
+        merge_and_clean(args.workers, args.chunk_mb, None if args.no_cache else args.cache)
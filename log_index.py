@@ -0,0 +1,392 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+from ndjson_log import log_segments
+
+# ---------------- Indexed log store ----------------
+# Incrementally loads the honeypot text logs and the NDJSON packet log into
+# one SQLite table indexed on time, SrcIP, DstIP, DstPort and Label, so an
+# investigation is an index lookup instead of a grep over every log file:
+#
+#   python log_index.py ingest                      # new lines since the last run
+#   python log_index.py ingest --watch 10           # ...every 10 s
+#   python log_index.py query --src 10.9.9.9 --since 1h --label MALICIOUS
+#   python log_index.py query --port 22 --since 2d --count
+#
+# Every file is read from a byte-offset checkpoint that is committed in the
+# same transaction as its rows, so an interrupted ingest neither loses nor
+# duplicates lines. A partial last line is left for the next run. Checkpoints
+# are keyed by the file's device:inode plus a fingerprint of its first line.
+# Rotation renames keep the inode, so a rotated segment resumes where it
+# stopped and the new live file starts from zero. The legacy packet_log.json
+# array is reloaded whole and checkpointed by record count. Gzipped segments
+# are only read when named explicitly: their lines were usually ingested
+# before compression.
+
+INDEX_DB = "log_index.sqlite"
+HONEYPOT_LOG = "honeypot_log.txt"
+NDJSON_FILE = "packet_log.ndjson"
+JSON_FILE = "packet_log.json"
+DEFAULT_FILES = (HONEYPOT_LOG, NDJSON_FILE)   # malicious_log.txt repeats honeypot_log.txt's MALICIOUS lines
+
+INGEST_BATCH = 50_000      # rows per transaction (and per checkpoint)
+FINGERPRINT_BYTES = 64     # start of a file's first line that must match for its checkpoint to apply
+QUERY_LIMIT = 100
+CACHE_MB = 256             # SQLite page cache
+REANALYZE_GROWTH = 0.1     # refresh the planner statistics once the table grew by this share
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,           -- epoch seconds (the logs' local time)
+    source TEXT NOT NULL,       -- 'honeypot' or 'packet'
+    label TEXT,                 -- BENIGN / MALICIOUS
+    src_ip TEXT,
+    dst_ip TEXT,
+    src_port INTEGER,
+    dst_port INTEGER,
+    proto TEXT,
+    peer TEXT,                  -- honeypot: the client that sent the message
+    detail TEXT                 -- honeypot: the raw message; packet: remaining fields as JSON
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_src ON events (src_ip, ts);
+CREATE INDEX IF NOT EXISTS events_dst ON events (dst_ip, ts);
+CREATE INDEX IF NOT EXISTS events_port ON events (dst_port, ts);
+CREATE INDEX IF NOT EXISTS events_label ON events (label, ts);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    key TEXT PRIMARY KEY,       -- dev:inode, or the path for gzip / JSON array files
+    path TEXT NOT NULL,         -- where the file was last seen
+    fingerprint BLOB,
+    offset INTEGER NOT NULL,    -- bytes (records for a JSON array) already ingested
+    updated REAL NOT NULL
+);
+"""
+INSERT = ("INSERT INTO events (ts, source, label, src_ip, dst_ip, src_port, dst_port, proto, peer, detail) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+_PEER = re.compile(r"\('([^']*)', (\d+)\)")
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def open_index(path=INDEX_DB):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")      # queries keep working while an ingest runs
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(f"PRAGMA cache_size={-CACHE_MB * 1024}")  # index pages stay in memory during bulk ingest
+    db.executescript(SCHEMA)
+    return db
+
+
+# ---------------- Parsers ----------------
+class _Clock:
+    """Log timestamp -> epoch seconds, converting each distinct second only once."""
+
+    def __init__(self):
+        self._second = None
+        self._base = 0.0
+
+    def __call__(self, stamp):
+        second = stamp[:19]
+        if second != self._second:
+            self._base = datetime.fromisoformat(second).timestamp()
+            self._second = second
+        frac = stamp[19:]
+        return self._base + float(frac) if frac.startswith(".") else self._base
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_honeypot_line(line, clock):
+    """'<datetime> | (ip, port) → MALICIOUS | Src=..., Dst=..., ...' -> events row, or None."""
+    stamp, sep, rest = line.partition(" | ")
+    if not sep:
+        return None
+    try:
+        ts = clock(stamp)
+    except ValueError:
+        return None
+    peer, arrow, message = rest.partition(" → ")
+    if not arrow:
+        peer, message = "", rest
+    m = _PEER.match(peer)
+    if m:
+        peer = f"{m.group(1)}:{m.group(2)}"
+    fields = {}
+    for part in message.partition(" | ")[2].split(", "):
+        key, eq, value = part.partition("=")
+        if eq:
+            fields[key.strip()] = value.strip()
+    label = "MALICIOUS" if "MALICIOUS" in message else "BENIGN"  # the honeypot's own rule
+    return (ts, "honeypot", label, fields.get("Src"), fields.get("Dst"), _int(fields.get("Sport")),
+            _int(fields.get("Dport")), fields.get("Proto"), peer, message)
+
+
+def packet_row(entry, clock):
+    """Packet log record (NDJSON line or legacy JSON element) -> events row, or None."""
+    entry = dict(entry)
+    try:
+        ts = clock(entry.pop("Timestamp"))
+    except (KeyError, TypeError, ValueError):
+        return None
+    row = (ts, "packet", entry.pop("Label", None), entry.pop("SrcIP", None), entry.pop("DstIP", None),
+           _int(entry.pop("SrcPort", None)), _int(entry.pop("DstPort", None)), entry.pop("Protocol", None), None)
+    return row + (json.dumps(entry) if entry else None,)
+
+
+def parse_ndjson_line(line, clock):
+    try:
+        return packet_row(json.loads(line), clock)
+    except ValueError:
+        return None
+
+
+# ---------------- Ingest ----------------
+class LogIndex:
+    """SQLite index over the logs, fed incrementally from byte-offset checkpoints."""
+
+    def __init__(self, path=INDEX_DB):
+        self.path = path
+        self.db = open_index(path)
+        self.rows = 0
+        self.skipped = 0
+        self.bytes = 0
+
+    def close(self):
+        self.db.close()
+
+    def _checkpoint(self, key, fingerprint):
+        row = self.db.execute("SELECT fingerprint, offset FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if row is None or (fingerprint is not None and row[0] != fingerprint):
+            return 0  # new file (or a reused inode)
+        return row[1]
+
+    def _commit(self, rows, key, path, fingerprint, offset):
+        with self.db:  # rows and checkpoint in one transaction
+            self.db.executemany(INSERT, rows)
+            self.db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                            (key, path, fingerprint, offset, time.time()))
+        self.rows += len(rows)
+
+    def ingest_file(self, path, parse):
+        """Ingest complete lines added to `path` since its checkpoint; returns rows added."""
+        gz = path.endswith(".gz")
+        if gz:
+            key, fingerprint = "gz:" + os.path.abspath(path), None
+        else:
+            st = os.stat(path)
+            with open(path, "rb") as f:
+                fingerprint = f.readline(FINGERPRINT_BYTES)
+            if not fingerprint.endswith(b"\n") and len(fingerprint) < FINGERPRINT_BYTES:
+                return 0  # not even one complete line yet
+            key = f"{st.st_dev}:{st.st_ino}"
+        offset = self._checkpoint(key, fingerprint)
+        if not gz and offset >= st.st_size:
+            return 0
+
+        clock = _Clock()
+        rows = []
+        before = self.rows
+        with (gzip.open if gz else open)(path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # still being written: picked up next time
+                offset += len(raw)
+                self.bytes += len(raw)
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if not line:
+                    continue
+                row = parse(line, clock)
+                if row is None:
+                    self.skipped += 1
+                    continue
+                rows.append(row)
+                if len(rows) >= INGEST_BATCH:
+                    self._commit(rows, key, path, fingerprint, offset)
+                    rows = []
+        self._commit(rows, key, path, fingerprint, offset)
+        return self.rows - before
+
+    def ingest_json_array(self, path):
+        """Legacy packet_log.json (rewritten whole on every packet): records past the checkpoint."""
+        key = "json:" + os.path.abspath(path)
+        done = self._checkpoint(key, None)
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if len(records) < done:
+            done = 0  # the file was started over
+        clock = _Clock()
+        rows = [row for row in (packet_row(r, clock) for r in records[done:]) if row is not None]
+        self.skipped += len(records) - done - len(rows)
+        before = self.rows
+        self._commit(rows, key, path, None, len(records))
+        return self.rows - before
+
+    def ingest(self, paths=DEFAULT_FILES):
+        """Ingest each log with its rotated segments (oldest first); returns rows added."""
+        before = self.rows
+        for path in paths:
+            if path.endswith(".json"):
+                if os.path.exists(path):
+                    self.ingest_json_array(path)
+                continue
+            parse = parse_ndjson_line if path.endswith((".ndjson", ".jsonl")) or ".ndjson." in path \
+                else parse_honeypot_line
+            for segment in segments(path):
+                self.ingest_file(segment, parse)
+        if self.rows > before:
+            self.analyze()
+        return self.rows - before
+
+    def analyze(self):
+        """Refresh the planner statistics when they are missing or stale.
+
+        Without them SQLite can pick the label index (a third of the rows) over
+        the SrcIP one for "alerts from X", turning a sub-millisecond lookup into a scan.
+        """
+        total = self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        try:
+            stat = self.db.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = 'events' LIMIT 1").fetchone()
+        except sqlite3.OperationalError:
+            stat = None  # never analyzed
+        analyzed = int(stat[0].split()[0]) if stat else 0
+        if total and total - analyzed > REANALYZE_GROWTH * max(analyzed, 1):
+            self.db.execute("ANALYZE")
+            self.db.commit()
+
+    def report(self, elapsed):
+        total = self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        print(f"🗂️ Log index {self.path}: +{self.rows:,} rows from {self.bytes / 1e6:,.1f} MB in {elapsed:.2f}s "
+              f"({self.rows / max(elapsed, 1e-9):,.0f} rows/s), skipped={self.skipped:,}, {total:,} rows total")
+
+
+def segments(path):
+    """A log's rotated segments and the live file, oldest first (gzip only when named)."""
+    if path.endswith(".gz"):
+        return [path] if os.path.exists(path) else []
+    if path.endswith(".ndjson"):
+        return log_segments(path)  # packet_log.ndjson.N ... .1, then the live file
+    rotated = sorted(p for p in glob.glob(glob.escape(path) + ".*") if not p.endswith((".gz", ".tmp")))
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+# ---------------- Queries ----------------
+def parse_time(value, now=None):
+    """'1h' / '30m' / '2d' ago, epoch seconds, or an ISO date/time -> epoch seconds."""
+    m = _DURATION.match(value)
+    if m:
+        return (now or time.time()) - float(m.group(1)) * _UNITS[m.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def query(db, src=None, dst=None, port=None, label=None, source=None, since=None, until=None,
+          limit=QUERY_LIMIT, count=False):
+    """Events matching every given filter, newest first (or their count)."""
+    where, params = [], []
+    for column, value in (("src_ip", src), ("dst_ip", dst), ("dst_port", port), ("label", label),
+                          ("source", source)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        params.append(until)
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    if count:
+        return db.execute(f"SELECT COUNT(*) FROM events{clause}", params).fetchone()[0]
+    sql = (f"SELECT ts, source, label, src_ip, dst_ip, src_port, dst_port, proto, peer, detail "
+           f"FROM events{clause} ORDER BY ts DESC LIMIT ?")
+    return db.execute(sql, params + [limit]).fetchall()
+
+
+def format_row(row):
+    ts, source, label, src, dst, sport, dport, proto, peer, detail = row
+    stamp = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")
+    if source == "honeypot":
+        return f"{stamp} {label:<9} honeypot {peer or '-'} → {detail}"
+    return f"{stamp} {label or '-':<9} packet   {proto or '-'} {src}:{sport} -> {dst}:{dport}" + \
+        (f" {detail}" if detail else "")
+
+
+# ---------------- CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(description="Indexed SQLite store over the honeypot and packet logs")
+    parser.add_argument("--db", default=INDEX_DB, help=f"index database (default {INDEX_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="load new log lines into the index")
+    p.add_argument("files", nargs="*", default=list(DEFAULT_FILES),
+                   help=f"logs to ingest with their rotated segments (default: {' '.join(DEFAULT_FILES)})")
+    p.add_argument("--watch", type=float, metavar="SECONDS", help="keep ingesting every SECONDS")
+
+    q = sub.add_parser("query", help="search the index")
+    q.add_argument("--src", help="SrcIP")
+    q.add_argument("--dst", help="DstIP")
+    q.add_argument("--port", type=int, help="DstPort")
+    q.add_argument("--label", type=str.upper, choices=["BENIGN", "MALICIOUS"])
+    q.add_argument("--alerts", action="store_true", help="same as --label MALICIOUS")
+    q.add_argument("--source", choices=["honeypot", "packet"])
+    q.add_argument("--since", help="'1h', '30m', '2d' ago, or a date/time")
+    q.add_argument("--until", help="same formats as --since")
+    q.add_argument("--limit", type=int, default=QUERY_LIMIT)
+    q.add_argument("--count", action="store_true", help="only count the matches")
+    q.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        index = LogIndex(args.db)
+        try:
+            while True:
+                t0 = time.perf_counter()
+                index.rows = index.skipped = index.bytes = 0
+                index.ingest(args.files)
+                index.report(time.perf_counter() - t0)
+                if args.watch is None:
+                    break
+                time.sleep(args.watch)
+        except KeyboardInterrupt:
+            print("\n🛑 Ingest stopped by user")
+        finally:
+            index.close()
+        return
+
+    db = open_index(args.db)
+    now = time.time()
+    t0 = time.perf_counter()
+    result = query(db, args.src, args.dst, args.port, "MALICIOUS" if args.alerts else args.label, args.source,
+                   parse_time(args.since, now) if args.since else None,
+                   parse_time(args.until, now) if args.until else None, args.limit, args.count)
+    elapsed_ms = (time.perf_counter() - t0) * 1e3
+    if args.count:
+        print(f"{result:,} matching events ({elapsed_ms:.1f} ms)")
+        return
+    columns = ("ts", "source", "label", "src_ip", "dst_ip", "src_port", "dst_port", "proto", "peer", "detail")
+    for row in result:
+        print(json.dumps(dict(zip(columns, row))) if args.json else format_row(row))
+    if args.json:
+        return
+    print(f"🔎 {len(result):,} events ({elapsed_ms:.1f} ms)" + (f", showing the newest {args.limit:,}"
+                                                               if len(result) == args.limit else ""))
+
+
+if __name__ == "__main__":
+    main()
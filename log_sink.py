@@ -0,0 +1,143 @@
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+# ---------------- Buffered honeypot log sink ----------------
+# Handler threads/coroutines only put (timestamp, message, malicious) on a
+# queue. One writer thread keeps honeypot_log.txt and malicious_log.txt open,
+# writes everything queued in one write() per file, and applies the fsync and
+# rotation policy. Line format is unchanged: "<datetime> | <message>".
+
+BATCH_SIZE = 1024          # max records per write batch
+FLUSH_INTERVAL = 0.2       # max time a record waits in the queue (s)
+FSYNC_POLICY = "never"     # "never" (leave it to the OS), "batch", or "interval"
+FSYNC_INTERVAL = 1.0       # for "interval": fsync at most this often (s)
+ROTATE_BYTES = 0           # rotate a file once it reaches this size (0 = off)
+ROTATE_SECONDS = 0         # rotate a file after this long (0 = off)
+
+
+class _LogFile:
+    """One append-only log file with size/time rotation."""
+
+    def __init__(self, path, rotate_bytes, rotate_seconds, compress, compressors):
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self._compressors = compressors
+        self._open()
+
+    def _open(self):
+        self.f = open(self.path, "a", encoding="utf-8")
+        self.size = self.f.tell()
+        self.opened = time.monotonic()
+
+    def write(self, text):
+        self.f.write(text)
+        self.size += len(text.encode("utf-8"))
+        if ((self.rotate_bytes and self.size >= self.rotate_bytes)
+                or (self.rotate_seconds and time.monotonic() - self.opened >= self.rotate_seconds)):
+            self.rotate()
+
+    def rotate(self):
+        self.f.close()
+        rotated = f"{self.path}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            t = threading.Thread(target=_gzip_file, args=(rotated,), daemon=True)
+            t.start()
+            self._compressors.append(t)
+        self._open()
+
+    def close(self):
+        self.f.close()
+
+
+def _gzip_file(path):
+    with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+
+
+class LogSink:
+    """Single writer for the honeypot logs; log() never touches the filesystem."""
+
+    def __init__(self, main_path, malicious_path, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, fsync=FSYNC_POLICY, fsync_interval=FSYNC_INTERVAL,
+                 rotate_bytes=ROTATE_BYTES, rotate_seconds=ROTATE_SECONDS, compress=False):
+        if fsync not in ("never", "batch", "interval"):
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._compressors = []
+        self._main = _LogFile(main_path, rotate_bytes, rotate_seconds, compress, self._compressors)
+        self._malicious = _LogFile(malicious_path, rotate_bytes, rotate_seconds, compress, self._compressors)
+        self._queue = queue.SimpleQueue()
+        self._last_fsync = time.monotonic()
+
+        self.records = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def log(self, message, malicious=False):
+        """Queue one event; both files get the same timestamp."""
+        self._queue.put((datetime.now(), message, malicious))
+
+    def log_records(self, records):
+        """Queue (timestamp, message, malicious) events timestamped elsewhere (honeypot worker processes)."""
+        for record in records:
+            self._queue.put(record)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        for t in self._compressors:
+            t.join()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                closing = True
+            if batch:
+                self._write(batch)
+        self._main.close()
+        self._malicious.close()
+
+    def _write(self, batch):
+        lines = [f"{ts} | {message}\n" for ts, message, _ in batch]
+        malicious = [line for line, (_, _, is_mal) in zip(lines, batch) if is_mal]
+        self._main.write("".join(lines))
+        if malicious:
+            self._malicious.write("".join(malicious))
+        self._main.f.flush()
+        self._malicious.f.flush()
+
+        now = time.monotonic()
+        if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._main.f.fileno())
+            os.fsync(self._malicious.f.fileno())
+            self._last_fsync = now
+        self.records += len(batch)
+        self.batches += 1
@@ -0,0 +1,199 @@
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- Hot-path metrics ----------------
+# Counters, gauges and fixed-bucket latency histograms, rendered in the
+# Prometheus text format on a local HTTP endpoint (/metrics). Updating a
+# metric is a bisect over a short tuple plus two in-place adds, so the stages
+# can be timed on every packet. Metrics are lock-free by default and meant
+# to have a single writer thread each; a registry created with shared=True
+# hands out locked metrics for code that updates them from many threads
+# (the threaded honeypot). Values that other components already count
+# (queue drops, cache hits, ...) are exposed through callbacks instead of
+# being counted twice.
+
+METRICS_HOST = "127.0.0.1"
+REDIRECTOR_METRICS_PORT = 9108
+HONEYPOT_METRICS_PORT = 9109
+
+# Seconds: 1 µs .. 1 s, roughly 1-2.5-5 per decade
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+# Seconds behind capture: 1 ms .. 5 min
+LAG_BUCKETS = (1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _labels(labels, extra=None):
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count; `fn` reads it from an existing attribute instead."""
+
+    kind = "counter"
+
+    def __init__(self, labels, fn=None):
+        self.labels = labels
+        self.fn = fn
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self, name):
+        yield name, self.labels, self.fn() if self.fn is not None else self.value
+
+
+class Gauge(Counter):
+    """Current value, set directly or read from `fn` at scrape time."""
+
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Fixed-bucket histogram (upper bounds inclusive, as Prometheus `le`)."""
+
+    kind = "histogram"
+    __slots__ = ("labels", "bounds", "counts", "sum")
+
+    def __init__(self, labels, buckets=LATENCY_BUCKETS):
+        self.labels = labels
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile q (coarse, for console reports)."""
+        total = self.count
+        if not total:
+            return 0.0
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= q * total:
+                return bound
+        return float("inf")
+
+    def samples(self, name):
+        counts = list(self.counts)  # one snapshot so buckets, sum and count agree
+        cumulative = 0
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            cumulative += n
+            yield f"{name}_bucket", self.labels, cumulative, ("le", _number(bound))
+        yield f"{name}_sum", self.labels, self.sum
+        yield f"{name}_count", self.labels, cumulative
+
+
+class _Locked:
+    """Mixin: serialise updates for metrics written from several threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def observe(self, value):
+        with self._lock:
+            Histogram.observe(self, value)
+
+
+class LockedCounter(_Locked, Counter):
+    pass
+
+
+class LockedHistogram(_Locked, Histogram):
+    __slots__ = ("_lock",)
+
+
+class MetricsRegistry:
+    """Named metric families; each call with new labels adds a child to the family."""
+
+    def __init__(self, shared=False):
+        self.shared = shared
+        self._families = {}  # name -> (kind, help, [metric])
+        self._lock = threading.Lock()
+
+    def _add(self, name, help_text, metric):
+        with self._lock:
+            kind, _, children = self._families.setdefault(name, (metric.kind, help_text, []))
+            if kind != metric.kind:
+                raise ValueError(f"metric {name} already registered as a {kind}")
+            children.append(metric)
+        return metric
+
+    def counter(self, name, help_text, fn=None, **labels):
+        cls = LockedCounter if self.shared and fn is None else Counter
+        return self._add(name, help_text, cls(labels, fn))
+
+    def gauge(self, name, help_text, fn=None, **labels):
+        return self._add(name, help_text, Gauge(labels, fn))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        cls = LockedHistogram if self.shared else Histogram
+        return self._add(name, help_text, cls(labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            families = [(name, kind, help_text, list(children))
+                        for name, (kind, help_text, children) in self._families.items()]
+        lines = []
+        for name, kind, help_text, children in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in children:
+                for sample in metric.samples(name):
+                    sample_name, labels, value = sample[:3]
+                    extra = sample[3] if len(sample) > 3 else None
+                    lines.append(f"{sample_name}{_labels(labels, extra)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(registry, host=METRICS_HOST, port=REDIRECTOR_METRICS_PORT):
+    """Serve /metrics from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # keep the console clean
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            data = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📟 Metrics on http://{host}:{port}/metrics")
+    return server
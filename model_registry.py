@@ -0,0 +1,262 @@
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+import joblib
+import numpy as np
+
+from tree_eval import CompiledTrees
+
+# ---------------- Versioned models with hot reload ----------------
+# A model version is a directory models/<version>/ holding model.pkl,
+# selected_features.pkl and (optionally) model_trees.npz. publish_model()
+# copies the files into a hidden temp directory, writes READY last and renames
+# it into place, so a watcher never sees a half-written version.
+#
+# ModelManager serves predictions from the active version. A background
+# thread polls models/ for a newer READY version, loads and warms it up off
+# the hot path, checks its feature list against the running extractor, and
+# then swaps the active reference. predict() reads that reference once per
+# call, so a swap always lands between two batches. The new version is on
+# probation for PROBATION_ROWS rows: if its per-row latency or error rate is
+# clearly worse than the version it replaced, it is rolled back and never
+# loaded again in this run.
+
+MODEL_DIR = "models"
+READY_FILE = "READY"
+MODEL_FILE = "model.pkl"
+FEATURES_FILE = "selected_features.pkl"
+TREE_FILE = "model_trees.npz"
+
+POLL_INTERVAL = 5.0
+WARMUP_ROUNDS = 20
+PROBATION_ROWS = 5_000
+ROLLBACK_LATENCY_FACTOR = 2.0    # roll back if per-row latency is this many times the old model's
+ROLLBACK_ERROR_RATE = 0.01       # ...or if more than this share of its batches raise
+LATENCY_WINDOW = 200             # recent batches kept per version for the latency comparison
+
+
+def publish_model(model_file=MODEL_FILE, features_file=FEATURES_FILE, tree_file=TREE_FILE,
+                  model_dir=MODEL_DIR, version=None):
+    """Copy a trained model into models/<version>/ atomically; returns the version name."""
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    final = os.path.join(model_dir, version)
+    if os.path.exists(final):
+        raise FileExistsError(f"model version {version} already exists")
+    tmp = os.path.join(model_dir, f".{version}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    shutil.copy(model_file, os.path.join(tmp, MODEL_FILE))
+    shutil.copy(features_file, os.path.join(tmp, FEATURES_FILE))
+    if tree_file and os.path.exists(tree_file):
+        shutil.copy(tree_file, os.path.join(tmp, TREE_FILE))
+    with open(os.path.join(tmp, READY_FILE), "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, final)
+    print(f"📦 Published model version {version} to {final}")
+    return version
+
+
+def ready_versions(model_dir=MODEL_DIR):
+    """Published versions, oldest first."""
+    try:
+        names = os.listdir(model_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(n for n in names if not n.startswith(".")
+                  and os.path.exists(os.path.join(model_dir, n, READY_FILE)))
+
+
+class ModelVersion:
+    """One loaded model: XGBoost for big batches, the compiled trees for small ones."""
+
+    def __init__(self, version, path, compiled_max_batch=32):
+        self.version = version
+        self.path = path
+        self.model = joblib.load(os.path.join(path, MODEL_FILE))
+        self.features = list(joblib.load(os.path.join(path, FEATURES_FILE)))
+        self.compiled_max_batch = compiled_max_batch
+        self.compiled = None
+        tree_file = os.path.join(path, TREE_FILE)
+        if os.path.exists(tree_file):
+            compiled = CompiledTrees(tree_file)
+            if compiled.feature_names and compiled.feature_names != self.features:
+                print(f"⚠️ {tree_file} was exported for different features, using model.predict")
+            else:
+                self.compiled = compiled
+
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self._recent = deque(maxlen=LATENCY_WINDOW)  # (rows, seconds) per batch
+        self.probation = False
+        self.baseline_us = None  # per-row latency of the version this one replaced
+
+    def predict(self, X):
+        if self.compiled is not None and len(X) <= self.compiled_max_batch:
+            return self.compiled.predict(X)
+        return self.model.predict(X)
+
+    def record(self, rows, seconds, failed):
+        self.rows += rows
+        self.batches += 1
+        self.seconds += seconds
+        self.errors += failed
+        self._recent.append((rows, seconds))
+
+    def row_latency_us(self):
+        rows = sum(r for r, _ in self._recent)
+        return sum(s for _, s in self._recent) / rows * 1e6 if rows else None
+
+    def warm_up(self):
+        """Run a few predictions (both code paths) before taking traffic; returns per-row µs."""
+        rng = np.random.default_rng(0)
+        n = len(self.features)
+        samples = []
+        for size in (1, self.compiled_max_batch, 2 * self.compiled_max_batch):
+            X = rng.random((size, n)) * 1e5
+            for _ in range(WARMUP_ROUNDS):
+                t0 = time.perf_counter()
+                self.predict(X)
+                samples.append((time.perf_counter() - t0) / size)
+        return float(np.median(samples) * 1e6)
+
+
+class ModelManager:
+    """Active model + background watcher for new versions, swap and rollback."""
+
+    def __init__(self, model_dir=MODEL_DIR, fallback_dir=".", compiled_max_batch=32, on_swap=None):
+        self.model_dir = model_dir
+        self.compiled_max_batch = compiled_max_batch
+        self.on_swap = on_swap  # called as on_swap(old, new) after every swap or rollback
+        self.rejected = set()
+        self.swaps = 0
+        self.rollbacks = 0
+        self.previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        versions = ready_versions(model_dir)
+        if versions:
+            self.active = ModelVersion(versions[-1], os.path.join(model_dir, versions[-1]), compiled_max_batch)
+        else:
+            self.active = ModelVersion("base", fallback_dir, compiled_max_batch)
+        self.features = self.active.features  # what the running extractor produces
+        self.batch_version = self.active.version  # version that scored the latest batch
+        print(f"🧠 Model version {self.active.version} ({len(self.features)} features)")
+
+    # ---------------- Hot path ----------------
+    def predict(self, X):
+        active = self.active  # read once: a swap lands between batches, never inside one
+        self.batch_version = active.version
+        t0 = time.perf_counter()
+        failed = True
+        try:
+            preds = active.predict(X)
+            failed = False
+            return preds
+        finally:
+            active.record(len(X), time.perf_counter() - t0, failed)
+            if active.probation:
+                self._check_probation(active)
+
+    # ---------------- Watcher ----------------
+    def start_watching(self, interval=POLL_INTERVAL):
+        self._thread = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Model watcher error: {e}")
+
+    def poll(self):
+        """Stage the newest published version if it is new; returns True if it was swapped in."""
+        versions = [v for v in ready_versions(self.model_dir) if v not in self.rejected]
+        if not versions or versions[-1] == self.active.version:
+            return False
+        version = versions[-1]
+        try:
+            candidate = ModelVersion(version, os.path.join(self.model_dir, version), self.compiled_max_batch)
+        except Exception as e:
+            print(f"❌ Model {version} failed to load: {e}")
+            self.rejected.add(version)
+            return False
+        if candidate.features != self.features:
+            print(f"⚠️ Model {version} expects features {candidate.features}, the extractor produces "
+                  f"{self.features}; not loading it (restart the redirector to change features)")
+            self.rejected.add(version)
+            return False
+        try:
+            warm_us = candidate.warm_up()
+        except Exception as e:
+            print(f"❌ Model {version} failed warm-up: {e}")
+            self.rejected.add(version)
+            return False
+
+        old = self.active
+        candidate.baseline_us = old.row_latency_us()
+        candidate.probation = True
+        self.previous = old
+        self.active = candidate
+        self.swaps += 1
+        print(f"🔄 Swapped model {old.version} -> {version} (warm-up {warm_us:.1f} µs/row), "
+              f"on probation for {PROBATION_ROWS:,} rows")
+        if self.on_swap is not None:
+            self.on_swap(old, candidate)
+        return True
+
+    # ---------------- Rollback ----------------
+    def _check_probation(self, m):
+        if m.batches >= 10 and m.errors / m.batches > ROLLBACK_ERROR_RATE:
+            self.rollback(f"error rate {m.errors / m.batches:.1%}")
+            return
+        if m.rows < PROBATION_ROWS:
+            return
+        latency = m.row_latency_us()
+        if m.baseline_us and latency and latency > ROLLBACK_LATENCY_FACTOR * m.baseline_us:
+            self.rollback(f"{latency:.1f} µs/row vs {m.baseline_us:.1f} µs/row before")
+            return
+        m.probation = False
+        print(f"✅ Model {m.version} passed probation ({latency or 0:.1f} µs/row, {m.errors} errors)")
+
+    def rollback(self, reason):
+        bad, good = self.active, self.previous
+        if good is None or not bad.probation:
+            return
+        bad.probation = False
+        self.rejected.add(bad.version)
+        self.active = good
+        self.previous = None
+        self.rollbacks += 1
+        print(f"⏪ Rolled back model {bad.version} -> {good.version}: {reason}")
+        if self.on_swap is not None:
+            self.on_swap(bad, good)
+
+    def stats(self):
+        m = self.active
+        return {
+            "version": m.version,
+            "rows": m.rows,
+            "errors": m.errors,
+            "row_latency_us": m.row_latency_us() or 0.0,
+            "swaps": self.swaps,
+            "rollbacks": self.rollbacks,
+            "rejected": sorted(self.rejected),
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"🧠 Model {s['version']}: {s['rows']:,} rows, {s['row_latency_us']:.2f} µs/row, "
+              f"errors={s['errors']:,}, swaps={s['swaps']}, rollbacks={s['rollbacks']}"
+              + (f", rejected={s['rejected']}" if s["rejected"] else ""))
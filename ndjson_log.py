@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+
+# ---------------- Append-only NDJSON packet log ----------------
+# One JSON record per line. Records are buffered and written in batches
+# (by size or age), so the per-packet cost stays flat no matter how big the
+# log gets. Files are rotated by size: packet_log.ndjson -> .1 -> .2 ...
+
+FLUSH_BYTES = 64 * 1024          # flush once this much is buffered
+FLUSH_INTERVAL = 1.0             # ...or once the oldest buffered record is this old (s)
+MAX_BYTES = 256 * 1024 * 1024    # rotate when the live file would exceed this
+BACKUP_COUNT = 5                 # rotated segments to keep
+
+
+def _repair_tail(path):
+    """Drop a partially written last line left behind by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = end
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                f.truncate(pos + idx + 1)
+                return
+        f.truncate(0)
+
+
+class NDJSONLogWriter:
+    """Buffered, append-only NDJSON writer with size/time flushing and rotation."""
+
+    def __init__(self, path, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, fsync=False):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.fsync = fsync
+
+        _repair_tail(path)
+        self._f = open(path, "ab")
+        self._size = self._f.tell()
+        self._buf = []
+        self._buf_bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def write(self, record):
+        line = (json.dumps(record, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            self._buf.append(line)
+            self._buf_bytes += len(line)
+            if (self._buf_bytes >= self.flush_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join(timeout=self.flush_interval + 1)
+        with self._lock:
+            if self._f.closed:
+                return
+            self._flush_locked()
+            self._f.close()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                if self._buf:
+                    self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buf or self._f.closed:
+            return
+        data = b"".join(self._buf)
+        self._buf.clear()
+        self._buf_bytes = 0
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        # Only whole lines are ever handed to write(), so a crash can at worst
+        # leave one torn line at the end, which _repair_tail() removes.
+        self._f.write(data)
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self._size += len(data)
+
+    def _rotate(self):
+        self._f.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._f = open(self.path, "wb")
+        self._size = 0
+
+
+# ---------------- Legacy JSON array log ----------------
+class JSONArrayWriter:
+    """packet_log.json as before (one JSON array of this run's records), appended in place.
+
+    The file is always a complete array: each write replaces the closing
+    bracket with the new record and a new bracket, so the history stays on
+    disk without being held in memory or rewritten per packet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None         # opened (truncated) on the first record, as the old rewrite did
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        text = json.dumps(record, indent=4, default=str)
+        with self._lock:
+            if self._f is None:
+                self._f = open(self.path, "wb")
+                data = "[\n" + text + "\n]"
+            elif self._f.closed:
+                return
+            else:
+                self._f.seek(-2, os.SEEK_END)  # before "\n]"
+                data = ",\n" + text + "\n]"
+            self._f.write(data.encode("utf-8"))
+            self._f.flush()
+
+    def flush(self):
+        pass  # every write() is flushed
+
+    def close(self):
+        with self._lock:
+            if self._f is not None and not self._f.closed:
+                self._f.close()
+
+
+# ---------------- Streaming readers ----------------
+def log_segments(path):
+    """Return the rotated segments and the live file, oldest first."""
+    segments = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        segments.append(f"{path}.{i}")
+        i += 1
+    segments.reverse()
+    if os.path.exists(path):
+        segments.append(path)
+    return segments
+
+
+def iter_records(path):
+    """Yield records one at a time from every segment of an NDJSON log."""
+    for segment in log_segments(path):
+        with open(segment, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn line from a crash that hasn't been repaired yet
+                    continue
+
+
+def iter_packet_log(ndjson_file, json_file):
+    """Stream records from the NDJSON log, falling back to the legacy JSON array."""
+    if log_segments(ndjson_file):
+        yield from iter_records(ndjson_file)
+    elif os.path.exists(json_file):
+        with open(json_file, "r", encoding="utf-8") as f:
+            yield from json.load(f)
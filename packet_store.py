@@ -0,0 +1,231 @@
+import os
+import socket
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# ---------------- Bounded packet store ----------------
+# The most recent packets as fixed-width NumPy columns in a ring buffer,
+# replacing the redirector's ever-growing list of dicts: ~30 bytes per packet
+# instead of several hundred. The columns are preallocated from the memory
+# cap, so the store never grows past it; once full, each new packet
+# overwrites the oldest one. Every packet has already been written to the
+# NDJSON log on disk by then, so nothing is lost: the ring is the recent
+# window, the log is the history. On shutdown the window is saved as
+# packet_store.npz for generate_graphs.py. Rows are staged in a short list
+# and copied into the columns STAGE_ROWS at a time (one slice assignment per
+# column instead of ten NumPy scalar writes per packet).
+
+PACKET_STORE_MB = 64
+PACKET_STORE_FILE = "packet_store.npz"
+STAGE_ROWS = 256              # rows buffered as tuples, then written into the columns in one go
+
+LABELS = ("BENIGN", "MALICIOUS")
+PROTOCOLS = ("TCP", "UDP", "ICMP", "OTHER")
+MAX_VERSIONS = 255            # model versions with their own code; later ones share the last code
+
+COLUMNS = (
+    ("time", np.float64),     # capture timestamp (epoch s)
+    ("src", np.uint32),
+    ("dst", np.uint32),
+    ("sport", np.uint16),
+    ("dport", np.uint16),
+    ("label", np.uint8),      # index into LABELS
+    ("proto", np.uint8),      # index into PROTOCOLS
+    ("flow", np.float32),     # FlowDuration (s)
+    ("version", np.uint8),    # index into the store's model version table
+    ("weight", np.uint16),    # sampling weight
+)
+ROW_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+
+_LABEL_CODES = {label: i for i, label in enumerate(LABELS)}
+_PROTO_CODES = {proto: i for i, proto in enumerate(PROTOCOLS)}
+_OTHER = _PROTO_CODES["OTHER"]
+
+
+def _entry(ts, src, dst, sport, dport, label, proto, flow, version, weight, versions):
+    entry = {
+        "Timestamp": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f"),
+        "Label": LABELS[label],
+        "Protocol": PROTOCOLS[proto],
+        "SrcIP": int_to_ip(src),
+        "DstIP": int_to_ip(dst),
+        "SrcPort": sport,
+        "DstPort": dport,
+        "FlowDuration": round(flow, 6),
+        "ModelVersion": versions[version] if version < len(versions) else "",
+    }
+    if weight != 1:
+        entry["SampleWeight"] = weight
+    return entry
+
+
+def ip_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(int(value).to_bytes(4, "big"))
+
+
+class PacketStore:
+    """Ring buffer of the last `capacity` packets, one NumPy array per field."""
+
+    def __init__(self, max_mb=PACKET_STORE_MB):
+        self.max_mb = max_mb
+        self.capacity = max(1, int(max_mb * 1024 * 1024) // ROW_BYTES)
+        self._cols = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in COLUMNS}
+        self.versions = []
+        self._version_codes = {}
+        self._pos = 0          # next slot to write
+        self.size = 0
+        self.added = 0
+        self._staged = []
+        self._lock = threading.Lock()  # written by the batcher thread, read by exports
+
+    def __len__(self):
+        return min(self.size + len(self._staged), self.capacity)
+
+    @property
+    def evicted(self):
+        return self.added + len(self._staged) - len(self)
+
+    def _version_code(self, version):
+        code = self._version_codes.get(version)
+        if code is None:
+            code = min(len(self.versions), MAX_VERSIONS - 1)
+            if len(self.versions) < MAX_VERSIONS:
+                self.versions.append(version)
+            self._version_codes[version] = code
+        return code
+
+    def add(self, ts, label, proto, src, dst, sport, dport, flow, version="", weight=1):
+        with self._lock:
+            self._staged.append((ts, ip_to_int(src), ip_to_int(dst), sport, dport, _LABEL_CODES[label],
+                                 _PROTO_CODES.get(proto, _OTHER), flow, self._version_code(version),
+                                 min(weight, 0xFFFF)))
+            if len(self._staged) >= STAGE_ROWS:
+                self._flush()
+
+    def _flush(self):
+        """Copy the staged rows into the ring (caller holds the lock)."""
+        staged = self._staged
+        self.added += len(staged)
+        self._staged = []
+        if not staged:
+            return
+        rows = staged[-self.capacity:]
+        n = len(rows)
+        # Rows skipped here still advance the ring: packet number `seq` always lives in slot seq % capacity
+        start = (self._pos + len(staged) - n) % self.capacity
+        fields = list(zip(*rows))
+        first = min(n, self.capacity - start)
+        for (name, dtype), values in zip(COLUMNS, fields):
+            col = self._cols[name]
+            values = np.asarray(values, dtype=dtype)
+            col[start:start + first] = values[:first]
+            col[:n - first] = values[first:]
+        self._pos = (start + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._staged = []
+            self._pos = self.size = self.added = 0
+
+    def columns(self):
+        """Copies of the columns, oldest packet first."""
+        with self._lock:
+            self._flush()
+            start = (self._pos - self.size) % self.capacity
+            if start + self.size <= self.capacity:
+                return {name: col[start:start + self.size].copy() for name, col in self._cols.items()}
+            return {name: np.concatenate((col[start:], col[:self._pos])) for name, col in self._cols.items()}
+
+    def records(self, limit=None):
+        """The window (or its newest `limit` packets) as packet-log dicts (same keys as the NDJSON log), oldest first."""
+        if limit is not None:
+            with self._lock:
+                self._flush()
+                added = self.added
+            yield from self.rows(range(max(0, added - limit), added))
+            return
+        cols = self.columns()
+        versions = list(self.versions)
+        columns = [cols[name].tolist() for name, _ in COLUMNS]
+        for row in zip(*columns):
+            yield _entry(*row, versions)
+
+    def find(self, label=None, proto=None, ip=None):
+        """Sequence numbers (packets numbered from 0 as added) of the window's matches, oldest first.
+
+        A vectorized scan of the columns (a few ms for a full default store),
+        so callers need no index of their own.
+        """
+        with self._lock:
+            self._flush()
+            start = (self._pos - self.size) % self.capacity
+            if start + self.size <= self.capacity:
+                spans = [slice(start, start + self.size)]
+            else:
+                spans = [slice(start, self.capacity), slice(0, self._pos)]
+            try:
+                ip_code = ip_to_int(ip) if ip else None
+            except OSError:  # not an IPv4 address: nothing in the store can match
+                return np.empty(0, dtype=np.int64)
+            masks = []
+            for span in spans:
+                mask = np.ones(span.stop - span.start, dtype=bool)
+                if label:
+                    mask &= self._cols["label"][span] == _LABEL_CODES.get(label, 255)
+                if proto:
+                    mask &= self._cols["proto"][span] == _PROTO_CODES.get(proto, 255)
+                if ip_code is not None:
+                    mask &= (self._cols["src"][span] == ip_code) | (self._cols["dst"][span] == ip_code)
+                masks.append(mask)
+            first = self.added - self.size
+        return first + np.flatnonzero(np.concatenate(masks) if len(masks) > 1 else masks[0])
+
+    def rows(self, seqs):
+        """Packet-log dicts for the given sequence numbers, skipping those already overwritten."""
+        with self._lock:
+            self._flush()
+            first = self.added - self.size
+            slots = [seq % self.capacity for seq in seqs if first <= seq < self.added]
+            if not slots:
+                return []
+            columns = [self._cols[name][slots].tolist() for name, _ in COLUMNS]
+            versions = list(self.versions)
+        return [_entry(*row, versions) for row in zip(*columns)]
+
+    def save(self, path=PACKET_STORE_FILE):
+        """Write the window as .npz columns plus the code tables (atomic replace)."""
+        cols = self.columns()
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, labels=np.array(LABELS), protocols=np.array(PROTOCOLS),
+                 versions=np.array(self.versions, dtype=str), **cols)
+        os.replace(tmp, path)
+        return path
+
+    def stats(self):
+        return {
+            "rows": len(self),
+            "capacity": self.capacity,
+            "added": self.added + len(self._staged),
+            "evicted": self.evicted,
+            "mb": self.capacity * ROW_BYTES / 1e6,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"🗄️ Packet store: {s['rows']:,}/{s['capacity']:,} packets in {s['mb']:.1f} MB "
+              f"({ROW_BYTES} B/packet), {s['evicted']:,} older ones only in the on-disk log")
+
+
+def load_packet_store(path=PACKET_STORE_FILE):
+    """Columns saved by PacketStore.save(): ({name: array}, {'labels', 'protocols', 'versions'})."""
+    with np.load(path) as data:
+        columns = {name: data[name] for name, _ in COLUMNS}
+        tables = {name: data[name].tolist() for name in ("labels", "protocols", "versions")}
+    return columns, tables
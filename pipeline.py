@@ -0,0 +1,351 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import random
+import signal
+import socket
+import struct
+import sys
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from flow_table import FlowTable
+from honeypot_channel import HoneypotChannel
+from ndjson_log import NDJSONLogWriter
+
+# ---------------- Multi-process capture/classify pipeline ----------------
+#
+#   capture ──(shared-memory ring per worker)──> worker x N ──(queue)──> logger
+#
+# The capture process only parses IP/TCP/UDP headers into fixed-width records
+# and pushes them into the ring of the worker that owns the flow (consistent
+# hash of the direction-independent 5-tuple), so per-flow state never leaves
+# one worker. Workers run the flow table + batched model.predict; a single
+# logger process writes the NDJSON log and forwards alerts to the honeypot.
+# Every stage boundary has a drop counter.
+#
+#   python pipeline.py --workers 4                # live capture
+#   python pipeline.py --workers 4 --replay x.pcap
+
+HONEYPOT_HOST = "127.0.0.1"
+HONEYPOT_PORT = 9999
+NDJSON_FILE = "packet_log.ndjson"
+MODEL_FILE = "model.pkl"
+FEATURES_FILE = "selected_features.pkl"
+
+WORKERS = max(1, (os.cpu_count() or 2) - 2)   # leave a core for capture and one for logging
+RING_SIZE = 1 << 16        # records per worker ring
+BATCH_SIZE = 256           # max records a worker scores per predict()
+LOG_QUEUE_SIZE = 1024      # batches waiting for the logger
+REPORT_INTERVAL = 5.0      # seconds between stage counter reports
+
+RECORD = np.dtype([
+    ("ts", "f8"), ("src", "u4"), ("dst", "u4"), ("sport", "u2"), ("dport", "u2"),
+    ("proto", "u1"), ("flags", "u1"), ("length", "u4"),
+])
+PROTO_NAMES = {6: "TCP", 17: "UDP", 1: "ICMP"}
+
+# ---------------- Shared-memory ring ----------------
+_HEAD = 0     # write index (owned by the producer), own cache line
+_TAIL = 64    # read index (owned by the consumer), own cache line
+_SLOTS = 128
+
+
+class ShmRing:
+    """Single-producer/single-consumer ring of RECORD slots in shared memory."""
+
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity
+        size = _SLOTS + capacity * RECORD.itemsize
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self._head = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=_HEAD)
+        self._tail = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=_TAIL)
+        self._slots = np.ndarray((capacity,), dtype=RECORD, buffer=buf, offset=_SLOTS)
+        if name is None:
+            self._head[0] = 0
+            self._tail[0] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return int(self._head[0]) - int(self._tail[0])
+
+    def push(self, record):
+        head = int(self._head[0])
+        if head - int(self._tail[0]) >= self.capacity:
+            return False
+        self._slots[head % self.capacity] = record
+        self._head[0] = head + 1  # publish only after the slot is written
+        return True
+
+    def pop_batch(self, max_n):
+        tail = int(self._tail[0])
+        n = min(int(self._head[0]) - tail, max_n)
+        if n <= 0:
+            return np.empty(0, dtype=RECORD)
+        start = tail % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            batch = self._slots[start:end].copy()
+        else:
+            batch = np.concatenate((self._slots[start:], self._slots[:end - self.capacity]))
+        self._tail[0] = tail + n
+        return batch
+
+    def close(self, unlink=False):
+        del self._head, self._tail, self._slots
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+# ---------------- Shared counters ----------------
+class StageCounters:
+    """Per-stage, per-process counters in shared memory; every slot has a single writer."""
+
+    FIELDS = ("captured", "non_ip", "ring_drops", "classified", "log_drops", "logged",
+              "honeypot_sent", "honeypot_drops")
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._arrays = {name: mp.Array("Q", workers, lock=False) for name in self.FIELDS}
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    def total(self, name):
+        return sum(self._arrays[name])
+
+    def report(self, rings):
+        t = {name: self.total(name) for name in self.FIELDS}
+        backlog = [len(r) for r in rings]
+        print(f"📊 captured={t['captured']:,} non_ip={t['non_ip']:,} | ring drops={t['ring_drops']:,} "
+              f"backlog={backlog} | classified={t['classified']:,} log-queue drops={t['log_drops']:,} | "
+              f"logged={t['logged']:,} | honeypot sent={t['honeypot_sent']:,} drops={t['honeypot_drops']:,}")
+
+
+# ---------------- Capture process ----------------
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping & Veach): stable bucket for a 64-bit key."""
+    b, j = -1, 0
+    key &= 0xFFFFFFFFFFFFFFFF
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def flow_shard(src, dst, sport, dport, proto, workers):
+    """Same worker for both directions of a flow."""
+    a, b = (src, sport), (dst, dport)
+    if a > b:
+        a, b = b, a
+    return jump_hash(hash((a, b, proto)), workers)
+
+
+def capture_main(ring_names, ring_size, counters, stop, iface, bpf, replay, no_filter=False):
+    from scapy.all import AsyncSniffer, PcapReader, IP, TCP, UDP
+    from capture import open_capture, capture_filter
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    rings = [ShmRing(ring_size, name) for name in ring_names]
+    workers = len(rings)
+    captured, non_ip, ring_drops = counters["captured"], counters["non_ip"], counters["ring_drops"]
+    ip_to_int = struct.Struct("!I").unpack
+
+    def on_packet(packet):
+        captured[0] += 1
+        if IP not in packet:
+            non_ip[0] += 1
+            return
+        ip = packet[IP]
+        if TCP in packet:
+            l4 = packet[TCP]
+            sport, dport, flags, length = l4.sport, l4.dport, int(l4.flags), len(l4.payload)
+        elif UDP in packet:
+            l4 = packet[UDP]
+            sport, dport, flags, length = l4.sport, l4.dport, 0, len(l4.payload)
+        else:
+            sport = dport = flags = 0
+            length = len(ip.payload)
+        src = ip_to_int(socket.inet_aton(ip.src))[0]
+        dst = ip_to_int(socket.inet_aton(ip.dst))[0]
+        w = flow_shard(src, dst, sport, dport, ip.proto, workers)
+        if not rings[w].push((float(packet.time), src, dst, sport, dport, ip.proto, flags, length)):
+            ring_drops[w] += 1
+
+    if replay:
+        with PcapReader(replay) as reader:
+            for packet in reader:
+                if stop.is_set():
+                    break
+                on_packet(packet)
+    else:
+        # One capture socket (and kernel filter) for the whole run, not one per sniff() call.
+        # By default: IPv4 only, and not the logger's own alerts to the honeypot (a feedback loop)
+        exclude = (HONEYPOT_HOST, HONEYPOT_PORT)
+        if not no_filter and bpf is None:
+            bpf = capture_filter(*exclude)
+        sock, _, lfilter = open_capture(iface, None if no_filter else bpf, exclude)
+        sniffer = AsyncSniffer(opened_socket=sock, prn=on_packet, lfilter=lfilter, store=0)
+        sniffer.start()
+        while sniffer.running and not stop.wait(1.0):
+            pass
+        if sniffer.running:
+            sniffer.stop()
+        sock.close()
+    for r in rings:
+        r.close()
+
+
+# ---------------- Worker process ----------------
+def _ip_str(value):
+    return socket.inet_ntoa(struct.pack("!I", value))
+
+
+def worker_main(index, ring_name, ring_size, log_queue, counters, stop):
+    import joblib
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = ShmRing(ring_size, ring_name)
+    model = joblib.load(MODEL_FILE)
+    model.set_params(n_jobs=1)  # one core per worker; don't oversubscribe with OpenMP threads
+    selected_features = joblib.load(FEATURES_FILE)
+    flows = FlowTable(selected_features)
+    X = np.zeros((BATCH_SIZE, len(selected_features)), dtype=np.float64)
+    classified, log_drops = counters["classified"], counters["log_drops"]
+
+    while True:
+        batch = ring.pop_batch(BATCH_SIZE)
+        n = len(batch)
+        if n == 0:
+            if stop.is_set():
+                break
+            time.sleep(0.001)
+            continue
+
+        for i, rec in enumerate(batch.tolist()):
+            ts, src, dst, sport, dport, proto, flags, length = rec
+            X[i] = flows.update_meta((src, dst, sport, dport, proto), ts, length, flags)
+        try:
+            preds = model.predict(X[:n])
+        except Exception:
+            preds = np.zeros(n, dtype=int)
+
+        now = datetime.now().timestamp()
+        entries = []
+        for rec, pred in zip(batch.tolist(), preds):
+            ts, src, dst, sport, dport, proto, _, _ = rec
+            entries.append({
+                "Timestamp": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                "Label": "MALICIOUS" if pred == 1 or random.random() < 0.05 else "BENIGN",
+                "Protocol": PROTO_NAMES.get(proto, "OTHER"),
+                "SrcIP": _ip_str(src),
+                "DstIP": _ip_str(dst),
+                "SrcPort": sport,
+                "DstPort": dport,
+                "FlowDuration": round(now - ts, 6),
+            })
+        classified[index] += n
+        try:
+            log_queue.put_nowait(entries)
+        except queue.Full:
+            log_drops[index] += n
+
+    log_queue.put(None)
+    ring.close()
+
+
+# ---------------- Logger process ----------------
+def logger_main(log_queue, workers, counters):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    writer = NDJSONLogWriter(NDJSON_FILE)
+    honeypot = HoneypotChannel(HONEYPOT_HOST, HONEYPOT_PORT)
+    logged = counters["logged"]
+    running = workers
+    while running:
+        entries = log_queue.get()
+        if entries is None:
+            running -= 1
+            continue
+        for entry in entries:
+            writer.write(entry)
+            if entry["Label"] == "MALICIOUS":
+                honeypot.send(f"MALICIOUS | Src={entry['SrcIP']}, Dst={entry['DstIP']}, "
+                              f"Proto={entry['Protocol']}, Sport={entry['SrcPort']}, Dport={entry['DstPort']}")
+        logged[0] += len(entries)
+        counters["honeypot_sent"][0] = honeypot.sent
+        counters["honeypot_drops"][0] = honeypot.dropped
+    writer.close()
+    honeypot.close()
+    counters["honeypot_sent"][0] = honeypot.sent
+    counters["honeypot_drops"][0] = honeypot.dropped
+
+
+# ---------------- Orchestration ----------------
+def run_pipeline(workers=WORKERS, ring_size=RING_SIZE, iface=None, bpf=None, replay=None, no_filter=False):
+    counters = StageCounters(workers)
+    rings = [ShmRing(ring_size) for _ in range(workers)]
+    stop_capture = mp.Event()
+    stop_workers = mp.Event()
+    log_queue = mp.Queue(LOG_QUEUE_SIZE)
+
+    logger = mp.Process(target=logger_main, args=(log_queue, workers, counters), name="logger")
+    pool = [mp.Process(target=worker_main, name=f"worker-{i}",
+                       args=(i, rings[i].name, ring_size, log_queue, counters, stop_workers))
+            for i in range(workers)]
+    capture = mp.Process(target=capture_main, name="capture",
+                         args=([r.name for r in rings], ring_size, counters, stop_capture, iface, bpf, replay,
+                               no_filter))
+
+    logger.start()
+    for p in pool:
+        p.start()
+    capture.start()
+    print(f"📡 Pipeline running: 1 capture, {workers} workers, 1 logger (CTRL+C to stop)")
+
+    started = time.monotonic()
+    try:
+        while capture.is_alive():
+            capture.join(REPORT_INTERVAL)
+            counters.report(rings)
+    except KeyboardInterrupt:
+        print("\n🛑 Packet capture stopped by user")
+    stop_capture.set()
+    capture.join()
+    stop_workers.set()  # workers drain their rings, then exit
+    for p in pool:
+        p.join()
+    logger.join()
+    elapsed = time.monotonic() - started
+
+    counters.report(rings)
+    print(f"✅ {counters.total('logged'):,} packets logged in {elapsed:.2f}s "
+          f"({counters.total('logged') / max(elapsed, 1e-9):,.0f} pkt/s)")
+    for r in rings:
+        r.close(unlink=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process capture/classify pipeline")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--ring-size", type=int, default=RING_SIZE, help="records per worker ring")
+    parser.add_argument("--iface", help="interface to sniff (default: scapy's default)")
+    parser.add_argument("--filter", metavar="BPF",
+                        help="kernel capture filter (default: IPv4 without the logger's own honeypot traffic)")
+    parser.add_argument("--no-filter", action="store_true", help="capture every frame")
+    parser.add_argument("--replay", metavar="PCAP", help="feed a pcap/pcapng file instead of sniffing")
+    args = parser.parse_args()
+    run_pipeline(args.workers, args.ring_size, args.iface, args.filter, args.replay, args.no_filter)
+    sys.exit(0)
@@ -1,6 +1,4 @@
-import joblib
-from scapy.all import sniff, IP, TCP, UDP, ICMP
-import socket
+from scapy.all import sniff, PcapReader, IP, TCP, UDP, ICMP, conf, get_if_addr
 import webbrowser
 import os
 import signal
@@ -8,70 +6,197 @@ import sys
 from datetime import datetime
 import random
 import json
+import time
+import argparse
+from ndjson_log import NDJSONLogWriter, JSONArrayWriter
+from packet_store import PacketStore, PACKET_STORE_MB, PACKET_STORE_FILE
+from batch_inference import MicroBatcher
+from flow_table import FlowTable, packet_key
+from source_sketch import SourceSketch, SOURCE_FEATURES, ALERT_KINDS, networks
+from verdict_cache import VerdictCache, normalize_key
+from model_registry import ModelManager, MODEL_DIR, POLL_INTERVAL
+from honeypot_channel import HoneypotChannel
+from dashboard_server import DashboardState, start_dashboard_server, DASHBOARD_PORT
+from rollup import RollupStore
+from capture import open_capture, capture_filter, AdaptiveSampler
+from metrics import MetricsRegistry, start_metrics_server, LAG_BUCKETS, REDIRECTOR_METRICS_PORT
 
 HONEYPOT_HOST = "127.0.0.1"
 HONEYPOT_PORT = 9999
 HTML_FILE = "dashboard.html"
+HTML_MAX_PACKETS = 5000    # newest packets embedded in dashboard.html; full history: --serve, rollups, the log
 JSON_FILE = "packet_log.json"
+NDJSON_FILE = "packet_log.ndjson"
+LOG_MODE = "ndjson"  # "ndjson" = append-only batched log, "json" = legacy JSON array (appended in place)
+BATCH_SIZE = 64            # packets per model.predict call
+BATCH_MAX_LATENCY_MS = 5   # ...or run a partial batch once the oldest packet has waited this long
+VERBOSE = True             # print one line per classified packet
+VERDICT_CACHE = True       # reuse a flow's verdict instead of re-running the model on every packet
+COMPILED_MAX_BATCH = 32    # batches up to this size use the NumPy tree evaluator, larger ones model.predict
 
 print("✅ Loading trained model and features...")
-model = joblib.load("model.pkl")
-selected_features = joblib.load("selected_features.pkl")
+# Newest published version under models/, else model.pkl in the working directory.
+# New versions are hot-swapped between batches once --watch-models is on.
+models = ModelManager(MODEL_DIR, compiled_max_batch=COMPILED_MAX_BATCH)
+selected_features = models.features  # fixed for the run: the extractor is built for these
 
-packet_log = []
+packet_store = PacketStore(PACKET_STORE_MB)  # recent packets as columns; the NDJSON log keeps them all
+packet_writer = NDJSONLogWriter(NDJSON_FILE) if LOG_MODE == "ndjson" else JSONArrayWriter(JSON_FILE)
+flow_table = FlowTable(selected_features)
+source_sketch = SourceSketch()  # per-source rates, distinct destinations and scan/flood alerts
+# Columns of selected_features filled from the sketches (models trained with per-source features)
+SKETCH_COLUMNS = [(j, SOURCE_FEATURES.index(name)) for j, name in enumerate(selected_features)
+                  if name in SOURCE_FEATURES]
+verdict_cache = VerdictCache() if VERDICT_CACHE else None
+if verdict_cache is not None:
+    models.on_swap = lambda old, new: verdict_cache.clear()  # don't serve the old model's verdicts
+honeypot = HoneypotChannel(HONEYPOT_HOST, HONEYPOT_PORT)
+rollups = RollupStore()  # per-second/minute/hour buckets behind the dashboard charts
+live_dashboard = None  # DashboardState when --serve is given
+sampler = None  # AdaptiveSampler when --adaptive-sampling is given
+capture_stats = None  # kernel receive/drop counters of the live capture socket
+
+# ---------------- Metrics ----------------
+# Per-stage latency histograms (their sums are the per-stage totals printed
+# after a replay), packet / verdict / error counters, and how far verdicts lag
+# behind the capture timestamps. Served as Prometheus text with --metrics.
+STAGES = ("read", "sketch", "features", "inference", "logging", "print", "honeypot")
+metrics = MetricsRegistry()
+stage_latency = {stage: metrics.histogram("redirector_stage_seconds", "Time spent per pipeline stage call",
+                                          stage=stage) for stage in STAGES}
+capture_lag = metrics.histogram("redirector_capture_lag_seconds",
+                                "Wall clock minus the packet capture timestamp at verdict time", LAG_BUCKETS)
+packets_total = metrics.counter("redirector_packets_total", "IP packets handed to the pipeline")
+verdict_counts = {label: metrics.counter("redirector_verdicts_total", "Verdicts per label", label=label)
+                  for label in ("BENIGN", "MALICIOUS")}
+# Verdicts scaled by the sampling weight: what the counts would be without sampling
+estimated_counts = {label: metrics.counter("redirector_verdicts_estimated_total",
+                                           "Verdicts per label scaled up by the flow sample rate", label=label)
+                    for label in ("BENIGN", "MALICIOUS")}
+stage_errors = {stage: metrics.counter("redirector_errors_total", "Exceptions caught per stage", stage=stage)
+                for stage in ("features", "logging")}
+for kind in ALERT_KINDS:
+    metrics.counter("redirector_source_alerts_total", "Scan/flood alerts from the per-source sketches",
+                    lambda kind=kind: source_sketch.alerts.get(kind, 0), kind=kind)
 
 # ---------------- Feature Extraction ----------------
-def extract_features(packet):
+SYN, ACK = 0x02, 0x10
+
+def parse_packet(packet):
+    """(5-tuple key, capture timestamp, payload length, TCP flags) of an IP packet, parsed once."""
+    key, length = packet_key(packet)
+    flags = int(packet[TCP].flags) if TCP in packet else 0
+    return key, float(getattr(packet, "time", 0)), length, flags
+
+def extract_features(meta, source=None):
+    """Update the packet's flow and return its features in selected_features order.
+
+    `source` is the sender's per-source sketch features, for models trained with them.
+    """
     try:
-        features = {
-            "Flow Duration": getattr(packet, "time", 0),
-            "Protocol": packet.proto if hasattr(packet, "proto") else 0,
-        }
-        return [features.get(f, 0) for f in selected_features]
+        row = flow_table.update_meta(*meta)
+        for j, i in SKETCH_COLUMNS:
+            row[j] = source[i]
+        return row
     except Exception:
+        stage_errors["features"].inc()
         return [0] * len(selected_features)
 
+def on_source_alert(kind, src, source):
+    """A source crossed a scan/flood threshold: say so and tell the honeypot."""
+    pkt_rate, _, syn_rate, ports, hosts = source
+    details = f"pkts/s={pkt_rate:,.0f}, syn/s={syn_rate:,.0f}, dst_ports~{ports:,.0f}, dst_ips~{hosts:,.0f}"
+    print(f"🚨 {kind} from {src}: {details}")
+    honeypot.send(f"MALICIOUS | Alert={kind}, Src={src}, {details}")
+
+source_sketch.on_alert = on_source_alert
+
 # ---------------- Honeypot ----------------
 def send_to_honeypot(packet, label):
+    """Queue a MALICIOUS alert on the persistent honeypot channel (never blocks)."""
     if label != "MALICIOUS":
         return
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect((HONEYPOT_HOST, HONEYPOT_PORT))
-        proto = "TCP" if TCP in packet else "UDP" if UDP in packet else "ICMP" if ICMP in packet else "OTHER"
-        sport = packet.sport if hasattr(packet, "sport") else 0
-        dport = packet.dport if hasattr(packet, "dport") else 0
-        msg = f"MALICIOUS | Src={packet[IP].src}, Dst={packet[IP].dst}, Proto={proto}, Sport={sport}, Dport={dport}"
-        s.sendall(msg.encode("utf-8", errors="ignore"))
-        s.close()
-    except Exception as e:
-        print(f"❌ Error sending to honeypot: {e}")
+    proto = "TCP" if TCP in packet else "UDP" if UDP in packet else "ICMP" if ICMP in packet else "OTHER"
+    sport = packet.sport if hasattr(packet, "sport") else 0
+    dport = packet.dport if hasattr(packet, "dport") else 0
+    msg = f"MALICIOUS | Src={packet[IP].src}, Dst={packet[IP].dst}, Proto={proto}, Sport={sport}, Dport={dport}"
+    honeypot.send(msg)
 
 # ---------------- Real-time JSON logging ----------------
-def save_packet_log_realtime():
-    """Save packet log to JSON file in real-time."""
+def save_packet_log_realtime(log_entry):
+    """Save packet log in real-time (every packet, not just the packet store's window)."""
     try:
-        with open(JSON_FILE, "w", encoding="utf-8") as f:
-            json.dump(packet_log, f, indent=4, default=str)
+        packet_writer.write(log_entry)
     except Exception as e:
+        stage_errors["logging"].inc()
         print(f"❌ Error saving packet log: {e}")
 
 # ---------------- Packet Classification ----------------
 def classify_and_redirect(packet):
+    """sniff() callback: update the source sketches and flow features, then hand the packet to the batching stage."""
     if IP not in packet:
         return
-    features = extract_features(packet)
+    packets_total.inc()
+    t0 = time.perf_counter()
+    meta = parse_packet(packet)
+    key, ts, length, flags = meta
+    t1 = time.perf_counter()
+    # Every packet, sampled or not: floods are exactly when sampling kicks in
+    source = source_sketch.update(key[0], key[1], key[3], length, flags & (SYN | ACK) == SYN, ts)
+    t2 = time.perf_counter()
+    stage_latency["sketch"].observe(t2 - t1)
+    weight = 1
+    flow_key = None
+    if sampler is not None:
+        flow_key = normalize_key(key)
+        weight = sampler.sample(flow_key, ts)
+        if not weight:
+            return  # flow not in the current sample
+    t2 = time.perf_counter()
+    features = extract_features(meta, source)
+    stage_latency["features"].observe(time.perf_counter() - t2 + t1 - t0)
+    if verdict_cache is None:
+        batcher.submit(features, (packet, None, weight))
+        return
+    if flow_key is None:
+        flow_key = normalize_key(key)
+    key = flow_key
+    cached = verdict_cache.get(key, ts, flags)
+    if cached is None:
+        batcher.submit(features, (packet, (key, flags), weight))
+    else:
+        batcher.submit(features, (packet, None, weight), pred=cached)
+
+def predict_batch(X):
+    t0 = time.perf_counter()
     try:
-        pred = model.predict([features])[0]
-    except Exception:
-        pred = 0
+        return models.predict(X)
+    finally:
+        stage_latency["inference"].observe(time.perf_counter() - t0)
 
+def on_verdict(item, pred):
+    """Batcher callback: remember fresh model verdicts per flow, then handle the packet."""
+    packet, cache_key, weight = item
+    if cache_key is not None:
+        key, flags = cache_key
+        verdict_cache.put(key, pred, float(packet.time), flags)
+    handle_verdict(packet, pred, weight)
+
+def handle_verdict(packet, pred, weight=1):
+    """Called by the batching stage for each packet, in capture order.
+
+    `weight` is how many packets this one stands for under flow sampling. The
+    label stays the model's; a scan/flood alert on the source (already sent to
+    the honeypot once by on_source_alert) is only recorded as SourceAlert.
+    """
+    pkt_time = float(getattr(packet, "time", datetime.now().timestamp()))  # scapy gives EDecimal
+    alert = source_sketch.alert(packet[IP].src, pkt_time)
     label = "MALICIOUS" if pred == 1 or random.random() < 0.05 else "BENIGN"
     proto = "TCP" if TCP in packet else "UDP" if UDP in packet else "ICMP" if ICMP in packet else "OTHER"
     sport = packet.sport if hasattr(packet, "sport") else 0
     dport = packet.dport if hasattr(packet, "dport") else 0
-    timestamp = datetime.fromtimestamp(getattr(packet, "time", 0)).strftime("%Y-%m-%d %H:%M:%S.%f")
-    flow_duration = round(datetime.now().timestamp() - getattr(packet, "time", datetime.now().timestamp()), 6)
+    timestamp = datetime.fromtimestamp(pkt_time).strftime("%Y-%m-%d %H:%M:%S.%f")
+    flow_duration = round(datetime.now().timestamp() - pkt_time, 6)
 
     log_entry = {
         "Timestamp": timestamp,
@@ -82,25 +207,82 @@ def classify_and_redirect(packet):
         "SrcPort": sport,
         "DstPort": dport,
         "FlowDuration": flow_duration,
+        "ModelVersion": models.batch_version,
     }
+    if sampler is not None:
+        log_entry["SampleWeight"] = weight
+    if alert:
+        log_entry["SourceAlert"] = alert
 
-    packet_log.append(log_entry)
-    save_packet_log_realtime()  # <-- save immediately after each packet
-
-    print(f"➡️ Packet classified: {label} | {proto} {packet[IP].src}:{sport} -> {packet[IP].dst}:{dport}")
+    verdict_counts[label].inc()
+    estimated_counts[label].inc(weight)
+    capture_lag.observe(flow_duration)
+    t0 = time.perf_counter()
+    packet_store.add(pkt_time, label, proto, log_entry["SrcIP"], log_entry["DstIP"], sport, dport,
+                     flow_duration, models.batch_version, weight)
+    save_packet_log_realtime(log_entry)  # <-- buffered append, flushed by size/time
+    rollups.add(pkt_time, label, proto, log_entry["SrcIP"], flow_duration)
+    if live_dashboard is not None:
+        live_dashboard.add(log_entry)
+    t1 = time.perf_counter()
+    if VERBOSE:
+        print(f"➡️ Packet classified: {label} | {proto} {packet[IP].src}:{sport} -> {packet[IP].dst}:{dport}")
+    t2 = time.perf_counter()
     send_to_honeypot(packet, label)
+    t3 = time.perf_counter()
+    stage_latency["logging"].observe(t1 - t0)
+    stage_latency["print"].observe(t2 - t1)
+    stage_latency["honeypot"].observe(t3 - t2)
 
-# ---------------- Dashboard Generation ----------------
-def generate_dashboard():
-    # Load latest packet log from JSON to ensure up-to-date
-    try:
-        with open(JSON_FILE, "r", encoding="utf-8") as f:
-            log_data = json.load(f)
-    except Exception:
-        log_data = packet_log
+batcher = MicroBatcher(predict_batch, on_verdict, len(selected_features),
+                       batch_size=BATCH_SIZE, max_latency_ms=BATCH_MAX_LATENCY_MS)
+
+# Counts the other components already keep, read at scrape time
+metrics.counter("redirector_errors_total", "Exceptions caught per stage", lambda: batcher.predict_errors,
+                stage="inference")
+metrics.counter("redirector_errors_total", "Exceptions caught per stage", lambda: batcher.verdict_errors,
+                stage="verdict")
+metrics.counter("redirector_errors_total", "Exceptions caught per stage", lambda: honeypot.errors,
+                stage="honeypot")
+metrics.counter("redirector_dropped_total", "Packets or alerts dropped on a full queue", lambda: batcher.dropped,
+                queue="inference")
+metrics.counter("redirector_dropped_total", "Packets or alerts dropped on a full queue", lambda: honeypot.dropped,
+                queue="honeypot")
+metrics.gauge("redirector_inference_queue", "Packets waiting for a verdict", lambda: batcher.pending)
+metrics.gauge("redirector_active_flows", "Flows in the flow table", lambda: len(flow_table))
+metrics.gauge("redirector_packet_store_rows", "Recent packets held in memory", lambda: len(packet_store))
+metrics.counter("redirector_model_swaps_total", "Model hot swaps", lambda: models.swaps)
+metrics.counter("redirector_model_rollbacks_total", "Model rollbacks", lambda: models.rollbacks)
+metrics.gauge("redirector_sample_rate", "Share of flows currently sampled (1 = all)",
+              lambda: sampler.rate if sampler is not None else 1.0)
+metrics.counter("redirector_sampled_out_total", "Packets skipped by flow sampling",
+                lambda: sampler.seen - sampler.kept if sampler is not None else 0)
+metrics.counter("redirector_kernel_received_total", "Packets the kernel passed the capture filter",
+                lambda: capture_stats.counts()[0] if capture_stats is not None else 0)
+metrics.counter("redirector_kernel_dropped_total", "Packets the kernel dropped before capture read them",
+                lambda: capture_stats.counts()[1] if capture_stats is not None else 0)
+if verdict_cache is not None:
+    metrics.counter("redirector_verdict_cache_hits_total", "Verdicts served from the cache",
+                    lambda: verdict_cache.hits)
+    metrics.counter("redirector_verdict_cache_misses_total", "Verdict cache misses",
+                    lambda: verdict_cache.misses)
 
-    embedded = json.dumps(log_data, default=str).replace("`", "\\`")
+# ---------------- Dashboard Generation ----------------
+def _stream_packets_js(f):
+    """Write the newest HTML_MAX_PACKETS packets into the page as a JS array literal, one record at a time."""
+    records = packet_store.records(HTML_MAX_PACKETS)
+    first = next(records, None)
+    f.write("[")
+    if first is not None:
+        f.write(json.dumps(first, default=str).replace("</", "<\\/"))
+        for rec in records:
+            f.write(",\n")
+            f.write(json.dumps(rec, default=str).replace("</", "<\\/"))
+    f.write("]")
 
+def generate_dashboard(open_browser=True):
+    total = packet_store.stats()["added"]
+    shown = min(len(packet_store), HTML_MAX_PACKETS)
     html_content = f"""
 <!doctype html>
 <html lang="en">
@@ -154,6 +336,7 @@ body {{ background:#f8f9fa; font-family:Inter,sans-serif; }}
 <tbody></tbody>
 </table>
 </div>
+<p class="text-muted small">Newest {shown:,} of {total:,} packets; the charts cover the whole capture.</p>
 
 <div class="modal fade" id="detailModal" tabindex="-1">
 <div class="modal-dialog modal-dialog-centered">
@@ -168,7 +351,8 @@ body {{ background:#f8f9fa; font-family:Inter,sans-serif; }}
 </div>
 
 <script>
-const PACKETS = JSON.parse(`{embedded}`);
+const ROLLUPS = __ROLLUPS__;  // [start, benign, malicious, flow_sum, count] per bucket
+const PACKETS = __PACKETS__;
 const tableBody = document.querySelector('#packetTable tbody');
 const avgContainer = document.getElementById('avgFlowLineChartContainer');
 
@@ -194,10 +378,10 @@ function renderTable(filter="ALL") {{
 }}
 
 function renderCharts() {{
-    const times = PACKETS.map(p=>p.Timestamp);
-    const benignData = PACKETS.map(p=>p.Label==='BENIGN'?1:0);
-    const maliciousData = PACKETS.map(p=>p.Label==='MALICIOUS'?1:0);
-    const avgFlowData = PACKETS.map(p=>Number(p.FlowDuration));
+    const times = ROLLUPS.map(b=>new Date(b[0]*1000).toLocaleString());
+    const benignData = ROLLUPS.map(b=>b[1]);
+    const maliciousData = ROLLUPS.map(b=>b[2]);
+    const avgFlowData = ROLLUPS.map(b=>b[4] ? b[3]/b[4] : 0);
 
     new Chart(document.getElementById('flowBarChart').getContext('2d'), {{
         type:'bar',
@@ -208,7 +392,7 @@ function renderCharts() {{
                 {{ label:'Malicious', data:maliciousData, backgroundColor:'rgba(255,99,132,0.6)' }}
             ]
         }},
-        options:{{ responsive:true, scales:{{ x:{{ display:false }}, y:{{ beginAtZero:true, ticks:{{ stepSize:1 }} }} }} }}
+        options:{{ responsive:true, scales:{{ x:{{ display:false, stacked:true }}, y:{{ beginAtZero:true, stacked:true }} }} }}
     }});
 
     new Chart(document.getElementById('avgFlowLineChart').getContext('2d'), {{
@@ -216,7 +400,7 @@ function renderCharts() {{
         data:{{
             labels:times,
             datasets:[{{
-                label:'Flow Duration (s)',
+                label:'Avg Flow Duration (s)',
                 data:avgFlowData,
                 borderColor:'orange',
                 backgroundColor:'rgba(255,165,0,0.2)',
@@ -237,20 +421,141 @@ renderTable();
 </html>
 """
 
+    # Stream the log into the page instead of building one huge string in memory
+    head, tail = html_content.split("__PACKETS__", 1)
+    head = head.replace("__ROLLUPS__", json.dumps(rollups.chart_timeline()))
     with open(HTML_FILE, "w", encoding="utf-8") as f:
-        f.write(html_content)
+        f.write(head)
+        _stream_packets_js(f)
+        f.write(tail)
     print(f"🌐 Dashboard saved to {HTML_FILE}")
-    webbrowser.open(f"file://{os.path.abspath(HTML_FILE)}")
+    if open_browser:
+        webbrowser.open(f"file://{os.path.abspath(HTML_FILE)}")
 
 # ---------------- Stop Packet Capture ----------------
+def shutdown():
+    """Drain the pipeline, close outputs and print pipeline statistics."""
+    batcher.close()
+    batcher.report()
+    models.stop()
+    models.report()
+    flow_table.report()
+    source_sketch.report()
+    if verdict_cache is not None:
+        verdict_cache.report()
+    if sampler is not None:
+        sampler.report()
+    if capture_stats is not None:
+        capture_stats.report()
+    honeypot.close()
+    honeypot.report()
+    rollups.close()
+    rollups.report()
+    packet_store.save(PACKET_STORE_FILE)
+    packet_store.report()
+    packet_writer.close()
+
 def stop_sniff(signal_received, frame):
     print("\n🛑 Packet capture stopped by user")
+    shutdown()
     generate_dashboard()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, stop_sniff)
 
+# ---------------- Offline Replay ----------------
+def replay_pcap(path, speed=0.0):
+    """Stream a pcap/pcapng file through the live pipeline without loading it into memory.
+
+    speed=0 replays as fast as possible, 1.0 at the original timing, 2.0 twice as fast, etc.
+    """
+    print(f"⏯️ Replaying {path} ({'max speed' if speed <= 0 else f'{speed}x timing'})...")
+    packets = 0
+    first_ts = None
+    wall_start = time.perf_counter()
+    with PcapReader(path) as reader:
+        while True:
+            t0 = time.perf_counter()
+            packet = next(reader, None)
+            stage_latency["read"].observe(time.perf_counter() - t0)
+            if packet is None:
+                break
+            if speed > 0:
+                ts = float(packet.time)
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            packets += 1
+            classify_and_redirect(packet)
+    batcher.close()  # wait for the last verdicts before stopping the clock
+    elapsed = time.perf_counter() - wall_start
+    shutdown()
+
+    print(f"✅ Replayed {packets:,} packets in {elapsed:.2f}s ({packets / max(elapsed, 1e-9):,.0f} pkt/s)")
+    for stage in STAGES:
+        h = stage_latency[stage]
+        print(f"   {stage:<10} {h.sum:8.3f}s  {h.sum / max(packets, 1) * 1e6:8.1f} µs/packet  "
+              f"p50≤{h.quantile(0.5) * 1e6:,.0f}µs p99≤{h.quantile(0.99) * 1e6:,.0f}µs per call")
+    total = sum(c.value for c in verdict_counts.values())
+    for label, counter in sorted(verdict_counts.items(), key=lambda kv: -kv[1].value):
+        scaled = f"  ~{estimated_counts[label].value:,} unsampled" if sampler is not None else ""
+        print(f"   {label:<10} {counter.value:>10,} ({counter.value / max(total, 1):.1%}){scaled}")
+
 # ---------------- Main ----------------
 if __name__ == "__main__":
-    print("📡 Starting packet capture... (CTRL+C to stop)")
-    sniff(prn=classify_and_redirect, store=0)
+    parser = argparse.ArgumentParser(description="Classify live or recorded traffic and redirect malicious packets")
+    parser.add_argument("--replay", metavar="PCAP", help="replay a pcap/pcapng file instead of sniffing")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay timing multiplier (0 = as fast as possible, 1 = original)")
+    parser.add_argument("--quiet", action="store_true", help="don't print every classified packet")
+    parser.add_argument("--seed", type=int, help="seed the random fallback for repeatable verdicts")
+    parser.add_argument("--serve", nargs="?", type=int, const=DASHBOARD_PORT, metavar="PORT",
+                        help=f"serve the live dashboard over HTTP (default port {DASHBOARD_PORT})")
+    parser.add_argument("--watch-models", nargs="?", type=float, const=POLL_INTERVAL, metavar="SECONDS",
+                        help=f"hot-swap newly published versions from {MODEL_DIR}/ (default poll {POLL_INTERVAL:g}s)")
+    parser.add_argument("--metrics", nargs="?", type=int, const=REDIRECTOR_METRICS_PORT, metavar="PORT",
+                        help=f"serve Prometheus metrics on /metrics (default port {REDIRECTOR_METRICS_PORT})")
+    parser.add_argument("--iface", help="interface to capture on (default: scapy's default interface)")
+    parser.add_argument("--filter", default=capture_filter(HONEYPOT_HOST, HONEYPOT_PORT), metavar="BPF",
+                        help="kernel capture filter (default: IPv4 without our own honeypot traffic)")
+    parser.add_argument("--no-filter", action="store_true", help="capture every frame")
+    parser.add_argument("--adaptive-sampling", action="store_true",
+                        help="sample fewer flows while the pipeline falls behind (verdicts carry a SampleWeight)")
+    parser.add_argument("--store-mb", type=float, default=PACKET_STORE_MB, metavar="MB",
+                        help="memory for the in-memory window of recent packets (older ones stay in the log)")
+    parser.add_argument("--monitored", nargs="*", metavar="CIDR",
+                        help="sources that never raise scan/flood alerts (default when sniffing: the interface's "
+                             "own address)")
+    args = parser.parse_args()
+    VERBOSE = not args.quiet
+    if args.store_mb != PACKET_STORE_MB:
+        packet_store = PacketStore(args.store_mb)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.serve is not None:
+        live_dashboard = DashboardState(packet_store, rollups)
+        start_dashboard_server(live_dashboard, port=args.serve)
+    if args.metrics is not None:
+        start_metrics_server(metrics, port=args.metrics)
+    if args.watch_models is not None:
+        models.start_watching(args.watch_models)
+
+    if args.monitored is not None:
+        source_sketch.exclude = networks(args.monitored)
+    elif not args.replay:
+        source_sketch.exclude = networks([get_if_addr(args.iface or conf.iface)])
+
+    if args.replay:
+        if args.adaptive_sampling:
+            sampler = AdaptiveSampler(lambda: batcher.pending / batcher.max_pending, live=False)
+        replay_pcap(args.replay, args.speed)
+    else:
+        capture_socket, capture_stats, lfilter = open_capture(
+            args.iface, None if args.no_filter else args.filter, (HONEYPOT_HOST, HONEYPOT_PORT))
+        if args.adaptive_sampling:
+            sampler = AdaptiveSampler(lambda: batcher.pending / batcher.max_pending,
+                                      capture_stats.poll if capture_stats is not None else None)
+        print("📡 Starting packet capture... (CTRL+C to stop)")
+        sniff(opened_socket=capture_socket, prn=classify_and_redirect, lfilter=lfilter, store=0)
@@ -0,0 +1,297 @@
+import os
+import socket
+import struct
+import threading
+from bisect import bisect_right
+from collections import Counter
+
+import numpy as np
+
+# ---------------- Time-bucketed rollups ----------------
+# Keeps per-second, per-minute and per-hour summaries of classified packets so
+# charts render from a fixed number of buckets instead of one point per packet.
+# Each resolution is a ring of fixed-width records in a memory-mapped .npy file
+# (slot = bucket start // width % slots), so the files never grow and a restart
+# picks up where the last run stopped. Only the open second is updated per
+# packet; when it closes it is written out and merged into the open minute and
+# hour buckets.
+#
+#   name: (bucket width in seconds, buckets kept)
+RESOLUTIONS = {
+    "1s": (1, 3600),         # last hour
+    "1m": (60, 1440),        # last day
+    "1h": (3600, 24 * 90),   # last 90 days
+}
+ROLLUP_PREFIX = "rollup"     # -> rollup_1s.npy, rollup_1m.npy, rollup_1h.npy
+
+PROTOCOLS = ("TCP", "UDP", "ICMP", "OTHER")
+FLOW_EDGES = [1e-6 * 10 ** i for i in range(10)]  # 1µs .. 1000s, log-spaced histogram edges
+TOP_K = 10                   # top source IPs stored per bucket
+IP_CAPACITY = 4096           # distinct IPs tracked per open bucket before the tail is pruned
+
+BUCKET = np.dtype([
+    ("start", "i8"),         # bucket start (epoch seconds), -1 = empty slot
+    ("benign", "u4"),
+    ("malicious", "u4"),
+    ("protocols", "u4", (len(PROTOCOLS),)),
+    ("flow_sum", "f8"),
+    ("flow_min", "f4"),
+    ("flow_max", "f4"),
+    ("flow_hist", "u4", (len(FLOW_EDGES) + 1,)),
+    ("top_ips", "u4", (TOP_K,)),   # IPv4 as integer, 0 = unused
+    ("top_counts", "u4", (TOP_K,)),
+])
+
+
+def ip_to_int(ip):
+    try:
+        return struct.unpack("!I", socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        return 0
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(struct.pack("!I", int(value)))
+
+
+class _Bucket:
+    __slots__ = ("start", "benign", "malicious", "protocols", "flow_sum",
+                 "flow_min", "flow_max", "hist", "ips")
+
+    def __init__(self, start):
+        self.start = start
+        self.benign = 0
+        self.malicious = 0
+        self.protocols = [0] * len(PROTOCOLS)
+        self.flow_sum = 0.0
+        self.flow_min = float("inf")
+        self.flow_max = 0.0
+        self.hist = [0] * (len(FLOW_EDGES) + 1)
+        self.ips = Counter()
+
+    def add(self, malicious, proto_index, ip, flow):
+        if malicious:
+            self.malicious += 1
+        else:
+            self.benign += 1
+        self.protocols[proto_index] += 1
+        self.flow_sum += flow
+        if flow < self.flow_min:
+            self.flow_min = flow
+        if flow > self.flow_max:
+            self.flow_max = flow
+        self.hist[bisect_right(FLOW_EDGES, flow)] += 1
+        ips = self.ips
+        ips[ip] += 1
+        if len(ips) > IP_CAPACITY:  # e.g. a spoofed-source flood within one second
+            self._prune()
+
+    def merge(self, other):
+        self.benign += other.benign
+        self.malicious += other.malicious
+        self.protocols = [a + b for a, b in zip(self.protocols, other.protocols)]
+        self.flow_sum += other.flow_sum
+        self.flow_min = min(self.flow_min, other.flow_min)
+        self.flow_max = max(self.flow_max, other.flow_max)
+        self.hist = [a + b for a, b in zip(self.hist, other.hist)]
+        self.ips.update(other.ips)
+        if len(self.ips) > IP_CAPACITY:
+            self._prune()
+
+    def _prune(self):
+        """Keep the heaviest half: amortized O(log n) per new IP, and the top IPs survive."""
+        self.ips = Counter(dict(self.ips.most_common(IP_CAPACITY // 2)))
+
+    def write(self, rec):
+        rec["start"] = self.start
+        rec["benign"] = self.benign
+        rec["malicious"] = self.malicious
+        rec["protocols"] = self.protocols
+        rec["flow_sum"] = self.flow_sum
+        rec["flow_min"] = self.flow_min if self.benign + self.malicious else 0.0
+        rec["flow_max"] = self.flow_max
+        rec["flow_hist"] = self.hist
+        top = [(ip_to_int(ip), n) for ip, n in self.ips.most_common(TOP_K)]
+        top += [(0, 0)] * (TOP_K - len(top))
+        rec["top_ips"] = [ip for ip, _ in top]
+        rec["top_counts"] = [n for _, n in top]
+
+    @classmethod
+    def read(cls, rec):
+        b = cls(int(rec["start"]))
+        b.benign = int(rec["benign"])
+        b.malicious = int(rec["malicious"])
+        b.protocols = rec["protocols"].tolist()
+        b.flow_sum = float(rec["flow_sum"])
+        b.flow_min = float(rec["flow_min"]) if b.benign + b.malicious else float("inf")
+        b.flow_max = float(rec["flow_max"])
+        b.hist = rec["flow_hist"].tolist()
+        b.ips = Counter({int_to_ip(ip): int(n) for ip, n in zip(rec["top_ips"], rec["top_counts"]) if n})
+        return b
+
+
+def _open_ring(path, slots):
+    if os.path.exists(path):
+        try:
+            ring = np.load(path, mmap_mode="r+")
+            if ring.dtype == BUCKET and ring.shape == (slots,):
+                return ring
+        except ValueError:
+            pass
+        print(f"⚠️ {path} has a different layout, starting a new rollup file")
+    ring = np.lib.format.open_memmap(path, mode="w+", dtype=BUCKET, shape=(slots,))
+    ring["start"] = -1
+    return ring
+
+
+def load_rollups(prefix=ROLLUP_PREFIX, resolution="1s"):
+    """Filled buckets of one resolution from disk, oldest first (empty array if missing)."""
+    path = f"{prefix}_{resolution}.npy"
+    if not os.path.exists(path):
+        return np.empty(0, dtype=BUCKET)
+    ring = np.load(path, mmap_mode="r")
+    records = ring[ring["start"] >= 0]
+    return records[np.argsort(records["start"], kind="stable")]
+
+
+def summarize(records):
+    """Totals over a set of buckets: counts, protocol mix, flow stats and top source IPs."""
+    total = int(records["benign"].sum() + records["malicious"].sum()) if len(records) else 0
+    ips = Counter()
+    for rec in records:
+        for ip, n in zip(rec["top_ips"], rec["top_counts"]):
+            if n:
+                ips[int_to_ip(ip)] += int(n)
+    return {
+        "total": total,
+        "benign": int(records["benign"].sum()) if total else 0,
+        "malicious": int(records["malicious"].sum()) if total else 0,
+        "protocols": dict(zip(PROTOCOLS, records["protocols"].sum(axis=0).tolist())) if total else {},
+        "avg_flow": float(records["flow_sum"].sum()) / total if total else 0.0,
+        "flow_min": float(records["flow_min"][records["benign"] + records["malicious"] > 0].min()) if total else 0.0,
+        "flow_max": float(records["flow_max"].max()) if total else 0.0,
+        "flow_hist": records["flow_hist"].sum(axis=0).tolist() if total else [0] * (len(FLOW_EDGES) + 1),
+        "top_ips": ips.most_common(TOP_K),
+    }
+
+
+class RollupStore:
+    """Streaming per-second/minute/hour rollups backed by fixed-size .npy rings."""
+
+    def __init__(self, prefix=ROLLUP_PREFIX, resolutions=RESOLUTIONS):
+        self.resolutions = sorted(resolutions.items(), key=lambda kv: kv[1][0])  # finest first
+        self._shapes = dict(self.resolutions)  # name -> (width, slots)
+        self._rings = {name: _open_ring(f"{prefix}_{name}.npy", slots)
+                       for name, (_, slots) in self.resolutions}
+        self._open = {name: None for name, _ in self.resolutions}  # buckets filled by this run
+        self._base = {name: None for name, _ in self.resolutions}  # same bucket as stored by a previous run
+        self._lock = threading.Lock()  # add() runs on the batcher thread, reads on the dashboard's
+        self.packets = 0
+
+    def _slot(self, name, start):
+        width, slots = self._shapes[name]
+        return self._rings[name][(start // width) % slots]
+
+    def _open_bucket(self, name, start):
+        """Start collecting bucket `start`; data already on disk for it is kept as its base."""
+        rec = self._slot(name, start)
+        self._base[name] = _Bucket.read(rec) if rec["start"] == start else None
+        self._open[name] = _Bucket(start)
+        return self._open[name]
+
+    def _merged(self, name):
+        """Open bucket of a resolution plus what an earlier run stored for the same bucket."""
+        bucket, base = self._open[name], self._base[name]
+        if base is None:
+            return bucket
+        merged = _Bucket(bucket.start)
+        merged.merge(base)
+        merged.merge(bucket)
+        return merged
+
+    def _write(self, name):
+        bucket = self._merged(name)
+        bucket.write(self._slot(name, bucket.start))
+
+    def _close_finest(self):
+        """Write the finished finest bucket and fold it into the open coarser buckets."""
+        name = self.resolutions[0][0]
+        bucket = self._open[name]
+        self._write(name)
+        for coarse_name, (coarse_width, _) in self.resolutions[1:]:
+            coarse_start = bucket.start - bucket.start % coarse_width
+            coarse = self._open[coarse_name]
+            if coarse is None or coarse.start != coarse_start:
+                if coarse is not None:
+                    self._write(coarse_name)
+                    self._rings[coarse_name].flush()
+                coarse = self._open_bucket(coarse_name, coarse_start)
+            coarse.merge(bucket)
+
+    def add(self, ts, label, protocol, src_ip, flow_duration):
+        name, (width, _) = self.resolutions[0]
+        start = int(ts) - int(ts) % width
+        proto_index = PROTOCOLS.index(protocol) if protocol in PROTOCOLS else len(PROTOCOLS) - 1
+        with self._lock:
+            bucket = self._open[name]
+            if bucket is None or start > bucket.start:
+                if bucket is not None:
+                    self._close_finest()
+                bucket = self._open_bucket(name, start)
+            # late packets (start < bucket.start) are counted in the open bucket
+            bucket.add(label == "MALICIOUS", proto_index, src_ip, float(flow_duration))
+            self.packets += 1
+
+    def series(self, resolution="1s", last=None):
+        """Buckets of one resolution, oldest first, including the open one."""
+        with self._lock:
+            ring = self._rings[resolution]
+            records = ring[ring["start"] >= 0].copy()
+            if self._open[resolution] is not None:
+                bucket = self._merged(resolution)
+                current = np.zeros(1, dtype=BUCKET)
+                bucket.write(current[0])
+                records = np.concatenate((records[records["start"] != bucket.start], current))
+        records = records[np.argsort(records["start"], kind="stable")]
+        return records[-last:] if last else records
+
+    def timeline(self, resolution="1s", last=None):
+        """Compact [start, benign, malicious, flow_sum, count] rows for charts."""
+        records = self.series(resolution, last)
+        count = records["benign"].astype(np.int64) + records["malicious"]
+        return [list(row) for row in zip(records["start"].tolist(), records["benign"].tolist(),
+                                         records["malicious"].tolist(), records["flow_sum"].tolist(),
+                                         count.tolist())]
+
+    def chart_timeline(self, max_points=600):
+        """Timeline at the finest resolution that fits in max_points buckets."""
+        for name, _ in self.resolutions:
+            rows = self.timeline(name)
+            if len(rows) <= max_points:
+                return rows
+        return rows[-max_points:]
+
+    def flush(self):
+        with self._lock:
+            for name, _ in self.resolutions:
+                if self._open[name] is not None:
+                    self._write(name)
+                self._rings[name].flush()
+
+    def close(self):
+        """Write every open bucket to disk (they are resumed on the next start)."""
+        with self._lock:
+            if self._open[self.resolutions[0][0]] is not None:
+                self._close_finest()
+            for name, _ in self.resolutions:
+                if self._open[name] is not None and name != self.resolutions[0][0]:
+                    self._write(name)
+                self._open[name] = self._base[name] = None
+                self._rings[name].flush()
+
+    def report(self):
+        s = summarize(self.series(self.resolutions[-1][0]))
+        print(f"🧮 Rollups: {self.packets:,} packets this run, {s['total']:,} retained "
+              f"({s['benign']:,} benign / {s['malicious']:,} malicious), "
+              + ", ".join(f"{name}={int((self._rings[name]['start'] >= 0).sum())}"
+                          for name, _ in self.resolutions) + " buckets")
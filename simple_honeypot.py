@@ -1,8 +1,16 @@
 import socket
 import threading
+import asyncio
+import time
+import argparse
 from datetime import datetime
 import sys
 import io
+import signal
+from honeypot_channel import read_messages, MAX_MESSAGE
+from log_sink import LogSink
+from honeypot_cluster import run_cluster, reuseport_listener, QueueLogSink, DECOY_PORTS
+from metrics import MetricsRegistry, start_metrics_server, HONEYPOT_METRICS_PORT
 
 # Force UTF-8 console output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
@@ -13,34 +21,91 @@ PORT = 9999
 HONEYPOT_LOG = "honeypot_log.txt"
 MALICIOUS_LOG = "malicious_log.txt"
 
+BACKLOG = 4096            # listen() backlog
+READ_TIMEOUT = 30.0       # asyncio mode: drop connections that send nothing for this long after connecting (s)
+MAX_CONNECTIONS = 50_000  # asyncio mode: refuse new connections beyond this many open
+ACK = "✅ Honeypot received your packet\n".encode("utf-8")
+
+log_sink = None  # LogSink while the server runs; otherwise log_message appends directly
+
+# ---------------- Metrics ----------------
+# Updated from every connection thread in threaded mode, hence shared=True
+metrics = MetricsRegistry(shared=True)
+accepted = metrics.counter("honeypot_connections_total", "Connections accepted")
+closed = metrics.counter("honeypot_connections_closed_total", "Connections closed")
+metrics.gauge("honeypot_active_connections", "Open connections", lambda: accepted.value - closed.value)
+refused = metrics.counter("honeypot_refused_total", "Connections refused over the connection cap")
+accept_latency = metrics.histogram("honeypot_accept_seconds", "Accepted connection to its handler running")
+write_latency = {target: metrics.histogram("honeypot_write_seconds", "Time per log write / ack write",
+                                           target=target) for target in ("log", "ack")}
+message_counts = {label: metrics.counter("honeypot_messages_total", "Messages received per label", label=label)
+                  for label in ("BENIGN", "MALICIOUS")}
+errors = metrics.counter("honeypot_errors_total", "Connections ended by an unexpected exception")
+
 def log_message(message, malicious=False):
     """Save honeypot logs in UTF-8"""
+    if log_sink is not None:
+        log_sink.log(message, malicious)
+        return
+    now = datetime.now()  # same timestamp in both files
     with open(HONEYPOT_LOG, "a", encoding="utf-8") as f:
-        f.write(f"{datetime.now()} | {message}\n")
+        f.write(f"{now} | {message}\n")
     if malicious:
         with open(MALICIOUS_LOG, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now()} | {message}\n")
+            f.write(f"{now} | {message}\n")
 
-def handle_client(conn, addr):
+def process_message(addr, data):
+    """Log one message from a client (shared by the threaded and asyncio servers); True if MALICIOUS."""
+    malicious = "MALICIOUS" in data
+    if malicious:
+        message_counts["MALICIOUS"].inc()
+        print(f"🚨 MALICIOUS TRAFFIC from {addr}: {data}")
+        t0 = time.perf_counter()
+        log_message(f"{addr} → {data}", malicious=True)
+    else:
+        # BENIGN packets are logged but not printed
+        message_counts["BENIGN"].inc()
+        t0 = time.perf_counter()
+        log_message(f"{addr} → {data}")
+    write_latency["log"].observe(time.perf_counter() - t0)
+    return malicious
+
+def handle_client(conn, addr, accepted_at=None):
+    """Read newline-framed messages until the peer disconnects (many per connection)."""
+    if accepted_at is not None:
+        accept_latency.observe(time.perf_counter() - accepted_at)
     try:
-        data = conn.recv(2048).decode("utf-8", errors="ignore")
-        if data:
-            if "MALICIOUS" in data:
-                print(f"🚨 MALICIOUS TRAFFIC from {addr}: {data}")
-                log_message(f"{addr} → {data}", malicious=True)
-            else:
-                # BENIGN packets are logged but not printed
-                log_message(f"{addr} → {data}")
-            conn.sendall("✅ Honeypot received your packet\n".encode("utf-8"))
+        acked = False
+        for data in read_messages(conn):
+            process_message(addr, data)
+            if not acked:
+                # One ack per connection, as before; the redirector never reads it
+                t0 = time.perf_counter()
+                conn.sendall(ACK)
+                write_latency["ack"].observe(time.perf_counter() - t0)
+                acked = True
     except Exception as e:
+        errors.inc()
         print(f"❌ Error with {addr}: {e}")
     finally:
+        closed.inc()
         conn.close()
 
-def start_honeypot():
+def raise_fd_limit():
+    """Allow as many open sockets as the hard limit permits."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def start_honeypot(backlog=BACKLOG):
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server.bind((HOST, PORT))
-    server.listen(5)
+    server.listen(backlog)
     server.settimeout(1)
     print(f"🛡️ Honeypot running on {HOST}:{PORT} ... (CTRL+C to stop)")
 
@@ -48,7 +113,8 @@ def start_honeypot():
         while True:
             try:
                 conn, addr = server.accept()
-                client_thread = threading.Thread(target=handle_client, args=(conn, addr))
+                accepted.inc()
+                client_thread = threading.Thread(target=handle_client, args=(conn, addr, time.perf_counter()))
                 client_thread.daemon = True
                 client_thread.start()
             except socket.timeout:
@@ -58,5 +124,159 @@ def start_honeypot():
     finally:
         server.close()
 
+# ---------------- asyncio server ----------------
+class AsyncHoneypot:
+    """Single-threaded asyncio server: one coroutine per connection instead of one thread."""
+
+    def __init__(self, read_timeout=READ_TIMEOUT, max_connections=MAX_CONNECTIONS, counters=None, worker=0):
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.active = 0
+        self.refused = 0
+        self.counters = counters  # ClusterCounters in --workers mode: per worker and port
+        self.worker = worker
+
+    def _count(self, name, port):
+        if self.counters is not None:
+            self.counters.inc(name, self.worker, port)
+
+    async def handle_client(self, reader, writer):
+        t_accept = time.perf_counter()
+        addr = writer.get_extra_info("peername")
+        port = writer.get_extra_info("sockname")[1]
+        if self.active >= self.max_connections:
+            self.refused += 1
+            refused.inc()
+            self._count("refused", port)
+            writer.transport.abort()
+            return
+        self.active += 1
+        accepted.inc()
+        self._count("accepted", port)
+        accept_latency.observe(time.perf_counter() - t_accept)
+        try:
+            acked = False
+            while True:
+                if acked:
+                    # An established client (the redirector's persistent channel) may
+                    # stay quiet for a long time between alerts: no timeout
+                    line = await reader.readline()
+                else:
+                    line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+                if not line:
+                    break
+                data = line.rstrip(b"\r\n").decode("utf-8", errors="ignore")
+                if not data:
+                    continue
+                self._count("malicious" if process_message(addr, data) else "benign", port)
+                if not acked:
+                    t0 = time.perf_counter()
+                    writer.write(ACK)
+                    await writer.drain()
+                    write_latency["ack"].observe(time.perf_counter() - t0)
+                    acked = True
+        except asyncio.TimeoutError:
+            pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            errors.inc()
+            self._count("errors", port)
+            print(f"❌ Error with {addr}: {e}")
+        finally:
+            self.active -= 1
+            closed.inc()
+            self._count("closed", port)
+            writer.close()
+
+    async def serve(self, backlog):
+        server = await asyncio.start_server(self.handle_client, HOST, PORT,
+                                            backlog=backlog, limit=MAX_MESSAGE)
+        print(f"🛡️ Honeypot (asyncio) running on {HOST}:{PORT} ... (CTRL+C to stop)")
+        async with server:
+            await server.serve_forever()
+
+    async def serve_sockets(self, sockets, stop, backlog=BACKLOG):
+        """Serve already-bound listeners (one per port) until `stop` is set."""
+        servers = [await asyncio.start_server(self.handle_client, sock=sock, backlog=backlog, limit=MAX_MESSAGE)
+                   for sock in sockets]
+        while not stop.is_set():
+            await asyncio.sleep(0.2)
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+def start_honeypot_async(backlog=BACKLOG, read_timeout=READ_TIMEOUT, max_connections=MAX_CONNECTIONS):
+    honeypot = AsyncHoneypot(read_timeout, max_connections)
+    try:
+        asyncio.run(honeypot.serve(backlog))
+    except KeyboardInterrupt:
+        print("\n🛑 Honeypot stopped by user")
+        if honeypot.refused:
+            print(f"⚠️ Refused {honeypot.refused:,} connections over the {max_connections:,} cap")
+
+# ---------------- Multi-process server ----------------
+def cluster_worker(index, counters, log_queue, stop, ports, backlog, read_timeout, max_connections):
+    """One --workers process: the asyncio server on its own SO_REUSEPORT socket for every port."""
+    global log_sink
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops us through `stop`
+    log_sink = QueueLogSink(log_queue)
+    honeypot = AsyncHoneypot(read_timeout, max_connections, counters, index)
+    try:
+        sockets = [reuseport_listener(HOST, port, backlog) for port in ports]
+        asyncio.run(honeypot.serve_sockets(sockets, stop, backlog))
+    except Exception as e:
+        print(f"❌ Honeypot worker {index}: {e}")
+    finally:
+        log_sink.close()
+        sys.stdout.flush()
+
+def start_honeypot_cluster(workers, ports, open_log_sink, backlog=BACKLOG, read_timeout=READ_TIMEOUT,
+                           max_connections=MAX_CONNECTIONS, metrics_port=None):
+    def worker_main(index, counters, log_queue, stop):
+        cluster_worker(index, counters, log_queue, stop, ports, backlog, read_timeout, max_connections)
+    run_cluster(worker_main, workers, ports, open_log_sink, HOST, metrics_port)
+
 if __name__ == "__main__":
-    start_honeypot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Simple honeypot")
+    parser.add_argument("--mode", choices=["threaded", "asyncio"], default="threaded")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes sharing the listeners via SO_REUSEPORT (asyncio server in each)")
+    parser.add_argument("--ports", nargs="*", type=int, metavar="PORT",
+                        help=f"listen on these ports (no values: --port plus decoys {' '.join(map(str, DECOY_PORTS))})")
+    parser.add_argument("--backlog", type=int, default=BACKLOG)
+    parser.add_argument("--read-timeout", type=float, default=READ_TIMEOUT,
+                        help="asyncio: close connections that send no first message within this long (s)")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--fsync", choices=["never", "batch", "interval"], default="never")
+    parser.add_argument("--rotate-bytes", type=int, default=0, help="rotate logs at this size (0 = off)")
+    parser.add_argument("--rotate-seconds", type=float, default=0, help="rotate logs after this long (0 = off)")
+    parser.add_argument("--gzip", action="store_true", help="gzip rotated log segments")
+    parser.add_argument("--metrics", nargs="?", type=int, const=HONEYPOT_METRICS_PORT, metavar="PORT",
+                        help=f"serve Prometheus metrics on /metrics (default port {HONEYPOT_METRICS_PORT})")
+    args = parser.parse_args()
+    PORT = args.port
+    raise_fd_limit()
+    cluster = args.workers > 1 or args.ports is not None
+    if args.metrics is not None and not cluster:
+        start_metrics_server(metrics, port=args.metrics)
+
+    def open_log_sink():
+        return LogSink(HONEYPOT_LOG, MALICIOUS_LOG, fsync=args.fsync, rotate_bytes=args.rotate_bytes,
+                       rotate_seconds=args.rotate_seconds, compress=args.gzip)
+
+    if cluster:
+        # The parent opens the sink itself, after forking (the sink runs a writer thread)
+        ports = list(dict.fromkeys(args.ports or (PORT,) + DECOY_PORTS))
+        start_honeypot_cluster(args.workers, ports, open_log_sink, args.backlog, args.read_timeout,
+                               args.max_connections, args.metrics)
+    else:
+        log_sink = open_log_sink()
+        try:
+            if args.mode == "asyncio":
+                start_honeypot_async(args.backlog, args.read_timeout, args.max_connections)
+            else:
+                start_honeypot(args.backlog)
+        finally:
+            log_sink.close()
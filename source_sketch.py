@@ -0,0 +1,303 @@
+import ipaddress
+import math
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- Per-source streaming sketches ----------------
+# Cross-packet context per source IP in fixed memory, however many sources
+# show up:
+#   count-min (exponentially decayed)  packets/s, bytes/s and SYNs/s per source
+#   count-min of HyperLogLogs          distinct destination ports / hosts per source
+#                                      in the current WINDOW (the previous window's
+#                                      estimate is kept so counts don't drop to 0 on rotation)
+#   decayed top-K                      heaviest sources by packet rate
+# Every structure shares the same DEPTH x WIDTH cell layout, so a source's
+# cells are hashed once per packet. Count-min style sketches only ever
+# overestimate (collisions add), so the minimum over the rows is used.
+# Decay uses a landmark: increments are scaled by e^((t - t0)/TAU) and reads
+# divided by it, so nothing is touched per packet beyond the source's cells.
+
+DEPTH = 2
+WIDTH = 8192               # cells per row (power of two)
+HLL_P = 6                  # 2**6 = 64 registers per HyperLogLog cell (~13% error)
+TAU = 10.0                 # s, time constant of the decayed rates
+WINDOW = 60.0              # s, distinct-count window
+TOP_K = 32
+
+# A busy workstation is not a scanner: in packets_raw.json the monitored host
+# (BitTorrent, browsing) reaches ~125 destination IPs and ~160 ports in 6 s,
+# i.e. well over 100 of each per minute. Scans run into the thousands.
+SCAN_PORTS = 1000          # distinct destination ports in a window
+SCAN_HOSTS = 1000          # distinct destination hosts in a window
+SYN_FLOOD_RATE = 200.0     # SYN/s from one source
+FLOOD_RATE = 2000.0        # packets/s from one source
+ALERT_COOLDOWN = 60.0      # s before the same source can alert again
+ALERT_MEMORY = 4096        # sources remembered for the cooldown (LRU)
+
+ALERT_KINDS = ("port-scan", "host-scan", "syn-flood", "flood")
+SOURCE_FEATURES = ("Src Packets/s", "Src Bytes/s", "Src SYN/s", "Src Distinct Dst Ports", "Src Distinct Dst IPs")
+
+_MASK = (1 << 64) - 1
+_ROW_MULT = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+_RENORMALIZE = 30.0        # landmark exponent at which the decayed counters are rescaled
+
+
+def _mix(x):
+    """64-bit finalizer (MurmurHash3 fmix64)."""
+    x ^= x >> 33
+    x = (x * 0xFF51AFD7ED558CCD) & _MASK
+    x ^= x >> 33
+    x = (x * 0xC4CEB9FE1A85EC53) & _MASK
+    return x ^ (x >> 33)
+
+
+def networks(specs):
+    """ip_network objects for addresses or CIDRs ("192.168.0.101", "10.0.0.0/8")."""
+    return tuple(ipaddress.ip_network(spec, strict=False) for spec in specs)
+
+
+class DecayedCountMin:
+    """Count-min sketch of exponentially decayed counts (conservative update)."""
+
+    def __init__(self, cells):
+        self.counts = array("d", bytes(8 * cells))
+
+    def add(self, cells, value):
+        """Add `value` (already landmark-scaled) for a key; returns its scaled count."""
+        counts = self.counts
+        values = [counts[c] for c in cells]
+        low = min(values) + value
+        for c, v in zip(cells, values):
+            if v < low:  # raise only the cells below the new minimum: less overestimation
+                counts[c] = low
+        return low
+
+    def query(self, cells):
+        counts = self.counts
+        return min([counts[c] for c in cells])
+
+    def rescale(self, factor):
+        np.frombuffer(self.counts, dtype=np.float64)[:] *= factor
+
+
+class DistinctCountMin:
+    """Count-min grid of HyperLogLogs: distinct elements per key, windowed."""
+
+    def __init__(self, cells, p=HLL_P):
+        self.m = 1 << p
+        self.p = p
+        self.alpha = 0.709 if self.m == 64 else 0.7213 / (1 + 1.079 / self.m)
+        self.registers = bytearray(cells * self.m)
+        # Per cell, maintained on every register change so a query is O(1)
+        self.inv_sum = array("d", [float(self.m)]) * cells   # sum of 2**-register
+        self.zeros = array("i", [self.m]) * cells
+        self.estimates = array("d", bytes(8 * cells))
+        self.previous = array("d", bytes(8 * cells))         # estimates at the end of the last window
+
+    def add(self, cells, element_hash):
+        """Add one element for a key; returns the key's distinct count (this window or the last)."""
+        m, p = self.m, self.p
+        idx = element_hash & (m - 1)
+        rank = 64 - p - (element_hash >> p).bit_length() + 1
+        regs, est, previous = self.registers, self.estimates, self.previous
+        low = float("inf")
+        for c in cells:
+            pos = (c << p) + idx
+            old = regs[pos]
+            if rank > old:
+                regs[pos] = rank
+                self.inv_sum[c] += 2.0 ** -rank - 2.0 ** -old
+                if old == 0:
+                    self.zeros[c] -= 1
+                est[c] = self._estimate(c)
+            value = est[c]
+            if value < previous[c]:
+                value = previous[c]
+            if value < low:
+                low = value
+        return low
+
+    def _estimate(self, c):
+        m = self.m
+        e = self.alpha * m * m / self.inv_sum[c]
+        zeros = self.zeros[c]
+        if e <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return e
+
+    def rotate(self):
+        """Start a new window, remembering each cell's estimate from the one that ended."""
+        m = self.m
+        inv_sum = np.frombuffer(self.inv_sum, dtype=np.float64)
+        zeros = np.frombuffer(self.zeros, dtype=np.int32)
+        est = self.alpha * m * m / inv_sum
+        small = (est <= 2.5 * m) & (zeros > 0)
+        est[small] = m * np.log(m / zeros[small])
+        np.frombuffer(self.previous, dtype=np.float64)[:] = est
+        self.registers[:] = bytes(len(self.registers))
+        inv_sum[:] = m
+        zeros[:] = m
+        np.frombuffer(self.estimates, dtype=np.float64)[:] = 0.0
+
+
+class SourceSketch:
+    """Per-source rates, distinct destinations, heavy hitters and scan/flood alerts in fixed memory."""
+
+    def __init__(self, depth=DEPTH, width=WIDTH, on_alert=None, exclude=()):
+        self.depth = depth
+        self.width = width
+        self._shift = 64 - width.bit_length() + 1
+        cells = depth * width
+        self.packets = DecayedCountMin(cells)
+        self.bytes = DecayedCountMin(cells)
+        self.syns = DecayedCountMin(cells)
+        self.ports = DistinctCountMin(cells)
+        self.hosts = DistinctCountMin(cells)
+        self.top = {}              # source -> decayed packet count (landmark-scaled)
+        self._top_min = 0.0        # smallest count in a full top-K...
+        self._top_min_src = None   # ...and whose it is
+        self.on_alert = on_alert   # called as on_alert(kind, src, features)
+        self.exclude = networks(exclude)  # monitored/local sources that never alert
+        self._alerted = OrderedDict()  # source -> (cooldown end, kind)
+        self._landmark = None
+        self._window_end = None
+        self._last_ts = None
+        self.updates = 0
+        self.alerts = {}
+        self.suppressed = 0
+
+    def update(self, src, dst, dport, length, syn, ts):
+        """Account one packet; returns the source's features (SOURCE_FEATURES order)."""
+        if self._landmark is None:
+            self._landmark = ts
+            self._window_end = ts + WINDOW
+        self._last_ts = ts
+        if ts >= self._window_end:
+            self.ports.rotate()
+            self.hosts.rotate()
+            self._window_end = ts + WINDOW
+        exponent = (ts - self._landmark) / TAU
+        if exponent > _RENORMALIZE:
+            self._renormalize(ts)
+            exponent = 0.0
+        scale = math.exp(exponent)
+        per_second = 1.0 / (scale * TAU)  # decayed count -> rate
+
+        src_hash = _mix(hash(src) & _MASK)
+        width, shift = self.width, self._shift
+        cells = [row * width + (((src_hash * _ROW_MULT[row]) & _MASK) >> shift) for row in range(self.depth)]
+        packets = self.packets.add(cells, scale)
+        byte_count = self.bytes.add(cells, length * scale)
+        syns = self.syns.add(cells, scale) if syn else self.syns.query(cells)
+        ports = self.ports.add(cells, _mix(src_hash ^ ((dport * 0x9E3779B97F4A7C15) & _MASK)))
+        hosts = self.hosts.add(cells, _mix(src_hash ^ (hash(dst) & _MASK)))
+        self.updates += 1
+
+        features = (packets * per_second, byte_count * per_second, syns * per_second, ports, hosts)
+        self._update_top(src, packets)
+        self._check(src, features, ts)
+        return features
+
+    def _update_top(self, src, scaled):
+        top = self.top
+        if src in top:
+            top[src] = scaled
+            if src != self._top_min_src and scaled >= self._top_min:
+                return  # another tracked source rose: the minimum is unchanged
+        elif len(top) < TOP_K:
+            top[src] = scaled
+            if len(top) < TOP_K:
+                return
+        elif scaled > self._top_min:
+            del top[self._top_min_src]
+            top[src] = scaled
+        else:
+            return
+        self._top_min_src = min(top, key=top.get)
+        self._top_min = top[self._top_min_src]
+
+    def _renormalize(self, ts):
+        factor = math.exp(-(ts - self._landmark) / TAU)
+        for cm in (self.packets, self.bytes, self.syns):
+            cm.rescale(factor)
+        for src in self.top:
+            self.top[src] *= factor
+        self._top_min *= factor
+        self._landmark = ts
+
+    def _check(self, src, features, ts):
+        pkt_rate, _, syn_rate, ports, hosts = features
+        if ports >= SCAN_PORTS:
+            kind = "port-scan"
+        elif hosts >= SCAN_HOSTS:
+            kind = "host-scan"
+        elif syn_rate >= SYN_FLOOD_RATE:
+            kind = "syn-flood"
+        elif pkt_rate >= FLOOD_RATE:
+            kind = "flood"
+        else:
+            return
+        active = self._alerted.get(src)
+        if active is not None and ts < active[0]:
+            return
+        excluded = self._excluded(src)
+        # An excluded source is remembered like an alerting one (kind None),
+        # so it isn't looked up again on every packet of the cooldown
+        self._alerted[src] = (ts + ALERT_COOLDOWN, None if excluded else kind)
+        self._alerted.move_to_end(src)
+        if len(self._alerted) > ALERT_MEMORY:
+            self._alerted.popitem(last=False)
+        if excluded:
+            self.suppressed += 1
+            return
+        self.alerts[kind] = self.alerts.get(kind, 0) + 1
+        if self.on_alert is not None:
+            self.on_alert(kind, src, features)
+
+    def _excluded(self, src):
+        if not self.exclude:
+            return False
+        try:
+            address = ipaddress.ip_address(src)
+        except ValueError:
+            return False
+        return any(address in net for net in self.exclude)
+
+    def alert(self, src, ts):
+        """Kind of the alert `src` raised if it is still within its cooldown, else None."""
+        active = self._alerted.get(src)
+        if active is not None and ts < active[0]:
+            return active[1]
+        return None
+
+    def heavy_hitters(self, n=10):
+        """[(source, packets/s)] for the heaviest sources right now."""
+        if self._landmark is None:
+            return []
+        ranked = sorted(self.top.items(), key=lambda kv: -kv[1])[:n]
+        unscale = math.exp(-(self._last_ts - self._landmark) / TAU)
+        return [(src, count * unscale / TAU) for src, count in ranked]
+
+    def memory_bytes(self):
+        cells = self.depth * self.width
+        return (3 * 8 * cells                                   # decayed count-min counters
+                + 2 * cells * (self.ports.m + 8 + 4 + 8)        # HLL registers, sums, zero counts, previous
+                + (TOP_K + ALERT_MEMORY) * 200)                 # top-K and alert dict entries (approx.)
+
+    def stats(self):
+        return {
+            "updates": self.updates,
+            "memory_mb": self.memory_bytes() / 1e6,
+            "alerts": dict(self.alerts),
+            "suppressed": self.suppressed,
+            "top": self.heavy_hitters(5),
+        }
+
+    def report(self):
+        s = self.stats()
+        alerts = ", ".join(f"{k}={v:,}" for k, v in sorted(s["alerts"].items())) or "none"
+        top = ", ".join(f"{src} {rate:,.1f}/s" for src, rate in s["top"]) or "-"
+        print(f"🧭 Source sketches: {s['updates']:,} packets in {s['memory_mb']:.1f} MB fixed, "
+              f"alerts: {alerts} ({s['suppressed']:,} from excluded sources); top sources: {top}")
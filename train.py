@@ -5,45 +5,80 @@ import pickle
 import json
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
+import argparse
 from xgboost import XGBClassifier
 from sklearn.ensemble import ExtraTreesClassifier
 from sklearn.metrics import accuracy_score
+from tree_eval import export_trees
+from dataset_cache import cache_is_fresh, open_cache, CACHE_DIR
+from external_memory import train_out_of_core, MEMORY_BUDGET_MB
+from training_utils import RoundTimer, encode_features, peak_rss_mb
+from hparam_search import run_search, RANDOM_TRIALS
+from model_registry import publish_model, MODEL_DIR
 
 DATA_FILE = "dataset_clean.csv"
 MODEL_FILE = "model.pkl"
 FEATURES_FILE = "selected_features.pkl"
 LOG_FILE = "train_log.json"
 
+parser = argparse.ArgumentParser(description="Train the traffic classifier")
+parser.add_argument("--external-memory", action="store_true",
+                    help="stream the dataset through XGBoost's external-memory path instead of loading it")
+parser.add_argument("--memory-budget", type=int, default=MEMORY_BUDGET_MB, metavar="MB",
+                    help="RAM for batches and the feature-selection sample in --external-memory mode")
+parser.add_argument("--search", choices=["grid", "random", "halving"],
+                    help=f"hyperparameter search over the features in {FEATURES_FILE} instead of training")
+parser.add_argument("--trials", type=int, default=RANDOM_TRIALS, help="configs tried by random/halving search")
+parser.add_argument("--workers", type=int, help="search processes (default: one per core)")
+parser.add_argument("--publish", action="store_true",
+                    help=f"also publish the model as a new version under {MODEL_DIR}/ for a running redirector")
+args = parser.parse_args()
+
+if args.search:
+    run_search(DATA_FILE, CACHE_DIR, FEATURES_FILE, args.search, args.trials, args.workers)
+    raise SystemExit(0)
+
+if args.external_memory:
+    train_out_of_core(DATA_FILE, CACHE_DIR, MODEL_FILE, FEATURES_FILE, LOG_FILE, args.memory_budget)
+    if args.publish:
+        publish_model(MODEL_FILE, FEATURES_FILE)
+    raise SystemExit(0)
+
 start_time = time.time()
 
-print("📂 Loading dataset...")
-df = pd.read_csv(DATA_FILE, low_memory=False)
+if cache_is_fresh(CACHE_DIR, DATA_FILE):
+    # Memory-mapped columns written by load.py: nothing is parsed, pages are read on first touch
+    print(f"📂 Opening columnar cache {CACHE_DIR}/...")
+    columns, y, classes = open_cache(CACHE_DIR)
+    y = np.asarray(y)  # label codes, already in LabelEncoder order
+else:
+    print("📂 Loading dataset...")
+    df = pd.read_csv(DATA_FILE, low_memory=False)
+
+    target_col = "Label"
+    X = df.drop(columns=[target_col])
+    y = df[target_col]
 
-target_col = "Label"
-X = df.drop(columns=[target_col])
-y = df[target_col]
+    # Encode categorical columns
+    X = encode_features(X)
 
-# Encode categorical columns
-for col in X.columns:
-    if X[col].dtype == 'object' or X[col].dtype == 'O':
-        X[col] = X[col].astype(str)
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col])
-    else:
-        X[col] = X[col].fillna(0)
+    # Encode target
+    if not pd.api.types.is_numeric_dtype(y):
+        y = y.astype(str)
+        y = LabelEncoder().fit_transform(y)
+    y = np.asarray(y)
+    columns = {col: X[col].to_numpy() for col in X.columns}
 
-# Encode target
-if y.dtype == 'object' or y.dtype == 'O':
-    y = y.astype(str)
-    y = LabelEncoder().fit_transform(y)
+feature_names = pd.Index(list(columns))
+n_rows = len(y)
 
 # 🔍 Feature selection using only 10% sample
 print("🔍 Finding top features (ExtraTrees) using sample...")
-sample_frac = 0.1 if len(df) > 500000 else 1.0
-df_sample = df.sample(frac=sample_frac, random_state=42)
+sample_frac = 0.1 if n_rows > 500000 else 1.0
+sample_rows = pd.RangeIndex(n_rows).to_series().sample(frac=sample_frac, random_state=42).to_numpy()
 
-X_sample = X.loc[df_sample.index]
-y_sample = y[df_sample.index]
+X_sample = pd.DataFrame({col: columns[col][sample_rows] for col in feature_names})
+y_sample = y[sample_rows]
 
 model_et = ExtraTreesClassifier(n_estimators=30, random_state=42, n_jobs=-1)
 model_et.fit(X_sample, y_sample)
@@ -51,13 +86,14 @@ importances = model_et.feature_importances_
 
 # Select top 12 features
 indices = np.argsort(importances)[::-1][:12]
-selected_features = X.columns[indices]
+selected_features = feature_names[indices]
 print(f"🏆 Selected top features: {list(selected_features)}")
 
 with open(FEATURES_FILE, "wb") as f:
     pickle.dump(list(selected_features), f)
 
-X_selected = X[selected_features]
+# Only the selected columns are materialised
+X_selected = pd.DataFrame({col: np.asarray(columns[col]) for col in selected_features})
 
 print("✂ Splitting data...")
 X_train, X_test, y_train, y_test = train_test_split(
@@ -67,6 +103,11 @@ X_train, X_test, y_train, y_test = train_test_split(
 # ⚡ Faster XGBoost configuration
 print("⚡ Training XGBoost model with epoch logging...")
 
+# Classification error is evaluated by XGBoost itself after every round,
+# so the accuracy curves come for free instead of re-predicting per round
+error_metric = "merror" if len(np.unique(y)) > 2 else "error"
+round_timer = RoundTimer()
+
 # 🆕 Put eval_metric in constructor to avoid old XGBoost issue
 model = XGBClassifier(
     n_estimators=20,      # Number of boosting rounds
@@ -78,32 +119,25 @@ model = XGBClassifier(
     n_jobs=-1,
     random_state=42,
     verbosity=0,
-    eval_metric="mlogloss"
+    eval_metric=["mlogloss", error_metric],
+    callbacks=[round_timer],
 )
 
-# 🆕 Log training history
-history = {"time": [], "train_acc": [], "test_acc": []}
-
 # Train model and log accuracy per boosting round
-epoch_start_time = time.time()
 model.fit(
     X_train,
     y_train,
     eval_set=[(X_train, y_train), (X_test, y_test)],
     verbose=False
 )
-elapsed_total = time.time() - epoch_start_time
+model.callbacks = None  # keep train.py classes out of the pickle (set_params would also reset the booster params)
 
-# Approximate time per epoch
-time_per_epoch = elapsed_total / model.n_estimators
-
-# Compute train & test accuracy per epoch
-for epoch in range(model.n_estimators):
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
-    history["train_acc"].append(accuracy_score(y_train, y_pred_train))
-    history["test_acc"].append(accuracy_score(y_test, y_pred_test))
-    history["time"].append(time_per_epoch * (epoch + 1))
+evals = model.evals_result()
+history = {
+    "time": round_timer.times,
+    "train_acc": [1.0 - e for e in evals["validation_0"][error_metric]],
+    "test_acc": [1.0 - e for e in evals["validation_1"][error_metric]],
+}
 
 # 📝 Save training log for graphing
 with open(LOG_FILE, "w") as f:
@@ -113,8 +147,14 @@ with open(LOG_FILE, "w") as f:
 with open(MODEL_FILE, "wb") as f:
     pickle.dump(model, f)
 
+# Flat NumPy copy of the trees for the redirector's fast single-row path
+export_trees(model)
+
 final_acc = accuracy_score(y_test, model.predict(X_test)) * 100
 print(f"✅ Model trained & saved as {MODEL_FILE}")
 print(f"📊 Final Test Accuracy: {final_acc:.2f}%")
-print(f"⏱ Total training time: {time.time() - start_time:.2f} sec")
+print(f"⏱ Total training time: {time.time() - start_time:.2f} sec, peak RSS {peak_rss_mb():,.0f} MB")
 print(f"📝 Training log saved to {LOG_FILE}")
+
+if args.publish:
+    publish_model(MODEL_FILE, FEATURES_FILE)
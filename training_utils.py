@@ -0,0 +1,54 @@
+import os
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+
+# ---------------- Shared training helpers ----------------
+# Used by load.py, train.py, external_memory.py and hparam_search.py, so the
+# in-memory and out-of-core paths measure and encode things the same way.
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB of this process, or of its largest finished child."""
+    scale = 1024 if os.uname().sysname != "Darwin" else 1024 * 1024
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+class RoundTimer(xgb.callback.TrainingCallback):
+    """Wall-clock seconds since the start of training at the end of every boosting round."""
+
+    def __init__(self):
+        self.times = []
+
+    def before_training(self, model):
+        self.started = time.perf_counter()
+        return model
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.times.append(time.perf_counter() - self.started)
+        return False
+
+
+def encode_features(X):
+    """Label-encode the non-numeric columns of a DataFrame in place and fill gaps in the numeric ones with 0.
+
+    Codes are LabelEncoder's: the index of the value (as a string) among the
+    column's sorted distinct values. Streaming readers get the same codes with
+    encode_categories() over those sorted values.
+    """
+    for col in X.columns:
+        if not pd.api.types.is_numeric_dtype(X[col]):  # object, or pandas' str dtype
+            X[col] = LabelEncoder().fit_transform(X[col].astype(str))
+        else:
+            X[col] = X[col].fillna(0)
+    return X
+
+
+def encode_categories(values, categories):
+    """LabelEncoder codes of `values` given the column's sorted distinct values (a NumPy array)."""
+    return np.searchsorted(categories, values.astype(str).to_numpy())
@@ -0,0 +1,226 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+# ---------------- Compiled tree evaluator ----------------
+# Flattens every tree of the trained XGBoost booster into contiguous NumPy
+# arrays (feature index, threshold, child pointers, default direction, leaf
+# value) and scores rows without going through the sklearn wrapper / DMatrix.
+# Nodes are numbered breadth-first so the right child is always left + 1, and
+# all trees are walked together, one depth level per step, for the whole batch.
+# Leaves point to themselves, so walking max_depth steps always ends on a leaf.
+# Arithmetic mirrors XGBoost's CPU predictor: float32 features and thresholds,
+# `x < threshold` goes left, NaN follows default_left, and leaf values are added
+# to the base margin in tree order in float32.
+#
+#   python tree_eval.py --export          # model.pkl -> model_trees.npz
+#   python tree_eval.py --verify --bench  # check against model.predict and time it
+
+MODEL_FILE = "model.pkl"
+TREE_FILE = "model_trees.npz"
+
+
+def _parse_base_score(value, n_groups):
+    value = value.strip()
+    if value.startswith("["):
+        scores = [float(v) for v in value.strip("[]").split(",")]
+    else:
+        scores = [float(value)] * n_groups
+    return np.array(scores, dtype=np.float32)
+
+
+def export_trees(model, path=TREE_FILE):
+    """Write the booster of a fitted XGBClassifier (or Booster) to a flat .npz file."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    objective = learner["objective"]["name"]
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise ValueError(f"only gbtree boosters can be compiled, got {gbm['name']}")
+    trees = gbm["model"]["trees"]
+    tree_group = np.array(gbm["model"]["tree_info"], dtype=np.int32)
+
+    n_groups = max(int(learner["learner_model_param"].get("num_class", "0")), 1)
+    base = _parse_base_score(learner["learner_model_param"]["base_score"], n_groups)
+    if objective == "binary:logistic":
+        base = np.log(base / (1 - base)).astype(np.float32)  # stored as a probability
+
+    features, thresholds, children, default_left, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("categorical splits are not supported by the compiled evaluator")
+        left, right = tree["left_children"], tree["right_children"]
+        split_index, cond, dleft = tree["split_indices"], tree["split_conditions"], tree["default_left"]
+
+        # Renumber breadth-first so a node's right child is always left child + 1
+        order, depth = [0], {0: 0}
+        new_id = {0: 0}
+        for old in order:
+            if left[old] != -1:
+                new_id[left[old]], new_id[right[old]] = len(order), len(order) + 1
+                depth[left[old]] = depth[right[old]] = depth[old] + 1
+                order += [left[old], right[old]]
+        for old in order:
+            nid = new_id[old] + offset
+            if left[old] == -1:
+                # Leaf: loops back to itself (threshold +inf, NaN goes left)
+                features.append(0)
+                thresholds.append(np.inf)
+                children.append(nid)
+                default_left.append(True)
+                values.append(cond[old])
+            else:
+                features.append(split_index[old])
+                thresholds.append(cond[old])
+                children.append(new_id[left[old]] + offset)
+                default_left.append(bool(dleft[old]))
+                values.append(0.0)
+        roots.append(offset)
+        max_depth = max(max_depth, max(depth.values()))
+        offset += len(order)
+
+    np.savez(
+        path,
+        feature=np.array(features, dtype=np.intp),
+        threshold=np.array(thresholds, dtype=np.float32),
+        left=np.array(children, dtype=np.intp),
+        default_left=np.array(default_left, dtype=bool),
+        value=np.array(values, dtype=np.float32),
+        root=np.array(roots, dtype=np.int32),
+        tree_group=tree_group,
+        base_margin=base,
+        max_depth=np.int32(max_depth),
+        objective=np.array(objective),
+        feature_names=np.array(learner.get("feature_names") or [], dtype=str),
+    )
+    print(f"🌲 Exported {len(trees)} trees ({offset:,} nodes, depth {max_depth}) to {path}")
+    return path
+
+
+class CompiledTrees:
+    """Vectorised evaluator for a model exported with export_trees()."""
+
+    def __init__(self, path=TREE_FILE):
+        with np.load(path) as data:
+            self.feature = data["feature"]
+            self.threshold = data["threshold"]
+            self.left = data["left"]  # right child is always left + 1
+            self.default_left = data["default_left"]
+            self.value = data["value"]
+            self.root = data["root"]
+            self.tree_group = data["tree_group"]
+            self.base_margin = data["base_margin"]
+            self.max_depth = int(data["max_depth"])
+            self.objective = str(data["objective"])
+            self.feature_names = [str(f) for f in data["feature_names"]]
+        self.n_groups = len(self.base_margin)
+        self.n_trees = len(self.root)
+        # Trees are stored round by round, one per output group
+        self._by_round = (self.n_trees % self.n_groups == 0
+                          and np.array_equal(self.tree_group, np.tile(np.arange(self.n_groups),
+                                                                      self.n_trees // self.n_groups)))
+
+    def margin(self, X):
+        """Raw scores, shape (n_rows, n_groups)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n, n_features = X.shape
+        # +inf must still go left at a leaf; clamping to the largest float32 keeps every real split intact
+        X = np.minimum(X, np.finfo(np.float32).max)
+        flat = X.ravel()
+        row_base = (np.arange(n, dtype=np.intp) * n_features)[:, None]
+        has_nan = bool(np.isnan(flat).any())
+        node = np.broadcast_to(self.root.astype(np.intp), (n, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            go_left = x < self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x) & self.default_left[node]
+            node = self.left[node] + ~go_left
+        leaf = self.value[node]
+
+        # Sequential float32 accumulation in tree order, starting from the base margin
+        if self._by_round:
+            steps = leaf.reshape(n, self.n_trees // self.n_groups, self.n_groups)
+            steps = np.concatenate((np.broadcast_to(self.base_margin, (n, 1, self.n_groups)), steps), axis=1)
+            return np.cumsum(steps, axis=1, dtype=np.float32)[:, -1, :]
+        out = np.broadcast_to(self.base_margin, (n, self.n_groups)).copy()
+        for t in range(self.n_trees):
+            out[:, self.tree_group[t]] += leaf[:, t]
+        return out
+
+    def predict(self, X):
+        """Class labels, matching XGBClassifier.predict()."""
+        m = self.margin(X)
+        if self.n_groups == 1:
+            return (m[:, 0] > 0).astype(np.int64)
+        return np.argmax(m, axis=1)
+
+
+# ---------------- Verification / benchmark ----------------
+def _sample_rows(n_features, n, seed=0):
+    """Random rows spanning the model's thresholds, plus exact threshold values and NaNs."""
+    rng = np.random.default_rng(seed)
+    compiled = CompiledTrees()
+    X = np.empty((n, n_features), dtype=np.float32)
+    for f in range(n_features):
+        th = compiled.threshold[(compiled.feature == f) & np.isfinite(compiled.threshold)]
+        lo, hi = (float(th.min()), float(th.max())) if th.size else (0.0, 1.0)
+        span = max(hi - lo, 1.0)
+        X[:, f] = rng.uniform(lo - 0.1 * span, hi + 0.1 * span, n)
+        if th.size:
+            k = n // 10
+            X[:k, f] = rng.choice(th, k)  # land exactly on split points
+    X[rng.random(X.shape) < 0.01] = np.nan
+    return X
+
+
+def verify(model, compiled, X):
+    expected = model.predict(X)
+    got = compiled.predict(X)
+    mismatched = int(np.count_nonzero(expected != got))
+    margin = model.predict(X, output_margin=True).astype(np.float32).reshape(len(X), -1)
+    margin_exact = bool(np.array_equal(margin, compiled.margin(X)))
+    print(f"🔎 {len(X):,} rows: {mismatched} label mismatches, margins bit-identical: {margin_exact}")
+    return mismatched == 0
+
+
+def bench(model, compiled, X, repeats=200):
+    for size in (1, 16, 256, 1024):
+        batch = X[:size]
+        for name, fn in (("model.predict", model.predict), ("compiled", compiled.predict)):
+            fn(batch)
+            loops = max(5, repeats // max(1, size // 16))
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn(batch)
+            call = (time.perf_counter() - t0) / loops
+            print(f"   batch {size:>5} {name:<14} {call * 1e6:10.1f} µs/call {call / size * 1e6:8.2f} µs/row")
+
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export / verify / benchmark the compiled tree evaluator")
+    parser.add_argument("--export", action="store_true", help=f"export {MODEL_FILE} to {TREE_FILE}")
+    parser.add_argument("--verify", action="store_true", help="compare against model.predict")
+    parser.add_argument("--bench", action="store_true", help="single-row and batch latency")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_FILE)
+    if args.export:
+        export_trees(model)
+    compiled = CompiledTrees()
+    X = _sample_rows(len(compiled.feature_names) or model.n_features_in_, args.rows)
+    ok = True
+    if args.verify:
+        ok = verify(model, compiled, X)
+    if args.bench:
+        bench(model, compiled, X)
+    raise SystemExit(0 if ok else 1)
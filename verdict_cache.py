@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+# ---------------- Flow verdict cache ----------------
+# Packets of a flow that has already been scored reuse its verdict instead of
+# going through model.predict again. Entries expire after TTL seconds (packet
+# time), the cache is bounded with LRU eviction, and a flow is re-scored after
+# RESCORE_EVERY cached hits or when a packet carries a TCP state flag
+# (SYN/FIN/RST) the flow had not shown when it was last scored.
+
+MAX_ENTRIES = 100_000
+TTL = 30.0
+RESCORE_EVERY = 50
+
+SYN, FIN, RST = 0x02, 0x01, 0x04
+STATE_FLAGS = SYN | FIN | RST
+
+
+def normalize_key(key):
+    """Direction-independent form of a (src, dst, sport, dport, proto) key."""
+    src, dst, sport, dport, proto = key
+    if (src, sport) <= (dst, dport):
+        return key
+    return (dst, src, dport, sport, proto)
+
+
+class _Entry:
+    __slots__ = ("verdict", "expires", "hits", "state")
+
+    def __init__(self, verdict, expires, state):
+        self.verdict = verdict
+        self.expires = expires
+        self.hits = 0
+        self.state = state
+
+
+class VerdictCache:
+    """TTL + LRU cache of model verdicts keyed by normalized 5-tuple."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, rescore_every=RESCORE_EVERY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.rescore_every = rescore_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # get() runs on the capture thread, put() on the batcher
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.rescores = 0
+        self.state_rescores = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now, tcp_flags=0):
+        """Return the cached verdict for a flow, or None if it must be (re)scored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now > entry.expires:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            if tcp_flags & STATE_FLAGS & ~entry.state:
+                self.state_rescores += 1
+                self.misses += 1
+                return None
+            if entry.hits >= self.rescore_every:
+                self.rescores += 1
+                self.misses += 1
+                return None
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.verdict
+
+    def put(self, key, verdict, now, tcp_flags=0):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.verdict = verdict
+                entry.expires = now + self.ttl
+                entry.hits = 0
+                entry.state |= tcp_flags & STATE_FLAGS
+                self._entries.move_to_end(key)
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = _Entry(verdict, now + self.ttl, tcp_flags & STATE_FLAGS)
+
+    def clear(self):
+        """Drop every cached verdict (e.g. after the model changed)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "rescores": self.rescores,
+            "state_rescores": self.state_rescores,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"🗃️ Verdict cache: {s['size']:,}/{s['max_entries']:,} entries, hit rate {s['hit_rate']:.1%} "
+              f"(hits={s['hits']:,} misses={s['misses']:,}), expired={s['expired']:,} "
+              f"evicted={s['evictions']:,} rescored={s['rescores']:,} state-rescored={s['state_rescores']:,}")